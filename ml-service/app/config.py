@@ -4,6 +4,61 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     APP_NAME: str = "Saksham Saathi ML Service"
     MODEL_PATH: str = "app/ml_models"
+    # Comma-separated model names to load in the background at startup
+    MODEL_WARMUP: str = ""
+    # Shared secret for /api/ml/admin endpoints (X-Admin-Token header); empty disables them
+    ADMIN_TOKEN: str = ""
+
+    # Attention forecast micro-batching: max requests per forward pass / max wait to fill it
+    ATTENTION_BATCH_MAX_SIZE: int = 64
+    ATTENTION_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Attention forecast cache (LRU + TTL); shared backend: "" (off) or "memory" (local stand-in)
+    FORECAST_CACHE_MAX_ENTRIES: int = 10000
+    FORECAST_CACHE_TTL_SECONDS: float = 300.0
+    FORECAST_CACHE_SHARED_BACKEND: str = ""
+
+    # On-disk feature cache for speech/handwriting extraction ("" disables it)
+    FEATURE_CACHE_DIR: str = ".cache/features"
+    FEATURE_CACHE_MAX_MB: int = 512
+
+    # Game 2 recordings (client-supplied references): local paths / object keys must resolve inside
+    # SPEECH_AUDIO_DIR ("" disables them); URLs must fall under one of SPEECH_AUDIO_URL_PREFIXES
+    # (comma-separated, e.g. "https://recordings.s3.amazonaws.com/game2/"; "" disables them)
+    SPEECH_AUDIO_DIR: str = ""
+    SPEECH_AUDIO_URL_PREFIXES: str = ""
+    SPEECH_AUDIO_MAX_MB: float = 256.0  # ~45 min of 16-bit 48 kHz mono WAV
+
+    # Execution lanes: a small thread pool reserved for real-time cognitive load calls
+    # and a bounded pool for heavy screening/speech work. Jobs beyond workers + queue get 503.
+    REALTIME_LANE_WORKERS: int = 2
+    REALTIME_LANE_QUEUE: int = 64
+    HEAVY_LANE_KIND: str = "process"  # "process" or "thread"
+    HEAVY_LANE_WORKERS: int = 0  # 0 = one worker per core
+    HEAVY_LANE_QUEUE: int = 32
+    # Max analyzer jobs in flight per heavy worker during batch scoring, across all batch requests
+    # (capped so heavy_lane.max_workers slots of the lane stay free for /predict)
+    SCREENING_INFLIGHT_PER_WORKER: int = 2
+    # Screening model ensemble micro-batching: max assessments per model call / max wait to fill it
+    SCREENING_BATCH_MAX_SIZE: int = 256
+    SCREENING_BATCH_MAX_WAIT_MS: float = 2.0
+
+    # Request profiling: fraction of requests profiled at startup (admin endpoint can change it),
+    # sampler interval, and where profiles + redacted payloads are kept (oldest pruned past the cap)
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILE_DIR: str = ".cache/profiles"
+    PROFILE_MAX_STORED: int = 50
+
+    # Per-session cognitive load signal state (event deltas): idle sessions are dropped after
+    # SESSION_STATE_IDLE_SECONDS; least recently used ones are evicted beyond the memory budget
+    SESSION_STATE_IDLE_SECONDS: float = 900.0
+    SESSION_STATE_MAX_MB: float = 64.0
+
+    # Reading passage layouts (word boxes) shared by all workers ("" keeps them in-process only),
+    # and how many passage indexes each worker keeps in memory
+    PASSAGE_DIR: str = ".cache/passages"
+    PASSAGE_CACHE_MAX_ENTRIES: int = 256
     
     class Config:
         env_file = ".env"
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import screening, cognitive_load, attention_prediction, health
-from app.utils.model_loader import load_all_models
+from app.routers import screening, cognitive_load, attention_prediction, health, admin, metrics
+from app.utils.model_loader import warm_up_models
+from app.config import settings
+from app.utils.executors import shutdown_executors
+from app.utils.metrics import MetricsMiddleware
 import logging
 
 # Configure logging
@@ -24,18 +27,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load ML models at startup (singleton pattern)
+# Per-route latency, body size and concurrency for /api/ml/metrics
+app.add_middleware(MetricsMiddleware)
+
+# Models load lazily on first get_model(); optionally warm some up in the background
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Loading ML models...")
-    load_all_models()
-    logger.info("ML models loaded successfully (or placeholders active)")
+    warmup = [name.strip() for name in settings.MODEL_WARMUP.split(',') if name.strip()]
+    if warm_up_models(warmup):
+        logger.info(f"Warming up ML models in background: {warmup}")
+    logger.info("ML service ready (models load on first use)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_executors()
 
 # Include routers
 app.include_router(health.router, prefix="/api/ml", tags=["Health"])
+app.include_router(metrics.router, prefix="/api/ml", tags=["Health"])
 app.include_router(screening.router, prefix="/api/ml/screening", tags=["Screening"])
 app.include_router(cognitive_load.router, prefix="/api/ml/cognitive-load", tags=["Cognitive Load"])
 app.include_router(attention_prediction.router, prefix="/api/ml/attention", tags=["Attention Prediction"])
+app.include_router(admin.router, prefix="/api/ml/admin", tags=["Admin"])
 
 @app.get("/")
 def root():
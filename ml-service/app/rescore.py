@@ -0,0 +1,345 @@
+"""
+Offline bulk re-scoring of archived assessments.
+
+Replays stored /predict payloads (ScreeningRequest records) through the same
+analyzers and score combination as the API, plus the screening model ensemble
+(one batched call per chunk), without going through HTTP:
+
+    python -m app.rescore archive/assessments.jsonl rescored/
+    python -m app.rescore archive/2025-*.parquet rescored/ --workers 16
+
+Inputs are JSONL (one request per line, optionally .gz) or Parquet (one request
+per row; games_data as nested structs or a JSON string), read as a stream of
+fixed-size chunks. The parent only reads raw lines / Arrow batches; parsing,
+scoring and building the output batch happen in a pool of worker processes,
+and at most `workers * (1 + INFLIGHT_PER_WORKER)` chunks are in flight, so memory
+stays bounded whatever the archive size.
+
+Results are written in input order to <output>/part-NNNNN.parquet, one row
+group per chunk. A part file is closed every --part-row-groups row groups and
+only then recorded in <output>/_checkpoint.json together with the input
+position reached, so a crashed or interrupted run started again with the same
+arguments drops the unfinished part and continues after the last checkpoint.
+pd.read_parquet(<output>) reads the whole result.
+
+Extracted speech/handwriting features are reused from FEATURE_CACHE_DIR when
+only the scoring changed; set FEATURE_CACHE_DIR="" to force re-extraction.
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Leading underscore: Parquet dataset readers skip it, so the output directory reads as one table
+CHECKPOINT_NAME = '_checkpoint.json'
+PART_NAME = 'part-{:05d}.parquet'
+# Chunks queued per worker beyond the one it is running
+INFLIGHT_PER_WORKER = 2
+# Error messages are cut to this length, so one bad record cannot bloat the error column
+MAX_ERROR_CHARS = 1000
+
+def output_schema():
+    """Schema of the result parts (pyarrow is imported here: only this tool needs it)"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('source', pa.string()),
+        ('source_row', pa.int64()),
+        ('student_id', pa.string()),
+        ('assessment_id', pa.string()),
+        ('dyslexia_risk', pa.float64()),
+        ('adhd_risk', pa.float64()),
+        ('asd_risk', pa.float64()),
+        ('processing_time_ms', pa.float64()),
+        ('features', pa.string()),  # JSON, as returned by /predict
+        ('model_risk', pa.float64()),  # screening model ensemble; null while no model is available
+        ('model_scores', pa.string()),  # JSON, per-model probabilities
+        ('feature_version', pa.string()),
+        ('error', pa.string())
+    ])
+
+# --- Input ---
+
+def input_kind(path: str) -> str:
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith(('.parquet', '.pq')):
+        return 'parquet'
+    raise ValueError(f"Unsupported input format: {path}")
+
+def jsonl_chunks(path: str, position: int, chunk_size: int) -> Iterator[Tuple[List[bytes], int]]:
+    """(raw lines, byte offset after them) from byte offset `position`; blank lines are skipped"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        f.seek(position)
+        lines = []
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                lines.append(line)
+            if len(lines) == chunk_size:
+                yield lines, f.tell()
+                lines = []
+        if lines:
+            yield lines, f.tell()
+
+def parquet_chunks(path: str, position: int, chunk_size: int) -> Iterator[Tuple[Any, int]]:
+    """(record batch, row index after it) from row `position`, skipping whole row groups when resuming"""
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    first_group, skip = 0, position
+    while first_group < parquet.num_row_groups and skip >= parquet.metadata.row_group(first_group).num_rows:
+        skip -= parquet.metadata.row_group(first_group).num_rows
+        first_group += 1
+    row = position
+    batches = parquet.iter_batches(batch_size=chunk_size, row_groups=range(first_group, parquet.num_row_groups))
+    for batch in batches:
+        if skip:
+            batch, skip = batch.slice(min(skip, batch.num_rows)), max(0, skip - batch.num_rows)
+            if batch.num_rows == 0:
+                continue
+        row += batch.num_rows
+        yield batch, row
+
+def input_chunks(path: str, position: int, chunk_size: int) -> Iterator[Tuple[Any, int]]:
+    if input_kind(path) == 'jsonl':
+        return jsonl_chunks(path, position, chunk_size)
+    return parquet_chunks(path, position, chunk_size)
+
+def _without_nulls(value: Any) -> Any:
+    """Parquet structs carry every field of the union schema; absent ones come back as None"""
+    if isinstance(value, dict):
+        return {k: _without_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_without_nulls(v) for v in value]
+    return value
+
+def _records(chunk: Any) -> List[Any]:
+    """Records of a chunk; JSONL lines are left raw and parsed per record, so one bad line fails alone"""
+    if isinstance(chunk, list):
+        return chunk
+    records = chunk.to_pylist()
+    for record in records:
+        games = record.get('games_data')
+        record['games_data'] = json.loads(games) if isinstance(games, (str, bytes)) else _without_nulls(games or [])
+    return records
+
+# --- Worker ---
+
+def _init_worker():
+    # One process per core already; BLAS/OpenMP pools inside each would oversubscribe the box
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+def score_chunk(chunk: Any, source: str, first_row: int):
+    """Score one chunk of raw records; returns a pyarrow RecordBatch in output_schema order"""
+    import pyarrow as pa
+    from pydantic import ValidationError
+    from app.routers.screening import ScreeningRequest, score_request
+    from app.services.screening_service import screening_service
+
+    rows = {name: [] for name in output_schema().names}
+    scored = []  # (row index, games_data, features) for the ensemble, run once per chunk
+    for i, record in enumerate(_records(chunk)):
+        row = {name: None for name in rows}
+        row.update(source=source, source_row=first_row + i)
+        try:
+            if isinstance(record, bytes):
+                record = json.loads(record)
+            if isinstance(record, dict):
+                row.update({key: None if record.get(key) is None else str(record[key])
+                            for key in ('student_id', 'assessment_id')})
+            request = ScreeningRequest.model_validate(record)
+            result, _ = score_request(request)
+            row.update(
+                dyslexia_risk=result['dyslexia_risk'],
+                adhd_risk=result['adhd_risk'],
+                asd_risk=result['asd_risk'],
+                processing_time_ms=result['processing_time_ms'],
+                features=json.dumps(result['features'])
+            )
+            scored.append((i, request.games_data, result['features']))
+        except json.JSONDecodeError as e:
+            row['error'] = f"Invalid JSON: {e}"
+        except ValidationError as e:
+            # Without the offending input: it can be the whole gaze/stroke payload
+            row['error'] = f"Invalid request: {e.errors(include_input=False, include_url=False)}"
+        except Exception as e:
+            row['error'] = str(e)
+        if row['error'] is not None and len(row['error']) > MAX_ERROR_CHARS:
+            row['error'] = row['error'][:MAX_ERROR_CHARS] + "..."
+        for name, value in row.items():
+            rows[name].append(value)
+
+    if scored:
+        predictions = screening_service.predict_batch([(games, features) for _, games, features in scored])
+        for (i, _, _), prediction in zip(scored, predictions):
+            rows['model_risk'][i] = prediction['risk_score']
+            rows['model_scores'][i] = json.dumps(prediction['model_scores'])
+            rows['feature_version'][i] = prediction['feature_version']
+    return pa.RecordBatch.from_pydict(rows, schema=output_schema())
+
+# --- Checkpoint ---
+
+def load_checkpoint(output_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(output_dir, CHECKPOINT_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(output_dir: str, checkpoint: Dict[str, Any]):
+    """Atomic replace, so a crash never leaves a torn checkpoint"""
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix='.checkpoint-', suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, CHECKPOINT_NAME))
+
+def _remove_unrecorded_parts(output_dir: str, parts: List[str]):
+    """Part files written after the last checkpoint are incomplete (or not yet accounted for)"""
+    for path in glob.glob(os.path.join(output_dir, 'part-*.parquet')):
+        if os.path.basename(path) not in parts:
+            os.remove(path)
+
+# --- Pipeline ---
+
+class PartWriter:
+    """Writes row groups to part files, rolling over (and checkpointing) every `row_groups` groups"""
+
+    def __init__(self, output_dir: str, checkpoint: Dict[str, Any], row_groups: int):
+        self.output_dir = output_dir
+        self.checkpoint = checkpoint
+        self.row_groups = row_groups
+        self._writer = None
+        self._name = None
+        self._groups = 0
+        self._reached: Dict[str, Any] = {}  # input position, records and errors covered by the open part
+
+    def write(self, batch, input_index: int, position: int, row: int) -> bool:
+        """Append one row group; True when this closed (and checkpointed) a part"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._name = PART_NAME.format(len(self.checkpoint['parts']))
+            self._writer = pq.ParquetWriter(os.path.join(self.output_dir, self._name), output_schema())
+            self._reached = {"records": 0, "errors": 0}
+        self._writer.write_table(pa.Table.from_batches([batch]))
+        self._groups += 1
+        self._reached.update(input_index=input_index, position=position, row=row,
+                             records=self._reached['records'] + batch.num_rows,
+                             errors=self._reached['errors'] + batch.num_rows - batch.column('error').null_count)
+        if self._groups < self.row_groups:
+            return False
+        self.commit()
+        return True
+
+    def commit(self):
+        """Close the open part and record it, with the input position it covers, in the checkpoint"""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer, self._groups = None, 0
+        reached, checkpoint = self._reached, self.checkpoint
+        checkpoint['parts'].append(self._name)
+        checkpoint.update(input_index=reached['input_index'], position=reached['position'], row=reached['row'])
+        checkpoint['records'] += reached['records']
+        checkpoint['errors'] += reached['errors']
+        save_checkpoint(self.output_dir, checkpoint)
+
+def rescore(inputs: List[str], output_dir: str, workers: int, chunk_size: int, part_row_groups: int,
+            restart: bool = False) -> Dict[str, Any]:
+    """Run (or resume) a re-scoring job; returns the final checkpoint"""
+    inputs = [os.path.abspath(path) for path in inputs]
+    for path in inputs:
+        input_kind(path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    checkpoint = None if restart else load_checkpoint(output_dir)
+    if checkpoint is not None and checkpoint['inputs'] != inputs:
+        raise ValueError(f"{output_dir} holds a run over different inputs; use another output directory or --restart")
+    if checkpoint is None:
+        # input position: byte offset (JSONL) or row index (Parquet); row: records consumed from that input
+        checkpoint = {"inputs": inputs, "input_index": 0, "position": 0, "row": 0, "parts": [],
+                      "records": 0, "errors": 0, "complete": False}
+        _remove_unrecorded_parts(output_dir, [])
+        save_checkpoint(output_dir, checkpoint)
+    if checkpoint['complete']:
+        print(f"{output_dir}: already complete ({checkpoint['records']} records)")
+        return checkpoint
+    _remove_unrecorded_parts(output_dir, checkpoint['parts'])
+    if checkpoint['records']:
+        print(f"Resuming after {checkpoint['records']} records ({len(checkpoint['parts'])} parts)")
+
+    writer = PartWriter(output_dir, checkpoint, part_row_groups)
+    start_records, start_time = checkpoint['records'], time.perf_counter()
+    # spawn: same worker start method as the heavy lane
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+    pending = deque()
+
+    def drain_one():
+        future, *reached = pending.popleft()
+        if writer.write(future.result(), *reached):
+            rate = (checkpoint['records'] - start_records) / max(time.perf_counter() - start_time, 1e-9)
+            print(f"  {checkpoint['records']} records ({checkpoint['errors']} errors), {rate:.1f} records/s")
+
+    try:
+        for input_index in range(checkpoint['input_index'], len(inputs)):
+            path = inputs[input_index]
+            resuming = input_index == checkpoint['input_index']
+            position, row = (checkpoint['position'], checkpoint['row']) if resuming else (0, 0)
+            for chunk, position in input_chunks(path, position, chunk_size):
+                future = pool.submit(score_chunk, chunk, os.path.basename(path), row)
+                row += len(chunk) if isinstance(chunk, list) else chunk.num_rows
+                pending.append((future, input_index, position, row))
+                while len(pending) >= workers * (1 + INFLIGHT_PER_WORKER):
+                    drain_one()
+        while pending:
+            drain_one()
+        writer.commit()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    checkpoint['complete'] = True
+    save_checkpoint(output_dir, checkpoint)
+    return checkpoint
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score archived screening assessments (resumable)")
+    parser.add_argument('inputs', nargs='+', help="JSONL (.jsonl/.ndjson, optionally .gz) or Parquet files")
+    parser.add_argument('output', help="output directory (Parquet parts + _checkpoint.json)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=256, help="records per task and per row group")
+    parser.add_argument('--part-row-groups', type=int, default=16,
+                        help="row groups per part file; progress is checkpointed when a part is closed")
+    parser.add_argument('--restart', action='store_true', help="ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        checkpoint = rescore(args.inputs, args.output, max(1, args.workers), max(1, args.chunk_size),
+                             max(1, args.part_row_groups), restart=args.restart)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
+    print(f"Done: {checkpoint['records']} records, {checkpoint['errors']} errors, "
+          f"{len(checkpoint['parts'])} parts in {args.output} ({time.perf_counter() - start:.1f} s)")
+
+if __name__ == "__main__":
+    main()
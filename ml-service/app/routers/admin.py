@@ -0,0 +1,93 @@
+import os
+from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+from app.config import settings
+from app.utils.artifact_store import load_manifest, ArtifactError
+from app.utils.model_loader import reload_model, model_status
+from app.utils.profiling import (admin_token_valid, profiling_config, list_profiles, load_profile,
+                                 profile_file, delete_profile)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is configured"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/models")
+def list_models():
+    """Registered artifact versions and what each worker currently has loaded"""
+    return {
+        "manifest": load_manifest()['models'],
+        "loaded": model_status()
+    }
+
+@router.post("/models/{model_name}/reload")
+def reload_model_endpoint(model_name: str, version: Optional[str] = None):
+    """
+    Atomically swap a model to the given (or currently active) artifact version.
+    Applies to the worker process that serves this request.
+    """
+    try:
+        stats = reload_model(model_name, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+    except ArtifactError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"model": model_name, **stats}
+
+class ProfilingConfig(BaseModel):
+    sample_rate: float = Field(ge=0.0, le=1.0)
+    mode: Literal['sample', 'cprofile'] = 'sample'
+
+@router.get("/profiling")
+def get_profiling():
+    """Current request sampling settings of this worker and the stored profiles"""
+    return {**profiling_config, "profiles": list_profiles()}
+
+@router.put("/profiling")
+def set_profiling(config: ProfilingConfig):
+    """
+    Profile a random fraction of /screening/predict and /cognitive-load requests.
+    Applies to the worker process that serves this request; set PROFILE_SAMPLE_RATE
+    to cover every worker from startup. Single requests can instead be profiled by
+    sending X-Profile: sample|cprofile along with X-Admin-Token.
+    """
+    profiling_config.update(config.model_dump())
+    return profiling_config
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """
+    Profile metadata and the redacted payload (numeric arrays only), e.g. to replay
+    payload["games_data"][i]["eye_tracking_data"] through analyze_eye_tracking offline
+    """
+    try:
+        return load_profile(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+
+@router.get("/profiles/{profile_id}/profile")
+def download_profile(profile_id: str):
+    """Collapsed stacks (text, flamegraph/speedscope input) or a pstats file, by profile mode"""
+    try:
+        path = profile_file(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    media_type = 'text/plain' if path.endswith('.collapsed') else 'application/octet-stream'
+    return FileResponse(path, media_type=media_type, filename=f"{profile_id}-{os.path.basename(path)}")
+
+@router.delete("/profiles/{profile_id}")
+def remove_profile(profile_id: str):
+    try:
+        delete_profile(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    return {"deleted": profile_id}
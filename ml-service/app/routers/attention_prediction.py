@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from app.services.lstm_service import predict_attention
+from app.services.lstm_service import predict_attention_cached
 
 router = APIRouter()
 
@@ -11,12 +11,14 @@ class AttentionRequest(BaseModel):
     prediction_horizon_hours: int = 48
 
 @router.post("/predict")
-def predict_endpoint(req: AttentionRequest):
+async def predict_endpoint(req: AttentionRequest):
     """
     Predict 48-hour attention forecast.
+    Repeat polls with unchanged history are served from the forecast cache;
+    concurrent misses share batched LSTM forward passes (see attention_batcher).
     """
     try:
-        result = predict_attention(req.attention_history, req.prediction_horizon_hours)
+        result = await predict_attention_cached(req.student_id, req.attention_history, req.prediction_horizon_hours)
         return {
             "student_id": req.student_id,
             **result
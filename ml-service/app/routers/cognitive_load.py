@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Dict
-from app.services.cognitive_load_service import detect_cognitive_load
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel, model_validator
+from typing import Dict, List, Literal, Optional
+from app.services.cognitive_load_service import detect_cognitive_load, detect_cognitive_load_bulk, SIGNAL_COLUMNS
+from app.services.cognitive_load_session import detect_from_events, session_store
+from app.utils.executors import realtime_lane, LaneSaturated
+from app.utils.profiling import profile_mode, run_on_lane
+import time
 
 router = APIRouter()
 
@@ -12,17 +16,121 @@ class CognitiveLoadRequest(BaseModel):
     task_type: str
 
 @router.post("/detect")
-def detect_load(request: CognitiveLoadRequest):
+async def detect_load(request: CognitiveLoadRequest, http_request: Request, response: Response):
     """
     Real-time endpoint for Cognitive Load Detection.
     Expected Response Time: < 50ms (network) + < 1ms (logic)
+    Runs on the dedicated realtime lane so heavy screening work cannot delay it.
     """
     try:
-        result = detect_cognitive_load(request.signals, request.task_type)
+        result, profile_id = await run_on_lane(
+            realtime_lane, profile_mode(http_request.headers), 'cognitive_load.detect',
+            lambda: request, detect_cognitive_load, request.signals, request.task_type)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
         return {
             **result,
             "student_id": request.student_id,
             "session_id": request.session_id
         }
+    except LaneSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+class BulkCognitiveLoadRequest(BaseModel):
+    student_ids: List[str]
+    session_ids: Optional[List[str]] = None
+    # Columnar signals: {"fixation_time_avg_ms": [...], "consecutive_errors": [...], ...}
+    signals: Dict[str, List[float]]
+    task_type: str
+
+@router.post("/detect-bulk")
+async def detect_load_bulk(request: BulkCognitiveLoadRequest, http_request: Request, response: Response):
+    """
+    Score a whole classroom in one call.
+    Each signal is a column with one value per student_ids entry; results are in the same order.
+    """
+    n = len(request.student_ids)
+    unknown = set(request.signals) - set(SIGNAL_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown signal columns: {sorted(unknown)}")
+    if any(len(values) != n for values in request.signals.values()):
+        raise HTTPException(status_code=400, detail="Every signal column must have one value per student")
+    if request.session_ids is not None and len(request.session_ids) != n:
+        raise HTTPException(status_code=400, detail="session_ids must have one value per student")
+
+    start_time = time.perf_counter()
+    try:
+        results, profile_id = await run_on_lane(
+            realtime_lane, profile_mode(http_request.headers), 'cognitive_load.detect_bulk',
+            lambda: request, detect_cognitive_load_bulk, request.signals, request.task_type)
+    except LaneSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    for i, result in enumerate(results):
+        result["student_id"] = request.student_ids[i]
+        if request.session_ids is not None:
+            result["session_id"] = request.session_ids[i]
+    return {
+        "count": n,
+        "results": results,
+        "processing_time_ms": round((time.perf_counter() - start_time) * 1000, 2)
+    }
+
+class SignalEvent(BaseModel):
+    type: Literal['fixation', 'response', 'backspace', 'hover', 'input']
+    t: float  # client timestamp, ms
+    duration_ms: Optional[float] = None  # fixation / hover
+    correct: Optional[bool] = None  # response
+
+    @model_validator(mode='after')
+    def response_has_outcome(self):
+        # A response without an outcome would otherwise be scored as an error
+        if self.type == 'response' and self.correct is None:
+            raise ValueError("response events require 'correct'")
+        return self
+
+class CognitiveLoadEventsRequest(BaseModel):
+    student_id: str
+    session_id: str
+    # Only the events since the previous call for this session
+    events: List[SignalEvent] = []
+    task_type: str
+    # Client clock at send time; pauses are measured up to here (default: latest event)
+    timestamp_ms: Optional[float] = None
+
+@router.post("/events")
+async def detect_load_from_events(request: CognitiveLoadEventsRequest, http_request: Request, response: Response):
+    """
+    Incremental variant of /detect: the service keeps rolling per-session signal state,
+    so clients send raw event deltas instead of re-aggregated signals.
+    The response includes the derived signals next to the usual detection fields.
+    """
+    events = [(e.type, e.t, e.duration_ms, e.correct) for e in request.events]
+    try:
+        result, profile_id = await run_on_lane(
+            realtime_lane, profile_mode(http_request.headers), 'cognitive_load.events',
+            lambda: request, detect_from_events, request.session_id, events, request.task_type, request.timestamp_ms)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        return {
+            **result,
+            "student_id": request.student_id,
+            "session_id": request.session_id
+        }
+    except LaneSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/sessions/{session_id}")
+def end_session(session_id: str):
+    """Drop a session's rolling state when it ends (idle sessions also expire on their own)"""
+    if not session_store.end(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return {"session_id": session_id, "ended": True}
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
-from app.utils.model_loader import MODELS
+from app.utils.model_loader import MODELS, model_status
+from app.services.lstm_service import forecast_cache
+from app.utils.executors import lane_stats
 import psutil
 import time
 
@@ -9,7 +11,7 @@ start_time = time.time()
 
 @router.get("/health")
 def health_check():
-    """Check if ML service is healthy and models are loaded"""
+    """Check if ML service is healthy and which models are loaded"""
     uptime = time.time() - start_time
     memory_info = psutil.virtual_memory()
     
@@ -22,5 +24,11 @@ def health_check():
             "screening_mlp": MODELS.get('screening_mlp') is not None,
             "cognitive_load_tree": MODELS.get('cognitive_load_tree') is not None,
             "lstm_attention": MODELS.get('lstm_attention') is not None
-        }
+        },
+        # Models load on first use; per-model load time and resident size once loaded
+        "models": model_status(),
+        "caches": {
+            "attention_forecast": forecast_cache.stats()
+        },
+        "lanes": lane_stats()
     }
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils.metrics import render_metrics, counter_lines, gauge_lines
+from app.services.lstm_service import forecast_cache
+from app.services.cognitive_load_session import session_store
+
+router = APIRouter()
+
+def cache_lines():
+    # Feature-cache counters live in the heavy-lane workers, so only in-process caches are reported
+    caches = {"attention_forecast": forecast_cache.stats()}
+    return (
+        counter_lines('ml_cache_hits_total', "Cache lookups served from the cache",
+                      [({'cache': name}, stats['hits']) for name, stats in caches.items()])
+        + counter_lines('ml_cache_misses_total', "Cache lookups that had to compute",
+                        [({'cache': name}, stats['misses']) for name, stats in caches.items()])
+    )
+
+def session_lines():
+    stats = session_store.stats()
+    return (
+        gauge_lines('ml_cognitive_load_sessions', "Sessions with rolling signal state in this worker",
+                    [({}, stats['sessions'])])
+        + gauge_lines('ml_cognitive_load_sessions_max', "Session cap derived from SESSION_STATE_MAX_MB",
+                      [({}, stats['max_sessions'])])
+        + counter_lines('ml_cognitive_load_sessions_removed_total', "Sessions dropped by idle expiry or the memory cap",
+                        [({'reason': 'idle'}, stats['expired']), ({'reason': 'capacity'}, stats['evicted'])])
+    )
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition for this worker process (stage/route latency, payload sizes, RSS, concurrency)"""
+    return PlainTextResponse(render_metrics(cache_lines() + session_lines()), media_type="text/plain; version=0.0.4; charset=utf-8")
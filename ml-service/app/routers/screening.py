@@ -1,11 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from app.services.eye_tracking_service import analyze_eye_tracking
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from app.services.eye_tracking_service import analyze_eye_tracking, GazeStreamAnalyzer
 from app.services.handwriting_analysis_service import analyze_handwriting
+from app.services.speech_analysis_service import analyze_speech
+from app.services.reading_aoi_service import register_passage, passage_summary
+from app.services.screening_service import screening_batcher
+from app.routers.admin import require_admin
+from app.utils.executors import heavy_lane, LaneSaturated
+from app.utils.binary_payload import is_msgpack, decode_screening_payload, decode_gaze
+from app.utils.metrics import timed, record_stage, run_timed
+from app.utils.profiling import profile_mode, run_on_lane
+from app.config import settings
+import asyncio
+import logging
+import json
 import time
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class ScreeningRequest(BaseModel):
     student_id: str
@@ -13,62 +29,279 @@ class ScreeningRequest(BaseModel):
     language: str
     games_data: List[Dict[str, Any]]
 
-@router.post("/predict")
-def predict_screening(request: ScreeningRequest):
-    """Predict Dyslexia/ADHD/ASD risk based on 5 games data"""
-    start_time = time.time()
-    
+async def parse_body(http_request: Request, model):
+    """
+    Validate the body as `model`. application/json goes straight through pydantic's JSON
+    parser; application/msgpack bodies may carry packed gaze/stroke arrays (see binary_payload).
+    """
+    body = await http_request.body()
     try:
-        dyslexia_score = 0
-        adhd_score = 0
-        asd_score = 0
-        features = {}
+        if is_msgpack(http_request.headers.get('content-type')):
+            return model.model_validate(decode_screening_payload(body))
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
+
+def body_schema(json_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """openapi_extra documenting both accepted body encodings"""
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": json_schema},
+        "application/msgpack": {"schema": {"type": "string", "format": "binary"}}
+    }}}
+
+def analyzer_jobs(request: ScreeningRequest) -> List[Tuple[str, Callable, tuple]]:
+    """CPU-heavy per-game analyzer calls as (feature_key, fn, args)"""
+    jobs = []
+    for game in request.games_data:
+        num = game.get('game_number')
         
-        for game in request.games_data:
-            num = game.get('game_number')
+        # Game 1: Eye Tracking
+        # Optional passage layout: word_boxes for this request only, else a registered passage_id
+        if num == 1 and 'eye_tracking_data' in game:
+            jobs.append(('eye_tracking', analyze_eye_tracking,
+                         (game['eye_tracking_data'], game.get('passage_id'), game.get('word_boxes'))))
             
-            # Game 1: Eye Tracking
-            if num == 1 and 'eye_tracking_data' in game:
-                res = analyze_eye_tracking(game['eye_tracking_data'])
-                features['eye_tracking'] = res
-                dyslexia_score += res.get('dyslexia_score', 0) * 0.3
-                
-            # Game 2: Speech
-            if num == 2:
-                # Placeholder
+        # Game 2: Speech (recording stored by the backend: S3 URL or key under SPEECH_AUDIO_DIR;
+        # anything outside the configured storage is rejected, see app.utils.audio_source)
+        if num == 2 and (game.get('speech_audio_url') or game.get('audio_path')):
+            jobs.append(('speech', analyze_speech, (game.get('speech_audio_url') or game['audio_path'],)))
+            
+        # Game 3: Handwriting
+        if num == 3 and 'handwriting_strokes' in game:
+            # A flat stroke list, or AssessmentGame3's tasks ({"letter", "strokes"} per prompted
+            # letter); the prompts let reversal detection judge each stroke against its letter
+            strokes = game['handwriting_strokes']
+            jobs.append(('handwriting', analyze_handwriting, (strokes, request.language)))
+    return jobs
+
+def combine_scores(request: ScreeningRequest, features: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine analyzer outputs with the lightweight game rules into risk scores"""
+    dyslexia_score = 0
+    adhd_score = 0
+    asd_score = 0
+    
+    for game in request.games_data:
+        num = game.get('game_number')
+        
+        # Game 1: Eye Tracking
+        if num == 1 and 'eye_tracking' in features:
+            dyslexia_score += features['eye_tracking'].get('dyslexia_score', 0) * 0.3
+            
+        # Game 2: Speech
+        if num == 2:
+            speech = features.get('speech')
+            if speech and 'error' not in speech:
+                dyslexia_score += speech.get('dyslexia_score', 0) * 0.3
+            else:
+                # No usable recording: keep the previous placeholder contribution
                 dyslexia_score += 10 
+        
+        # Game 3: Handwriting
+        if num == 3 and 'handwriting' in features:
+            dyslexia_score += features['handwriting'].get('dyslexia_score', 0) * 0.4
             
-            # Game 3: Handwriting
-            if num == 3 and 'handwriting_strokes' in game:
-                # Expecting structure from AssessmentGame3 where strokes might be nested
-                # Flatten or pass correct structure
-                strokes = game['handwriting_strokes'] 
-                # If strokes is List of Tasks, need to iterate. Assuming flat list for now or adapt service.
-                res = analyze_handwriting(strokes, request.language)
-                features['handwriting'] = res
-                dyslexia_score += res.get('dyslexia_score', 0) * 0.4
+        # Game 4: Pattern (ADHD)
+        if num == 4 and 'response_data' in game:
+            acc = game['response_data'].get('accuracy', 1)
+            if acc < 0.6:
+                adhd_score += 30
                 
-            # Game 4: Pattern (ADHD)
-            if num == 4 and 'response_data' in game:
-                acc = game['response_data'].get('accuracy', 1)
-                if acc < 0.6:
-                    adhd_score += 30
-                    
-            # Game 5: Response Time (ADHD)
-            if num == 5 and 'response_data' in game:
-                var = game['response_data'].get('variability', 0)
-                if var > 200:
-                    adhd_score += 50
-                    
-        # Final scores
-        return {
-            "student_id": request.student_id,
-            "dyslexia_risk": min(100, round(dyslexia_score, 2)),
-            "adhd_risk": min(100, round(adhd_score, 2)),
-            "asd_risk": min(100, round(asd_score, 2)),
-            "features": features,
-            "processing_time_ms": round((time.time() - start_time) * 1000, 2)
-        }
-        
+        # Game 5: Response Time (ADHD)
+        if num == 5 and 'response_data' in game:
+            var = game['response_data'].get('variability', 0)
+            if var > 200:
+                adhd_score += 50
+                
+    # Final scores
+    return {
+        "student_id": request.student_id,
+        "dyslexia_risk": min(100, round(dyslexia_score, 2)),
+        "adhd_risk": min(100, round(adhd_score, 2)),
+        "asd_risk": min(100, round(asd_score, 2)),
+        "features": features
+    }
+
+def score_request(request: ScreeningRequest) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Run all analyzers for one assessment and combine them (runs on the heavy lane).
+    Returns the result and per-stage nanoseconds, which the caller records: lane
+    workers may be separate processes with their own metrics registry.
+    """
+    start_time = time.perf_counter_ns()
+    features, stage_ns = {}, {}
+    for key, fn, args in analyzer_jobs(request):
+        features[key], stage_ns[key] = run_timed(fn, *args)
+    result, stage_ns['combine'] = run_timed(combine_scores, request, features)
+    result["processing_time_ms"] = round((time.perf_counter_ns() - start_time) / 1e6, 2)
+    return result, stage_ns
+
+async def ensemble_risk(games_data: List[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
+    """model_risk for one assessment; a failing ensemble is reported there instead of failing the request"""
+    try:
+        with timed('screening.ensemble'):
+            return await screening_batcher.submit((games_data, features))
     except Exception as e:
+        logger.exception("Screening ensemble failed")
+        return {"risk_score": None, "error": str(e)}
+
+@router.post("/predict", openapi_extra=body_schema(ScreeningRequest.model_json_schema()))
+async def predict_screening(http_request: Request):
+    """
+    Predict Dyslexia/ADHD/ASD risk based on 5 games data.
+    "model_risk" is the screening model ensemble on the same analyzer outputs
+    (screening_service; risk_score None while no model is loaded, and with "error" if the
+    ensemble failed: the heuristic scores are returned either way).
+    Profiled requests (see app.utils.profiling) return the stored profile id in X-Profile-Id.
+    """
+    with timed('screening.parse'):
+        request = await parse_body(http_request, ScreeningRequest)
+    try:
+        (result, stage_ns), profile_id = await run_on_lane(
+            heavy_lane, profile_mode(http_request.headers), 'screening.predict',
+            lambda: request, score_request, request)
+    except LaneSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    result["model_risk"] = await ensemble_risk(request.games_data, result["features"])
+
+    for stage, elapsed in stage_ns.items():
+        record_stage(f"screening.{stage}", elapsed)
+    with timed('screening.serialize'):
+        return JSONResponse(jsonable_encoder(result), headers={"X-Profile-Id": profile_id} if profile_id else None)
+
+# Analyzer jobs in flight across all batch requests. Batches wait for these slots instead of
+# being rejected by the lane, and leave heavy_lane.max_workers slots of its capacity free
+# (when the queue allows it), so interactive /predict requests are still admitted while batches run.
+BATCH_INFLIGHT_LIMIT = max(1, min(heavy_lane.max_workers * settings.SCREENING_INFLIGHT_PER_WORKER,
+                                  heavy_lane.capacity - heavy_lane.max_workers))
+batch_inflight = asyncio.Semaphore(BATCH_INFLIGHT_LIMIT)
+
+class BatchScreeningRequest(BaseModel):
+    requests: List[ScreeningRequest]
+
+@router.post("/predict-batch", openapi_extra=body_schema({
+    "type": "object",
+    "required": ["requests"],
+    "properties": {"requests": {"type": "array", "items": ScreeningRequest.model_json_schema()}}
+}))
+async def predict_screening_batch(http_request: Request):
+    """
+    Score many assessments at once.
+    Per-game analyzers fan out over the heavy lane; results stream back as NDJSON
+    (one JSON object per line) in completion order.
+    """
+    with timed('screening_batch.parse'):
+        batch = await parse_body(http_request, BatchScreeningRequest)
+
+    async def run_job(key: str, fn: Callable, args: tuple):
+        async with batch_inflight:
+            result, elapsed = await heavy_lane.run(run_timed, fn, *args, admit=False)
+        record_stage(f"screening.{key}", elapsed)
+        return result
+
+    async def score_one(request: ScreeningRequest) -> Dict[str, Any]:
+        start_time = time.perf_counter_ns()
+        try:
+            jobs = analyzer_jobs(request)
+            results = await asyncio.gather(*(run_job(key, fn, args) for key, fn, args in jobs))
+            features = {key: res for (key, _, _), res in zip(jobs, results)}
+            with timed('screening.combine'):
+                combined = combine_scores(request, features)
+            combined["model_risk"] = await ensemble_risk(request.games_data, features)
+            return {
+                **combined,
+                "assessment_id": request.assessment_id,
+                "processing_time_ms": round((time.perf_counter_ns() - start_time) / 1e6, 2)
+            }
+        except Exception as e:
+            return {"student_id": request.student_id, "assessment_id": request.assessment_id, "error": str(e)}
+
+    async def stream_results():
+        tasks = [asyncio.ensure_future(score_one(r)) for r in batch.requests]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                with timed('screening_batch.serialize'):
+                    line = json.dumps(result) + "\n"
+                yield line
+        finally:
+            # Client went away: stop scheduling the rest of the batch
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+class PassageLayout(BaseModel):
+    # Word boxes in reading order (index = word_index): {"x", "y", "width", "height"} or [x, y, width, height]
+    word_boxes: List[Any]
+
+@router.put("/passages/{passage_id}", dependencies=[Depends(require_admin)])
+def put_passage(passage_id: str, layout: PassageLayout):
+    """
+    Register (or replace) a reading passage's word layout (admin token required). Game 1
+    payloads can then send just "passage_id" to get word-level reading measures.
+    """
+    try:
+        index = register_passage(passage_id, layout.word_boxes)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid passage layout: {e}")
+    except OSError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return passage_summary(passage_id, index)
+
+@router.websocket("/eye-tracking/stream")
+async def stream_eye_tracking(websocket: WebSocket, passage_id: Optional[str] = None):
+    """
+    Live Game 1 gaze analysis.
+    Client sends {"type": "chunk", "samples": [{"x", "y", "timestamp", "word_index"?}, ...]}
+    as the session runs and {"type": "end"} when it finishes. Each chunk is acknowledged with
+    running counts; "end" returns the analyze_eye_tracking summary and closes.
+    ?passage_id= maps fixations to a registered passage's words, as in /predict.
+    A binary frame is a chunk of packed GAZE_WIRE_DTYPE records (see binary_payload).
+    """
+    await websocket.accept()
+    try:
+        analyzer = GazeStreamAnalyzer(passage_id=passage_id)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame['type'] == 'websocket.disconnect':
+                raise WebSocketDisconnect(frame.get('code', 1000))
+            if frame.get('bytes') is not None:
+                message = {"type": "chunk", "samples": frame['bytes']}
+            else:
+                try:
+                    message = json.loads(frame.get('text') or '')
+                except ValueError:
+                    await websocket.send_json({"type": "error", "detail": "Invalid JSON message"})
+                    continue
+            kind = message.get('type') if isinstance(message, dict) else None
+
+            if kind == 'chunk':
+                samples = message.get('samples', [])
+                try:
+                    analyzer.add_samples(decode_gaze(samples) if isinstance(samples, bytes) else samples)
+                except (KeyError, TypeError, ValueError) as e:
+                    await websocket.send_json({"type": "error", "detail": f"Invalid gaze chunk: {e}"})
+                    continue
+                await websocket.send_json({"type": "progress", **analyzer.progress()})
+
+            elif kind == 'end':
+                await websocket.send_json({"type": "summary", "eye_tracking": analyzer.finish()})
+                await websocket.close()
+                return
+
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    except WebSocketDisconnect:
+        # Client dropped mid-session; state is discarded with the analyzer
+        pass
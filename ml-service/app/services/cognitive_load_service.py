@@ -1,12 +1,21 @@
 import time
-from typing import Dict, Any, Optional
+import numpy as np
+from typing import Dict, Any, Optional, List
+from app.utils.compiled_tree import get_compiled_model
+from app.utils.metrics import timed, timed_stage, record_stage
+
+# Signal names in rule order; also the default feature order for cognitive_load_tree
+SIGNAL_COLUMNS = ['fixation_time_avg_ms', 'consecutive_errors', 'response_pause_ms',
+                  'backspace_count', 'mouse_hover_hesitation_ms']
 
 def detect_cognitive_load(signals: Dict[str, float], task_type: str) -> Dict[str, Any]:
     """
     Detect cognitive overload in <200ms using rule-based heuristics.
     Input: Signals dict (fixation, errors, latency, etc.)
+    When the cognitive_load_tree model is loaded, its compiled form decides severity
+    and confidence; the rules still provide overload_score and indicators.
     """
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
     
     # Extract features with defaults
     fixation_time = signals.get('fixation_time_avg_ms', 0)
@@ -57,9 +66,22 @@ def detect_cognitive_load(signals: Dict[str, float], task_type: str) -> Dict[str
     elif overload_score >= 35:
         severity = "moderate"
         overload_detected = True
+
+    confidence = min(1.0, overload_score / 100.0)
+    compiled = cognitive_load_tree()
+    if compiled is not None:
+        tree, levels = compiled
+        with timed('cognitive_load.tree_inference'):
+            proba = tree.predict_proba_one(signals)
+        best = int(np.argmax(proba))
+        severity = str(SEVERITY_NAMES[levels[best]])
+        overload_detected = severity != "mild"
+        confidence = float(proba[best])
         
     # Response Construction
-    processing_time_ms = (time.time() - start_time) * 1000
+    elapsed_ns = time.perf_counter_ns() - start_time
+    record_stage('cognitive_load.detect', elapsed_ns)
+    processing_time_ms = elapsed_ns / 1e6
     
     # Log warning if SLOW (Self-monitoring)
     if processing_time_ms > 200:
@@ -70,7 +92,7 @@ def detect_cognitive_load(signals: Dict[str, float], task_type: str) -> Dict[str
         "severity": severity,
         "overload_score": overload_score,
         "indicators": indicators,
-        "confidence": min(1.0, overload_score / 100.0),
+        "confidence": confidence,
         "processing_time_ms": round(processing_time_ms, 2),
         "intervention_suggested": get_intervention(severity) if overload_detected else None
     }
@@ -79,3 +101,116 @@ def get_intervention(severity: str) -> str:
     if severity == "severe": return "mandatory_break"
     if severity == "moderate": return "suggest_break"
     return "continue_with_monitoring"
+
+INDICATOR_NAMES = ['prolonged_fixation', 'error_pattern', 'long_pause', 'uncertainty', 'hesitation']
+# Indicator list for every combination of the 5 indicator bits (bit i -> INDICATOR_NAMES[i])
+INDICATOR_COMBOS = [[name for i, name in enumerate(INDICATOR_NAMES) if code >> i & 1] for code in range(32)]
+SEVERITY_NAMES = np.array(['mild', 'moderate', 'severe'])
+INTERVENTIONS = [None, get_intervention('moderate'), get_intervention('severe')]
+
+def severity_levels_for_classes(classes) -> np.ndarray:
+    """
+    Map tree class labels to severity levels (0 mild, 1 moderate, 2 severe).
+    Labels may be the severity names or numeric levels; a binary 0/1 overload
+    label maps to mild/moderate.
+    """
+    levels = []
+    for label in classes:
+        if isinstance(label, str) and label in SEVERITY_NAMES:
+            levels.append(int(np.flatnonzero(SEVERITY_NAMES == label)[0]))
+        elif not isinstance(label, str) and int(label) == label and 0 <= label <= 2:
+            levels.append(int(label))
+        else:
+            raise ValueError(f"Unrecognized cognitive load class label: {label!r}")
+    return np.array(levels, dtype=np.int64)
+
+# (compiled tree, per-class severity levels or None if its labels are unusable)
+_tree_levels = (None, None)
+
+def cognitive_load_tree():
+    """(compiled cognitive_load_tree, class severity levels), or None for the rule path"""
+    global _tree_levels
+    tree = get_compiled_model('cognitive_load_tree', SIGNAL_COLUMNS)
+    if tree is None or tree.classes is None:
+        return None
+    if _tree_levels[0] is not tree:
+        try:
+            levels = severity_levels_for_classes(tree.classes)
+        except ValueError as e:
+            print(f"WARNING: cognitive_load_tree ignored: {e}")
+            levels = None
+        _tree_levels = (tree, levels)
+    return None if _tree_levels[1] is None else _tree_levels
+
+def score_cognitive_load_columns(columns: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized form of the detect_cognitive_load rules over columnar signals.
+    Missing columns default to 0, like missing keys in the scalar path.
+    Returns arrays: overload_score, severity_level (0 mild, 1 moderate, 2 severe),
+    indicator_code (bitmask over INDICATOR_NAMES) and confidence.
+    """
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All signal columns must have the same length")
+    n = lengths.pop() if lengths else 0
+
+    def col(name):
+        values = columns.get(name)
+        return np.zeros(n) if values is None else np.asarray(values, dtype=np.float64)
+
+    fixation_time = col('fixation_time_avg_ms')
+    prolonged = fixation_time > 2500
+    errors = col('consecutive_errors') >= 3
+    pause = col('response_pause_ms') > 8000
+    uncertainty = col('backspace_count') > 12
+    hesitation = col('mouse_hover_hesitation_ms') > 1500
+
+    overload_score = (30 * prolonged + 15 * (~prolonged & (fixation_time > 1500))
+                      + 40 * errors + 25 * pause + 20 * uncertainty + 15 * hesitation).astype(np.int64)
+    indicator_code = (prolonged.astype(np.int64) | errors << 1 | pause << 2 | uncertainty << 3 | hesitation << 4)
+    severity_level = (overload_score >= 35).astype(np.int64) + (overload_score >= 60)
+
+    confidence = np.minimum(1.0, overload_score / 100.0)
+
+    compiled = cognitive_load_tree()
+    if compiled is not None:
+        tree, levels = compiled
+        with timed('cognitive_load.tree_inference_bulk'):
+            proba = tree.predict_proba(tree.matrix(columns, n))
+        best = np.argmax(proba, axis=1)
+        severity_level = levels[best]
+        confidence = proba[np.arange(n), best]
+
+    return {
+        "overload_score": overload_score,
+        "severity_level": severity_level,
+        "indicator_code": indicator_code,
+        "confidence": confidence
+    }
+
+@timed_stage('cognitive_load.detect_bulk')
+def detect_cognitive_load_bulk(columns: Dict[str, Any], task_type: str) -> List[Dict[str, Any]]:
+    """
+    Score many students at once from columnar signals.
+    Row i matches detect_cognitive_load({col: columns[col][i]}, task_type) except for
+    processing_time_ms, which the caller reports once for the whole batch.
+    """
+    scored = score_cognitive_load_columns(columns)
+    levels = scored['severity_level'].tolist()
+    return [
+        {
+            "overload_detected": level > 0,
+            "severity": severity,
+            "overload_score": score,
+            "indicators": list(INDICATOR_COMBOS[code]),
+            "confidence": confidence,
+            "intervention_suggested": INTERVENTIONS[level]
+        }
+        for level, severity, score, code, confidence in zip(
+            levels,
+            SEVERITY_NAMES[scored['severity_level']].tolist(),
+            scored['overload_score'].tolist(),
+            scored['indicator_code'].tolist(),
+            scored['confidence'].tolist()
+        )
+    ]
@@ -0,0 +1,204 @@
+"""
+Per-session rolling signal state for cognitive load detection.
+
+Clients send raw incremental events (fixations, answers, backspaces, hovers)
+for a session instead of recomputing the aggregated `signals` on every tick.
+Each session keeps fixed-size ring buffers and running aggregates that are
+updated in O(1) per event, and derives the SIGNAL_COLUMNS values from them
+when it is scored.
+
+State lives in the serving process (the realtime lane runs threads), so with
+several uvicorn workers a session's requests must reach the same worker
+(sticky routing on session_id). Sessions idle for SESSION_STATE_IDLE_SECONDS
+are evicted, and the least recently used ones go first once the store reaches
+its SESSION_STATE_MAX_MB budget.
+"""
+import sys
+import time
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.config import settings
+from app.services.cognitive_load_service import detect_cognitive_load
+
+# Rolling window sizes
+FIXATION_WINDOW = 20  # fixation_time_avg_ms: mean of the last N fixations
+BACKSPACE_CAPACITY = 64  # backspace_count saturates here, far above the rule threshold (12)
+BACKSPACE_WINDOW_MS = 60_000  # backspace_count: backspaces within the last minute
+HOVER_ALPHA = 0.3  # mouse_hover_hesitation_ms: EWMA smoothing factor
+
+# (type, client timestamp ms, duration_ms or None, correct or None)
+Event = Tuple[str, float, Optional[float], Optional[bool]]
+
+class RingBuffer:
+    """Fixed-capacity FIFO of floats over a preallocated array, with a running sum"""
+    __slots__ = ('values', 'start', 'size', 'total')
+
+    def __init__(self, capacity: int):
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+        self.total = 0.0
+
+    def push(self, value: float):
+        """Append; when full the oldest value is overwritten"""
+        capacity = len(self.values)
+        if self.size == capacity:
+            self.total -= self.values[self.start]
+            self.values[self.start] = value
+            self.start = (self.start + 1) % capacity
+        else:
+            self.values[(self.start + self.size) % capacity] = value
+            self.size += 1
+        self.total += value
+
+    def oldest(self) -> float:
+        return self.values[self.start]
+
+    def pop_oldest(self) -> float:
+        value = self.values[self.start]
+        self.start = (self.start + 1) % len(self.values)
+        self.size -= 1
+        self.total -= value
+        return value
+
+    def mean(self) -> float:
+        return self.total / self.size if self.size else 0.0
+
+    def __len__(self) -> int:
+        return self.size
+
+class SessionSignals:
+    """Rolling aggregates for one session"""
+    __slots__ = ('fixations', 'backspaces', 'hover_ewma', 'consecutive_errors',
+                 'last_input_ms', 'last_event_ms', 'events', 'last_seen')
+
+    def __init__(self):
+        self.fixations = RingBuffer(FIXATION_WINDOW)
+        self.backspaces = RingBuffer(BACKSPACE_CAPACITY)  # timestamps
+        self.hover_ewma: Optional[float] = None
+        self.consecutive_errors = 0
+        self.last_input_ms: Optional[float] = None
+        self.last_event_ms: Optional[float] = None
+        self.events = 0
+        self.last_seen = time.monotonic()
+
+    def apply(self, kind: str, t: float, duration_ms: Optional[float] = None, correct: Optional[bool] = None):
+        """Fold one event into the aggregates"""
+        if kind == 'fixation':
+            self.fixations.push(duration_ms or 0.0)
+        elif kind == 'hover':
+            value = duration_ms or 0.0
+            self.hover_ewma = value if self.hover_ewma is None else HOVER_ALPHA * value + (1 - HOVER_ALPHA) * self.hover_ewma
+        else:
+            # Every non-gaze event is an interaction that ends a pause
+            self.last_input_ms = t if self.last_input_ms is None else max(self.last_input_ms, t)
+            if kind == 'response' and correct is not None:
+                self.consecutive_errors = 0 if correct else self.consecutive_errors + 1
+            elif kind == 'backspace':
+                self.backspaces.push(t)
+        self.last_event_ms = t if self.last_event_ms is None else max(self.last_event_ms, t)
+        self.events += 1
+
+    def signals(self, now_ms: Optional[float] = None) -> Dict[str, float]:
+        """SIGNAL_COLUMNS values as of `now_ms` (client clock; defaults to the latest event)"""
+        now_ms = self.last_event_ms if now_ms is None else now_ms
+        if now_ms is None:
+            now_ms = 0.0
+        # Amortized O(1): every timestamp is dropped at most once
+        cutoff = now_ms - BACKSPACE_WINDOW_MS
+        while len(self.backspaces) and self.backspaces.oldest() < cutoff:
+            self.backspaces.pop_oldest()
+        return {
+            'fixation_time_avg_ms': self.fixations.mean(),
+            'consecutive_errors': self.consecutive_errors,
+            'response_pause_ms': max(0.0, now_ms - self.last_input_ms) if self.last_input_ms is not None else 0.0,
+            'backspace_count': len(self.backspaces),
+            'mouse_hover_hesitation_ms': self.hover_ewma or 0.0
+        }
+
+def _session_bytes() -> int:
+    """Approximate memory held per session: state object, buffers and store entry"""
+    state = SessionSignals()
+    size = sys.getsizeof(state)
+    for ring in (state.fixations, state.backspaces):
+        size += sys.getsizeof(ring) + sys.getsizeof(ring.values)
+    # Session id string, OrderedDict entry and boxed scalars
+    return size + 256
+
+SESSION_BYTES = _session_bytes()
+
+class SessionStore:
+    """Session id -> SessionSignals, LRU ordered, with idle expiry and a hard session cap"""
+
+    def __init__(self, max_mb: float, idle_seconds: float):
+        self.max_sessions = max(1, int(max_mb * 1024 * 1024) // SESSION_BYTES)
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, SessionSignals]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire_idle(self, now: float):
+        cutoff = now - self.idle_seconds
+        # LRU order is last-seen order, so idle sessions sit at the front
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if state.last_seen >= cutoff:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def update(self, session_id: str, events: Iterable[Event], now_ms: Optional[float] = None) -> Tuple[Dict[str, float], int]:
+        """Apply events to the session (created on first use); returns (signals, session event count)"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                while len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+                state = self._sessions[session_id] = SessionSignals()
+                self.created += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_seen = now
+            for event in events:
+                state.apply(*event)
+            return state.signals(now_ms), state.events
+
+    def end(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            sessions = len(self._sessions)
+        return {
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "session_bytes": SESSION_BYTES,
+            "idle_seconds": self.idle_seconds,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+session_store = SessionStore(settings.SESSION_STATE_MAX_MB, settings.SESSION_STATE_IDLE_SECONDS)
+
+def detect_from_events(session_id: str, events: Iterable[Event], task_type: str,
+                       now_ms: Optional[float] = None) -> Dict[str, Any]:
+    """Fold new events into the session state and score the resulting signals"""
+    signals, event_count = session_store.update(session_id, events, now_ms)
+    result = detect_cognitive_load(signals, task_type)
+    result["signals"] = signals
+    result["session_events"] = event_count
+    return result
@@ -1,31 +1,127 @@
 import numpy as np
-from typing import List, Dict, Any
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from app.services.reading_aoi_service import passage_index, reading_measures
 
-def analyze_eye_tracking(gaze_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+# Gaze samples are held as one contiguous float64 record per sample.
+# A C-contiguous (n, 3) float64 array can be viewed as this dtype without a copy.
+GAZE_DTYPE = np.dtype([('x', '<f8'), ('y', '<f8'), ('t', '<f8')])
+
+# Initial look-ahead window (in samples) for the cluster boundary search
+FIXATION_SCAN_WINDOW = 32
+
+def gaze_array(gaze_data: Union[List[Dict[str, Any]], np.ndarray]) -> np.ndarray:
+    """
+    Convert [{"x", "y", "timestamp", ...}, ...] into a GAZE_DTYPE structured array.
+    Field extraction runs through itemgetter/map (C level) instead of a per-dict comprehension.
+    Structured arrays (e.g. decoded binary payloads with x/y/timestamp fields) are cast column-wise.
+    """
+    if isinstance(gaze_data, np.ndarray) and gaze_data.dtype.names:
+        if gaze_data.dtype == GAZE_DTYPE:
+            return gaze_data
+        points = np.empty(len(gaze_data), dtype=GAZE_DTYPE)
+        points['x'] = gaze_data['x']
+        points['y'] = gaze_data['y']
+        points['t'] = gaze_data['timestamp' if 'timestamp' in gaze_data.dtype.names else 't']
+        return points
+
+    rows = list(map(itemgetter('x', 'y', 'timestamp'), gaze_data))
+    flat = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return np.ascontiguousarray(flat).view(GAZE_DTYPE).reshape(-1)
+
+def _word_index(value: Any) -> int:
+    # The client sends null off-text; anything that is not an integer counts as no word
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value)
+    return -1
+
+def gaze_word_indices(gaze_data: Union[List[Dict[str, Any]], np.ndarray]) -> Optional[np.ndarray]:
+    """Per-sample word_index (-1 where absent), or None if no sample carries one"""
+    if isinstance(gaze_data, np.ndarray):
+        if gaze_data.dtype.names and 'word_index' in gaze_data.dtype.names:
+            words = gaze_data['word_index'].astype(np.int64)
+            return words if np.any(words >= 0) else None
+        return None
+    words = np.fromiter((_word_index(g.get('word_index')) for g in gaze_data), dtype=np.int64, count=len(gaze_data))
+    return words if np.any(words >= 0) else None
+
+def _as_columns(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ((n, 2) xy, (n,) t) float64 views for a structured or (n, 3) array"""
+    if points.dtype.names:
+        xy = np.column_stack((points['x'], points['y'])).astype(np.float64, copy=False)
+        return xy, np.asarray(points['t'], dtype=np.float64)
+    arr = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return arr[:, :2], arr[:, 2]
+
+def analyze_eye_tracking(gaze_data: Union[List[Dict[str, Any]], np.ndarray], passage_id: Optional[str] = None,
+                         word_boxes: Optional[Sequence[Any]] = None) -> Dict[str, Any]:
     """
     Input: [{"x": 150, "y": 200, "timestamp": 1234567890, "word_index": 0}, ...]
+           (or the same fields as a structured array)
     Output: {"fixation_count": 15, "regression_count": 5, "avg_fixation_duration_ms": 450, ...}
+
+    With a passage layout (this request's word_boxes, else a registered passage_id),
+    fixations are mapped to words and word-level reading measures are added under
+    "reading"; without one, the samples' word_index is used when present. Regressions
+    are then counted between words, not from raw leftward gaze jumps.
     """
-    if not gaze_data or len(gaze_data) < 10:
+    if gaze_data is None or len(gaze_data) < 10:
         return {"error": "Insufficient gaze data"}
-    
+
     # Extract coordinates and timestamps
     # Assuming timestamp is in ms or convert accordingly
-    points = np.array([(d['x'], d['y'], d['timestamp']) for d in gaze_data])
-    
-    # 1. Calculate Fixations
-    fixations = detect_fixations(points)
-    
-    # 2. Calculate Regressions
-    regressions = detect_regressions(points)
-    
+    points = gaze_array(gaze_data)
+    xy, t = _as_columns(points)
+
+    # 1. Calculate Fixations (the trailing open cluster is not reported)
+    clusters, _ = segment_clusters(xy, t)
+    fixations = fixations_from_clusters(clusters)
+
+    # 2. Calculate Regressions: between words when the fixations can be mapped to words
+    reading = reading_metrics(gaze_data, clusters, passage_id, word_boxes)
+    regressions = reading['regression_count'] if reading else detect_regressions(points)
+
     # 3. Calculate metrics
     avg_fixation_duration = np.mean([f['duration'] for f in fixations]) if fixations else 0
-    
+
     # 4. Saccade velocity
     saccade_velocities = calculate_saccade_velocities(fixations)
     avg_saccade_velocity = np.mean(saccade_velocities) if saccade_velocities else 0
-    
+
+    summary = summarize_eye_tracking(len(fixations), regressions, avg_fixation_duration, avg_saccade_velocity)
+    if reading:
+        summary["reading"] = reading
+    return summary
+
+def reading_metrics(gaze_data: Union[List[Dict[str, Any]], np.ndarray], clusters: np.ndarray,
+                    passage_id: Optional[str] = None, word_boxes: Optional[Sequence[Any]] = None,
+                    min_duration: float = 100) -> Optional[Dict[str, Any]]:
+    """
+    Word-level reading measures for the fixations in `clusters` (segment_clusters output,
+    covering the samples from the start). Words come from the passage's AOI index, else
+    from the word_index of each fixation's middle sample. None if neither is available.
+    """
+    durations = clusters[:, 3] - clusters[:, 2]
+    kept = durations >= min_duration
+    index = passage_index(passage_id, word_boxes) if (passage_id or word_boxes) else None
+    if index is not None:
+        words = index.lookup(clusters[kept, :2])
+        word_count = index.word_count
+    else:
+        sample_words = gaze_word_indices(gaze_data)
+        if sample_words is None:
+            return None
+        ends = np.cumsum(clusters[:, 4]).astype(np.int64)
+        middle = ends - (clusters[:, 4].astype(np.int64) + 1) // 2
+        words = sample_words[middle[kept]]
+        word_count = int(sample_words.max()) + 1
+    result = reading_measures(words, durations[kept], word_count)
+    result["source"] = "passage_layout" if index is not None else "sample_word_index"
+    return result
+
+def summarize_eye_tracking(fixation_count: int, regressions: int,
+                           avg_fixation_duration: float, avg_saccade_velocity: float) -> Dict[str, Any]:
+    """Apply the dyslexia scoring rule to aggregated gaze metrics"""
     # Dyslexia Scoring Rule
     dyslexia_score = 0
     if avg_fixation_duration > 500:  # Normal reader usually 200-250ms
@@ -34,68 +130,268 @@ def analyze_eye_tracking(gaze_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         dyslexia_score += 40
     if avg_saccade_velocity < 3:
         dyslexia_score += 30
-    
+
     return {
-        "fixation_count": len(fixations),
+        "fixation_count": fixation_count,
         "regression_count": regressions,
         "avg_fixation_duration_ms": float(avg_fixation_duration),
         "avg_saccade_velocity": float(avg_saccade_velocity),
         "dyslexia_score": min(100, dyslexia_score),
         "indicators": {
-            "prolonged_fixations": avg_fixation_duration > 500,
-            "excessive_regressions": regressions > 5,
-            "slow_reading": avg_saccade_velocity < 3
+            "prolonged_fixations": bool(avg_fixation_duration > 500),
+            "excessive_regressions": bool(regressions > 5),
+            "slow_reading": bool(avg_saccade_velocity < 3)
         }
     }
 
+def segment_clusters(xy: np.ndarray, t: np.ndarray, radius: float = 30,
+                     open_cluster: Optional[Tuple[float, float, int, float, float]] = None):
+    """
+    Dispersion (I-DT) clustering with a running centroid, O(n) overall.
+
+    A sample joins the current cluster while its distance to the centroid of the
+    samples already in the cluster is < radius. Centroids come from prefix sums, and
+    each cluster boundary is found with a vectorized look-ahead window that doubles
+    until a break is seen, so every sample is examined a bounded number of times.
+
+    `open_cluster` is (sum_x, sum_y, count, t_start, t_last) of a cluster carried over
+    from a previous chunk. Returns (closed, open_cluster) where closed is a
+    (k, 5) array of [centroid_x, centroid_y, t_start, t_end, point_count].
+    """
+    n = len(xy)
+    closed = []
+    if n == 0:
+        return np.empty((0, 5)), open_cluster
+
+    # prefix[k] = sum of xy[:k]
+    prefix = np.zeros((n + 1, 2))
+    np.cumsum(xy, axis=0, out=prefix[1:])
+
+    if open_cluster is not None:
+        base = np.array(open_cluster[:2], dtype=np.float64)
+        base_count, t_start = int(open_cluster[2]), float(open_cluster[3])
+        start, k = 0, 0
+    else:
+        base, base_count, t_start = np.zeros(2), 0, float(t[0])
+        start, k = 0, 1
+
+    window = FIXATION_SCAN_WINDOW
+    while k < n:
+        hi = min(n, k + window)
+        cand = np.arange(k, hi)
+        counts = base_count + (cand - start)
+        centroids = (base + prefix[cand] - prefix[start]) / counts[:, None]
+        delta = xy[cand] - centroids
+        breaks = np.flatnonzero(np.hypot(delta[:, 0], delta[:, 1]) >= radius)
+
+        if breaks.size == 0:
+            # Whole window joined the cluster, look further ahead
+            k = hi
+            window *= 2
+            continue
+
+        # Close cluster at the first sample that falls outside the radius
+        b = int(cand[breaks[0]])
+        cx, cy = centroids[breaks[0]]
+        t_end = float(t[b - 1]) if b > start else float(open_cluster[4])
+        closed.append((cx, cy, t_start, t_end, base_count + b - start))
+
+        base, base_count, t_start = np.zeros(2), 0, float(t[b])
+        start, k = b, b + 1
+        window = FIXATION_SCAN_WINDOW
+
+    total = base + prefix[n] - prefix[start]
+    count = base_count + n - start
+    open_state = (float(total[0]), float(total[1]), int(count), t_start, float(t[n - 1]))
+    return np.array(closed, dtype=np.float64).reshape(-1, 5), open_state
+
+def fixations_from_clusters(clusters: np.ndarray, min_duration: float = 100) -> List[Dict]:
+    """Keep clusters that last at least min_duration and format them as fixation dicts"""
+    durations = clusters[:, 3] - clusters[:, 2]
+    kept = clusters[durations >= min_duration]
+    return [
+        {"centroid": [cx, cy], "duration": t_end - t_start, "point_count": int(count)}
+        for cx, cy, t_start, t_end, count in kept.tolist()
+    ]
+
 def detect_fixations(points: np.ndarray, radius: int = 30, min_duration: int = 100) -> List[Dict]:
     """Cluster points within radius (spatial) and min_duration (temporal) as fixations"""
-    fixations = []
-    current_cluster = []
-    
-    for _, point in enumerate(points):
-        if not current_cluster:
-            current_cluster.append(point)
-            continue
-        
-        # Centroid of current cluster
-        centroid = np.mean([p[:2] for p in current_cluster], axis=0)
-        distance = np.linalg.norm(point[:2] - centroid)
-        
-        if distance < radius:
-            current_cluster.append(point)
-        else:
-            # Check if duration meets threshold
-            # time is at index 2
-            duration = current_cluster[-1][2] - current_cluster[0][2]
-            if duration >= min_duration:
-                fixations.append({
-                    "centroid": centroid.tolist(),
-                    "duration": duration,
-                    "point_count": len(current_cluster)
-                })
-            current_cluster = [point]
-            
-    return fixations
+    xy, t = _as_columns(points)
+    # The trailing cluster is still open when the stream ends and is not reported
+    clusters, _ = segment_clusters(xy, t, radius)
+    return fixations_from_clusters(clusters, min_duration)
+
+def detect_fixations_ivt(points: np.ndarray, velocity_threshold: float = 1.0,
+                         min_duration: int = 100) -> List[Dict]:
+    """
+    Velocity-threshold (I-VT) fixations, fully vectorized.
+    Samples moving slower than velocity_threshold (px/ms) belong to a fixation.
+    """
+    xy, t = _as_columns(points)
+    if len(xy) < 2:
+        return []
+
+    step = np.diff(xy, axis=0)
+    dt = np.diff(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        velocity = np.hypot(step[:, 0], step[:, 1]) / dt
+    slow = np.concatenate(([False], velocity < velocity_threshold))
+    # A slow sample extends the fixation that contains the previous sample
+    slow[np.flatnonzero(slow) - 1] = True
+
+    # Run boundaries of contiguous slow samples
+    edges = np.diff(np.concatenate(([0], slow.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return []
+
+    counts = ends - starts
+    prefix = np.zeros((len(xy) + 1, 2))
+    np.cumsum(xy, axis=0, out=prefix[1:])
+    centroids = (prefix[ends] - prefix[starts]) / counts[:, None]
+
+    clusters = np.column_stack((centroids, t[starts], t[ends - 1], counts))
+    return fixations_from_clusters(clusters, min_duration)
 
 def detect_regressions(points: np.ndarray) -> int:
     """Count backward eye movements (Assuming Left-to-Right reading)"""
-    regressions = 0
-    # Simple check: x position moving left by threshold
-    for i in range(1, len(points)):
-        dx = points[i][0] - points[i-1][0]
-        if dx < -50:  # Threshold for regression (not just jitter)
-            regressions += 1
-    return regressions
+    xy, _ = _as_columns(points)
+    # Simple check: x position moving left by threshold (not just jitter)
+    return int(np.count_nonzero(np.diff(xy[:, 0]) < -50))
 
 def calculate_saccade_velocities(fixations: List[Dict]) -> List[float]:
-    velocities = []
-    for i in range(1, len(fixations)):
-        p1 = np.array(fixations[i-1]['centroid'])
-        p2 = np.array(fixations[i]['centroid'])
-        dist = np.linalg.norm(p2 - p1)
-        # Time gap? Estimating based on next fixation start vs prev end
-        # Simplified: assume a fixed interaction gap or utilize timestamps if available in fixations
-        time_gap = 50 
-        velocities.append(dist / time_gap)
-    return velocities
+    if len(fixations) < 2:
+        return []
+    centroids = np.array([f['centroid'] for f in fixations], dtype=np.float64)
+    dist = np.linalg.norm(np.diff(centroids, axis=0), axis=1)
+    # Time gap? Estimating based on next fixation start vs prev end
+    # Simplified: assume a fixed interaction gap or utilize timestamps if available in fixations
+    time_gap = 50
+    return (dist / time_gap).tolist()
+
+class GazeStreamAnalyzer:
+    """
+    Incremental counterpart of analyze_eye_tracking for live sessions.
+
+    Gaze samples arrive in chunks. Between chunks the analyzer keeps the open fixation
+    cluster (and the word_index of its samples), running regression and saccade sums,
+    and, when fixations can be mapped to words, each fixation's word and duration
+    (16 bytes per fixation) for the reading measures. Memory per session does not grow
+    with the number of samples. finish() returns the same summary analyze_eye_tracking
+    would produce on the concatenated samples with the same passage_id: regressions are
+    counted between words when a passage layout or sample word_index is available, and
+    from raw leftward jumps otherwise ("regression_source" in progress()).
+    """
+
+    def __init__(self, radius: int = 30, min_duration: int = 100, passage_id: Optional[str] = None):
+        self.radius = radius
+        self.min_duration = min_duration
+        self.sample_count = 0
+        self.raw_regression_count = 0
+        self.word_regression_count = 0
+        self.fixation_count = 0
+        self.fixation_duration_total = 0.0
+        self.saccade_velocity_total = 0.0
+        self.saccade_count = 0
+        self._index = passage_index(passage_id) if passage_id else None
+        self._open_cluster = None
+        self._open_words = np.zeros(0, dtype=np.int64)
+        self._max_word = -1
+        self._last_word = None
+        self._fixation_words = []
+        self._fixation_durations = []
+        self._last_x = None
+        self._last_centroid = None
+
+    @property
+    def regression_source(self) -> str:
+        """Where regression_count comes from, as reading["source"] in analyze_eye_tracking"""
+        if self._index is not None:
+            return "passage_layout"
+        return "sample_word_index" if self._max_word >= 0 else "raw_gaze"
+
+    @property
+    def regression_count(self) -> int:
+        return self.raw_regression_count if self.regression_source == "raw_gaze" else self.word_regression_count
+
+    def add_samples(self, gaze_data: Union[List[Dict[str, Any]], np.ndarray]) -> None:
+        if len(gaze_data):
+            words = gaze_word_indices(gaze_data) if self._index is None else None
+            self.add_points(gaze_array(gaze_data), words)
+
+    def add_points(self, points: np.ndarray, words: Optional[np.ndarray] = None) -> None:
+        """`words`: per-sample word_index (-1 = none), used when there is no passage layout"""
+        xy, t = _as_columns(points)
+        if len(xy) == 0:
+            return
+        self.sample_count += len(xy)
+
+        # Raw regressions, including the step across the chunk boundary
+        x = xy[:, 0] if self._last_x is None else np.concatenate(([self._last_x], xy[:, 0]))
+        self.raw_regression_count += int(np.count_nonzero(np.diff(x) < -50))
+        self._last_x = float(xy[-1, 0])
+
+        clusters, self._open_cluster = segment_clusters(xy, t, self.radius, self._open_cluster)
+        self._track_words(clusters, words, len(xy))
+        fixations = fixations_from_clusters(clusters, self.min_duration)
+        if not fixations:
+            return
+
+        self.fixation_count += len(fixations)
+        self.fixation_duration_total += sum(f['duration'] for f in fixations)
+        if self._last_centroid is not None:
+            fixations = [{"centroid": self._last_centroid}] + fixations
+        velocities = calculate_saccade_velocities(fixations)
+        self.saccade_velocity_total += sum(velocities)
+        self.saccade_count += len(velocities)
+        self._last_centroid = fixations[-1]['centroid']
+
+    def _track_words(self, clusters: np.ndarray, words: Optional[np.ndarray], n: int) -> None:
+        """Word of each kept fixation (as reading_metrics maps them) and word-to-word regressions"""
+        durations = clusters[:, 3] - clusters[:, 2]
+        kept = durations >= self.min_duration
+        if self._index is not None:
+            fixation_words = self._index.lookup(clusters[kept, :2])
+        else:
+            words = np.full(n, -1, dtype=np.int64) if words is None else np.asarray(words, dtype=np.int64)
+            if len(words):
+                self._max_word = max(self._max_word, int(words.max()))
+            # Closed clusters tile the open cluster's samples followed by this chunk's
+            stream_words = np.concatenate((self._open_words, words))
+            counts = clusters[:, 4].astype(np.int64)
+            ends = np.cumsum(counts)
+            middle = ends - (counts + 1) // 2
+            self._open_words = stream_words[int(ends[-1]) if len(ends) else 0:]
+            fixation_words = stream_words[middle[kept]]
+
+        self._fixation_words.append(fixation_words)
+        self._fixation_durations.append(durations[kept])
+        on_text = fixation_words[fixation_words >= 0]
+        if len(on_text):
+            sequence = on_text if self._last_word is None else np.concatenate(([self._last_word], on_text))
+            self.word_regression_count += int(np.count_nonzero(np.diff(sequence) < 0))
+            self._last_word = int(on_text[-1])
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "samples": self.sample_count,
+            "fixation_count": self.fixation_count,
+            "regression_count": self.regression_count,
+            "regression_source": self.regression_source
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        if self.sample_count < 10:
+            return {"error": "Insufficient gaze data"}
+        avg_fixation_duration = self.fixation_duration_total / self.fixation_count if self.fixation_count else 0
+        avg_saccade_velocity = self.saccade_velocity_total / self.saccade_count if self.saccade_count else 0
+        summary = summarize_eye_tracking(self.fixation_count, self.regression_count,
+                                         avg_fixation_duration, avg_saccade_velocity)
+        if self.regression_source != "raw_gaze":
+            word_count = self._index.word_count if self._index is not None else self._max_word + 1
+            reading = reading_measures(np.concatenate(self._fixation_words),
+                                       np.concatenate(self._fixation_durations), word_count)
+            reading["source"] = self.regression_source
+            summary["reading"] = reading
+        return summary
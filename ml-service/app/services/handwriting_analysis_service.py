@@ -1,22 +1,110 @@
 import numpy as np
-from typing import List, Dict, Any
+from operator import itemgetter
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence, Tuple, Union
+from app.utils.feature_cache import cached_features, digest_json
 
-def analyze_handwriting(strokes: List[Dict], language: str = 'en') -> Dict[str, Any]:
+# Bump when stroke feature extraction changes; invalidates cached handwriting features
+HANDWRITING_EXTRACTOR_VERSION = "6"
+
+# Strokes are resampled every this many pixels along their length before measuring turns,
+# so integer-pixel quantization and uneven sampling rates don't read as jitter
+RESAMPLE_STEP_PX = 4.0
+# Robust variance (rad^2) of the change in turning angle at which smoothness drops to ~37 (100 / e);
+# clean letters, lines and circles stay above ~90, a 4 px tremor scores ~25
+ANGLE_VARIANCE_SCALE = 1.5
+# Smoothness reported when no stroke has enough points to measure
+DEFAULT_SMOOTHNESS = 85.0
+
+class StrokeArrays(NamedTuple):
+    """
+    Ragged columnar strokes: points of stroke i are x/y/t[offsets[i]:offsets[i + 1]].
+    Built once per payload; every metric below works on these flat arrays.
+    """
+    x: np.ndarray
+    y: np.ndarray
+    t: np.ndarray
+    offsets: np.ndarray
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+def as_stroke_arrays(strokes: Union[List[Dict], StrokeArrays]) -> StrokeArrays:
+    """Convert [{"points": [{"x", "y", "time"}, ...]}, ...] into StrokeArrays"""
+    if isinstance(strokes, StrokeArrays):
+        return strokes
+
+    point_lists = [stroke.get('points', []) for stroke in strokes]
+    offsets = np.zeros(len(point_lists) + 1, dtype=np.int64)
+    np.cumsum([len(points) for points in point_lists], out=offsets[1:])
+    flat = [p for points in point_lists for p in points]
+    # One typed column at a time; np.array over a list of (x, y, t) tuples is ~2x slower
+    n = len(flat)
+    x = np.fromiter(map(itemgetter('x'), flat), dtype=np.float64, count=n)
+    y = np.fromiter(map(itemgetter('y'), flat), dtype=np.float64, count=n)
+    try:
+        t = np.fromiter(map(itemgetter('time'), flat), dtype=np.float64, count=n)
+    except KeyError:
+        # Some clients omit timestamps
+        t = np.fromiter((p.get('time', 0) for p in flat), dtype=np.float64, count=n)
+    return StrokeArrays(x, y, t, offsets)
+
+def worksheet_strokes(strokes: Union[List[Dict], StrokeArrays]) -> Tuple[Union[List[Dict], StrokeArrays],
+                                                                          Optional[List[Optional[str]]]]:
     """
-    Input: [{"points": [{"x": 100, "y": 150, "time": 123}, ...]}, ...]
+    Game 3 sends one task per prompted letter, [{"letter": "b", "strokes": [...]}, ...].
+    Returns the flat stroke list and the prompted letter of each stroke (None for a
+    plain stroke list).
     """
-    if not strokes:
+    if isinstance(strokes, StrokeArrays) or not any('strokes' in item for item in strokes):
+        return strokes, None
+    flat, prompts = [], []
+    for item in strokes:
+        if 'strokes' in item:
+            task = item['strokes'] or []
+            flat.extend(task)
+            prompts.extend([item.get('letter')] * len(task))
+        else:
+            flat.append(item)
+            prompts.append(None)
+    return flat, prompts
+
+def analyze_handwriting(strokes: Union[List[Dict], StrokeArrays], language: str = 'en') -> Dict[str, Any]:
+    """
+    Input: [{"points": [{"x": 100, "y": 150, "time": 123}, ...]}, ...] (or StrokeArrays), or the
+    Game 3 task list [{"letter": "b", "strokes": [...]}, ...]
+    Stroke features are cached by payload hash, so re-scoring an unchanged worksheet skips extraction.
+    """
+    strokes, prompts = worksheet_strokes(strokes) if strokes else (strokes, None)
+    if not strokes or (isinstance(strokes, StrokeArrays) and strokes.count == 0):
         return {"error": "No stroke data provided"}
-    
-    # 1. Detect Reversals
-    reversals = detect_reversals(strokes, language)
-    
-    # 2. Detect Spacing Issues
-    spacing_issues = detect_spacing_issues(strokes)
-    
-    # 3. Smoothness
-    smoothness_score = calculate_smoothness(strokes)
-    
+
+    features = cached_features('handwriting', HANDWRITING_EXTRACTOR_VERSION, digest_json(strokes, language, prompts),
+                               lambda: extract_handwriting_features(strokes, language, prompts))
+    return summarize_handwriting(features)
+
+def extract_handwriting_features(strokes: Union[List[Dict], StrokeArrays], language: str = 'en',
+                                 prompts: Optional[Sequence[Optional[str]]] = None) -> Dict[str, Any]:
+    arrays = as_stroke_arrays(strokes)
+    return {
+        # 1. Detect Reversals
+        "reversals": int(detect_reversals(arrays, language, prompts)),
+        # 2. Horizontal gaps between consecutive strokes (for spacing issues)
+        "gaps": stroke_gaps(arrays),
+        # 3. Smoothness
+        "smoothness": float(calculate_smoothness(arrays))
+    }
+
+def summarize_handwriting(features: Dict[str, Any]) -> Dict[str, Any]:
+    """Handwriting metrics and scoring from extracted features"""
+    reversals = features['reversals']
+    spacing_issues = spacing_issues_from_gaps(features['gaps'])
+    smoothness_score = features['smoothness']
+
     # Scoring
     dyslexia_score = 0
     if reversals > 1:
@@ -25,7 +113,7 @@ def analyze_handwriting(strokes: List[Dict], language: str = 'en') -> Dict[str,
         dyslexia_score += 30
     if smoothness_score < 40:
         dyslexia_score += 20
-        
+
     return {
         "reversal_count": reversals,
         "spacing_issues": spacing_issues,
@@ -38,49 +126,125 @@ def analyze_handwriting(strokes: List[Dict], language: str = 'en') -> Dict[str,
         }
     }
 
-def detect_reversals(strokes: List[Dict], language: str) -> int:
-    reversals = 0
-    for stroke in strokes:
-        points = stroke.get('points', [])
-        if len(points) < 5: continue
-        
-        # Heuristic: Check gross direction vs expected direction for specific letters
-        # This requires knowing WHICH letter this stroke belongs to.
-        # Simplified Check: Detect if stroke is drawn Right-to-Left where not heavily expected?
-        x_start = points[0]['x']
-        x_end = points[-1]['x']
-        
-        if x_end < x_start - 20: # Strong Leftward movement
-             # Placeholder for complex 'b' vs 'd' logic which needs shape identification
-             pass 
-    return reversals
-
-def detect_spacing_issues(strokes: List[Dict]) -> int:
-    if len(strokes) < 2: return 0
-    
-    # Calculate horizontal gaps between consecutive strokes
-    gaps = []
-    for i in range(1, len(strokes)):
-        # End of prev stroke
-        prev_points = strokes[i-1].get('points', [])
-        if not prev_points: continue
-        prev_max_x = max(p['x'] for p in prev_points)
-        
-        # Start of curr stroke
-        curr_points = strokes[i].get('points', [])
-        if not curr_points: continue
-        curr_min_x = min(p['x'] for p in curr_points)
-        
-        gap = curr_min_x - prev_max_x
-        if gap > 0: gaps.append(gap)
-        
-    if not gaps: return 0
-    
+def stroke_bounds(strokes: Union[List[Dict], StrokeArrays]) -> Dict[str, np.ndarray]:
+    """Per-stroke bounding boxes and a mask of non-empty strokes (boxes of empty strokes are NaN)"""
+    arrays = as_stroke_arrays(strokes)
+    nonempty = arrays.lengths > 0
+    bounds = {name: np.full(arrays.count, np.nan) for name in ('min_x', 'max_x', 'min_y', 'max_y')}
+    if not nonempty.any():
+        return {**bounds, "nonempty": nonempty}
+
+    # reduceat over the start of each non-empty stroke spans exactly that stroke's points
+    starts = arrays.offsets[:-1][nonempty]
+    bounds['min_x'][nonempty] = np.minimum.reduceat(arrays.x, starts)
+    bounds['max_x'][nonempty] = np.maximum.reduceat(arrays.x, starts)
+    bounds['min_y'][nonempty] = np.minimum.reduceat(arrays.y, starts)
+    bounds['max_y'][nonempty] = np.maximum.reduceat(arrays.y, starts)
+    return {**bounds, "nonempty": nonempty}
+
+def stroke_directions(strokes: Union[List[Dict], StrokeArrays]) -> np.ndarray:
+    """Net horizontal displacement (x_end - x_start) per stroke; 0 for empty strokes"""
+    arrays = as_stroke_arrays(strokes)
+    nonempty = arrays.lengths > 0
+    dx = np.zeros(arrays.count)
+    dx[nonempty] = arrays.x[arrays.offsets[1:][nonempty] - 1] - arrays.x[arrays.offsets[:-1][nonempty]]
+    return dx
+
+def detect_reversals(strokes: Union[List[Dict], StrokeArrays], language: str,
+                     prompts: Optional[Sequence[Optional[str]]] = None) -> int:
+    """
+    Strokes written as the mirror image of a letter or digit (template matching, see
+    reversal_detection_service). `prompts`: the letter each stroke was meant to be, if known.
+    """
+    # Imported here: numba is slow to import and only handwriting needs it
+    from app.services.reversal_detection_service import reversed_strokes
+
+    arrays = as_stroke_arrays(strokes)
+    if arrays.count == 0:
+        return 0
+    return int(np.count_nonzero(reversed_strokes(arrays.x, arrays.y, arrays.offsets, language, prompts)))
+
+def detect_spacing_issues(strokes: Union[List[Dict], StrokeArrays]) -> int:
+    return spacing_issues_from_gaps(stroke_gaps(strokes))
+
+def stroke_gaps(strokes: Union[List[Dict], StrokeArrays]) -> np.ndarray:
+    """Positive horizontal gaps between consecutive non-empty strokes"""
+    arrays = as_stroke_arrays(strokes)
+    if arrays.count < 2:
+        return np.zeros(0)
+
+    # Start of curr stroke minus end (max x) of prev stroke; pairs with an empty stroke are skipped
+    bounds = stroke_bounds(arrays)
+    pair_ok = bounds['nonempty'][1:] & bounds['nonempty'][:-1]
+    gaps = bounds['min_x'][1:][pair_ok] - bounds['max_x'][:-1][pair_ok]
+    return gaps[gaps > 0]
+
+def spacing_issues_from_gaps(gaps) -> int:
+    if len(gaps) == 0: return 0
+
+    gaps = np.asarray(gaps, dtype=np.float64)
     mean_gap = np.mean(gaps)
     # Count gaps that vary > 50% from mean
-    issues = sum(1 for g in gaps if abs(g - mean_gap) > mean_gap * 0.5)
-    return issues
+    return int(np.count_nonzero(np.abs(gaps - mean_gap) > mean_gap * 0.5))
+
+def resample_by_arc_length(strokes: Union[List[Dict], StrokeArrays], step: float = RESAMPLE_STEP_PX) -> StrokeArrays:
+    """Points every `step` pixels of arc length along each stroke (t left at 0); strokes shorter than step keep one point"""
+    arrays = as_stroke_arrays(strokes)
+    lengths = arrays.lengths
+    if len(arrays.x) == 0:
+        return arrays
+
+    stroke_id = np.repeat(np.arange(arrays.count), lengths)
+    segment = np.hypot(np.diff(arrays.x), np.diff(arrays.y))
+    # A `step`-long gap between strokes keeps the flat arc-length axis increasing across them
+    segment[stroke_id[1:] != stroke_id[:-1]] = step
+    arc = np.concatenate(([0.0], np.cumsum(segment)))
+
+    nonempty = lengths > 0
+    start = arc[arrays.offsets[:-1][nonempty]]
+    total = arc[arrays.offsets[1:][nonempty] - 1] - start
+    counts = np.zeros(arrays.count, dtype=np.int64)
+    counts[nonempty] = np.floor(total / step).astype(np.int64) + 1
+    offsets = np.zeros(arrays.count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    # Sample k of a stroke sits at its start + k * step
+    k = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)
+    target = np.repeat(start, counts[nonempty]) + k * step
+    return StrokeArrays(np.interp(target, arc, arrays.x), np.interp(target, arc, arrays.y),
+                        np.zeros(offsets[-1]), offsets)
+
+def _turns(arrays: StrokeArrays):
+    """(turning angles, stroke index of each) between consecutive segments within each stroke"""
+    stroke_id = np.repeat(np.arange(arrays.count), arrays.lengths)
+    dx, dy = np.diff(arrays.x), np.diff(arrays.y)
+    # Segments must stay inside one stroke and have non-zero length (repeated samples carry no heading)
+    valid = (stroke_id[1:] == stroke_id[:-1]) & ((dx != 0) | (dy != 0))
+    heading = np.arctan2(dy[valid], dx[valid])
+    segment_stroke = stroke_id[:-1][valid]
+
+    same_stroke = segment_stroke[1:] == segment_stroke[:-1]
+    turn = np.diff(heading)[same_stroke]
+    return (turn + np.pi) % (2 * np.pi) - np.pi, segment_stroke[1:][same_stroke]
+
+def turning_angles(strokes: Union[List[Dict], StrokeArrays]) -> np.ndarray:
+    """Heading change (radians, wrapped to [-pi, pi)) between consecutive RESAMPLE_STEP_PX segments within each stroke"""
+    arrays = resample_by_arc_length(strokes)
+    if len(arrays.x) < 3:
+        return np.zeros(0)
+    return _turns(arrays)[0]
 
-def calculate_smoothness(strokes: List[Dict]) -> float:
-    # Check for jittery movement (high variance in angle changes)
-    return 85.0 # Placeholder average
+def calculate_smoothness(strokes: Union[List[Dict], StrokeArrays]) -> float:
+    # Check for jittery movement: lines and arcs turn by a steady amount, so the change in
+    # turning angle stays near 0, while tremor alternates sharp left/right turns. Its spread is
+    # taken as a scaled median absolute deviation, so the few deliberate cusps and corners of
+    # letters are outliers rather than the bulk of the measure.
+    arrays = resample_by_arc_length(strokes)
+    if len(arrays.x) < 4:
+        return DEFAULT_SMOOTHNESS
+    turn, stroke = _turns(arrays)
+    change = np.diff(turn)[stroke[1:] == stroke[:-1]]
+    if len(change) < 2:
+        return DEFAULT_SMOOTHNESS
+    spread = 1.4826 * np.median(np.abs(change - np.median(change)))
+    return float(100.0 * np.exp(-spread ** 2 / ANGLE_VARIANCE_SCALE))
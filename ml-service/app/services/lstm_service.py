@@ -1,74 +1,224 @@
+import asyncio
 import numpy as np
-# from tensorflow import keras
-import joblib
-import pandas as pd
-from typing import List, Dict, Any
-from app.utils.model_loader import get_model
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from app.config import settings
+from app.utils.model_loader import get_model, MODELS, MODEL_STATS
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.cache import TTLLRUCache, TieredCache, InMemorySharedBackend, fingerprint
+from app.utils.metrics import timed_stage
+from datetime import datetime
+
+# Input layout used by ml-training/scripts/train_lstm.py
+FEATURES = ['hour', 'day_of_week', 'sleep_hours', 'prev_task_difficulty', 'time_since_break', 'attention_score']
+HOUR, DAY_OF_WEEK, SCORE = 0, 1, 5
+SEQUENCE_LENGTH = 20
+# Defaults for optional history fields
+FEATURE_DEFAULTS = {'sleep_hours': 7.5, 'prev_task_difficulty': 2, 'time_since_break': 30}
 
 def predict_attention(attention_history: List[Dict[str, Any]], horizon_hours: int = 48) -> Dict[str, Any]:
     """
     Predict next `horizon_hours` of attention scores.
+    Uses the LSTM when the model and scaler are available, else the heuristic simulation.
     """
-    model = get_model('lstm_attention')
-    
-    # Fallback if model failed to load or is placeholder
-    # In this prototype, we default to the heuristic simulation to ensure valid responses
-    # real model inference would go here if trained .h5 existed
-    
     try:
-        # scaler = joblib.load('app/ml_models/lstm_scaler.pkl') # If exists
-        
-        # MOCKING INPUT CONSTRUCTION FOR ROBUSTNESS
-        # In real-app, we would parse `attention_history` strictly
-        
-        # Get start date from last history item or default to now
-        if attention_history and 'date' in attention_history[-1]:
-             current_date = datetime.fromisoformat(attention_history[-1]['date'])
-        else:
-             current_date = datetime.now()
-        
-        predictions = []
-        
-        # Heuristic Logic
-        base_score = 75 # Average
-        for i in range(horizon_hours):
-            next_time = current_date + timedelta(hours=i+1)
-            hour = next_time.hour
-            
-            # Heuristic simulation of LSTM output
-            pred_score = base_score
-            # Morning peak
-            if 9 <= hour <= 11: pred_score += 10
-            # Afternoon dip
-            if 14 <= hour <= 16: pred_score -= 15
-            # Evening recovery/dip
-            if hour >= 20: pred_score -= 10
-            
-            # Add some noise
-            pred_score += (i % 3) * 2 
-            
-            predictions.append({
-                "hour": next_time.isoformat(),
-                "predicted_attention": round(max(0, min(100, pred_score)), 2),
-                "confidence_interval": [pred_score-5, pred_score+5]
-            })
-            
-        return {
-            "predictions": predictions,
-            "recommendations": generate_recommendations(predictions),
-            "model_version": "lstm-v1 (simulated)"
-        }
+        current_date = forecast_start(attention_history)
+        window = history_to_window(attention_history)
+        model, scaler = get_model('lstm_attention'), get_model('lstm_scaler')
+
+        if window is not None and model is not None and scaler is not None:
+            scores = forecast_batch(model, scaler, window[None], horizon_hours)[0]
+            return build_forecast(current_date, scores, lstm_model_version())
+        return build_forecast(current_date, heuristic_scores(current_date, horizon_hours), "lstm-v1 (simulated)")
 
     except Exception as e:
         print(f"LSTM Prediction Error: {e}")
         return fallback_prediction(horizon_hours)
 
+async def predict_attention_async(attention_history: List[Dict[str, Any]], horizon_hours: int = 48) -> Dict[str, Any]:
+    """
+    Same result as predict_attention, but LSTM rollouts from concurrent requests are
+    coalesced by the micro-batcher into one forward pass per step.
+    """
+    try:
+        current_date = forecast_start(attention_history)
+        window = history_to_window(attention_history)
+        scores = None
+        if window is not None and await _lstm_available():
+            scores = await attention_batcher.submit((window, horizon_hours))
+
+        if scores is None:
+            return build_forecast(current_date, heuristic_scores(current_date, horizon_hours), "lstm-v1 (simulated)")
+        return build_forecast(current_date, scores, lstm_model_version())
+
+    except Exception as e:
+        print(f"LSTM Prediction Error: {e}")
+        return fallback_prediction(horizon_hours)
+
+forecast_cache = TieredCache(
+    TTLLRUCache(settings.FORECAST_CACHE_MAX_ENTRIES, settings.FORECAST_CACHE_TTL_SECONDS),
+    InMemorySharedBackend() if settings.FORECAST_CACHE_SHARED_BACKEND == 'memory' else None
+)
+
+def forecast_cache_key(student_id: str, attention_history: List[Dict[str, Any]], horizon_hours: int) -> str:
+    # The forecast only depends on the last SEQUENCE_LENGTH rows (model window + start date);
+    # the model version keeps hot-reloaded models from serving stale entries
+    model_version = MODEL_STATS.get('lstm_attention', {}).get('version')
+    return fingerprint(student_id, attention_history[-SEQUENCE_LENGTH:], horizon_hours, model_version)
+
+async def predict_attention_cached(student_id: str, attention_history: List[Dict[str, Any]],
+                                   horizon_hours: int = 48) -> Dict[str, Any]:
+    """predict_attention_async behind the forecast cache, for repeated dashboard polls"""
+    # Without a dated last entry the forecast starts at now(), so it is not cacheable
+    cacheable = bool(attention_history) and 'date' in attention_history[-1]
+    key = forecast_cache_key(student_id, attention_history, horizon_hours) if cacheable else None
+
+    if key is not None:
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = await predict_attention_async(attention_history, horizon_hours)
+    if key is not None and 'error' not in result:
+        forecast_cache.set(key, result)
+    return result
+
+async def _lstm_available() -> bool:
+    # First use loads the model; keep that off the event loop
+    if 'lstm_attention' not in MODELS or 'lstm_scaler' not in MODELS:
+        await asyncio.to_thread(lambda: (get_model('lstm_attention'), get_model('lstm_scaler')))
+    return MODELS.get('lstm_attention') is not None and MODELS.get('lstm_scaler') is not None
+
+def lstm_model_version() -> str:
+    return f"lstm-v1 ({MODEL_STATS.get('lstm_attention', {}).get('version', 'unknown')})"
+
+def forecast_start(attention_history: List[Dict[str, Any]]) -> datetime:
+    # Get start date from last history item or default to now
+    if attention_history and 'date' in attention_history[-1]:
+        return datetime.fromisoformat(attention_history[-1]['date'])
+    return datetime.now()
+
+def history_to_window(attention_history: List[Dict[str, Any]], sequence_length: int = SEQUENCE_LENGTH) -> Optional[np.ndarray]:
+    """
+    Build the (sequence_length, len(FEATURES)) model input from the history tail.
+    Short histories are front-padded with their first row. None if no scores are present.
+    """
+    rows = []
+    for item in attention_history[-sequence_length:]:
+        score = item.get('attention_score', item.get('score'))
+        if score is None:
+            continue
+        when = datetime.fromisoformat(item['date']) if 'date' in item else None
+        rows.append((
+            item.get('hour', when.hour if when else 12),
+            item.get('day_of_week', when.weekday() if when else 0),
+            item.get('sleep_hours', FEATURE_DEFAULTS['sleep_hours']),
+            item.get('prev_task_difficulty', FEATURE_DEFAULTS['prev_task_difficulty']),
+            item.get('time_since_break', FEATURE_DEFAULTS['time_since_break']),
+            score
+        ))
+    if not rows:
+        return None
+
+    window = np.array(rows, dtype=np.float64)
+    if len(window) < sequence_length:
+        pad = np.repeat(window[:1], sequence_length - len(window), axis=0)
+        window = np.concatenate((pad, window))
+    return window
+
+def _forward(model, x: np.ndarray) -> np.ndarray:
+    if hasattr(model, 'predict_on_batch'):
+        return np.asarray(model.predict_on_batch(x))
+    return np.asarray(model(x))
+
+@timed_stage('attention.lstm_rollout')
+def forecast_batch(model, scaler, windows: np.ndarray, horizon_hours: int) -> np.ndarray:
+    """
+    Autoregressive rollout for a batch of students: (B, L, F) windows -> (B, horizon) scores.
+    Each step is one forward pass over the whole batch; the predicted score is fed
+    back as the next input row with the clock advanced by one hour.
+    """
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    seq = np.array(windows, dtype=np.float64)
+    batch = seq.shape[0]
+    out = np.empty((batch, horizon_hours))
+
+    for step in range(horizon_hours):
+        x = ((seq - mean) / scale).astype(np.float32)
+        pred = _forward(model, x).reshape(batch)
+        out[:, step] = pred
+
+        nxt = seq[:, -1, :].copy()
+        nxt[:, HOUR] = (nxt[:, HOUR] + 1) % 24
+        nxt[:, DAY_OF_WEEK] = (nxt[:, DAY_OF_WEEK] + (nxt[:, HOUR] == 0)) % 7
+        nxt[:, SCORE] = np.clip(pred, 0, 100)
+        seq[:, :-1] = seq[:, 1:]
+        seq[:, -1] = nxt
+    return out
+
+def _forecast_items(items: List[Tuple[np.ndarray, int]]) -> List[Optional[np.ndarray]]:
+    """Micro-batcher callback: one rollout for all queued requests, sliced per horizon"""
+    model, scaler = get_model('lstm_attention'), get_model('lstm_scaler')
+    if model is None or scaler is None:
+        return [None] * len(items)
+    windows = np.stack([window for window, _ in items])
+    scores = forecast_batch(model, scaler, windows, max(h for _, h in items))
+    return [scores[i, :h] for i, (_, h) in enumerate(items)]
+
+attention_batcher = MicroBatcher(
+    _forecast_items,
+    max_batch_size=settings.ATTENTION_BATCH_MAX_SIZE,
+    max_wait_ms=settings.ATTENTION_BATCH_MAX_WAIT_MS,
+    name="attention"
+)
+
+def _forecast_hours(current_date: datetime, horizon_hours: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hour-of-day and isoformat labels for the next horizon_hours, vectorized"""
+    naive = current_date.replace(tzinfo=None)
+    times = np.datetime64(naive, 'us') + np.arange(1, horizon_hours + 1).astype('timedelta64[h]')
+    hours = times.astype('datetime64[h]').astype(np.int64) % 24
+    labels = np.datetime_as_string(times, unit='us' if naive.microsecond else 's')
+    # Keep the UTC offset suffix datetime.isoformat() would add
+    tz_suffix = current_date.isoformat()[len(naive.isoformat()):]
+    if tz_suffix:
+        labels = np.char.add(labels, tz_suffix)
+    return hours, labels
+
+@timed_stage('attention.heuristic')
+def heuristic_scores(current_date: datetime, horizon_hours: int) -> np.ndarray:
+    """Heuristic simulation of LSTM output"""
+    hours, _ = _forecast_hours(current_date, horizon_hours)
+    base_score = 75 # Average
+    scores = np.full(horizon_hours, base_score, dtype=np.float64)
+    # Morning peak
+    scores += np.where((hours >= 9) & (hours <= 11), 10, 0)
+    # Afternoon dip
+    scores -= np.where((hours >= 14) & (hours <= 16), 15, 0)
+    # Evening recovery/dip
+    scores -= np.where(hours >= 20, 10, 0)
+    # Add some noise
+    scores += (np.arange(horizon_hours) % 3) * 2
+    return scores
+
+@timed_stage('attention.build_forecast')
+def build_forecast(current_date: datetime, scores: np.ndarray, model_version: str) -> Dict[str, Any]:
+    _, labels = _forecast_hours(current_date, len(scores))
+    clipped = np.round(np.clip(scores, 0, 100), 2).tolist()
+    predictions = [
+        {"hour": hour, "predicted_attention": pred, "confidence_interval": [raw - 5, raw + 5]}
+        for hour, pred, raw in zip(labels.tolist(), clipped, np.asarray(scores, dtype=np.float64).tolist())
+    ]
+    return {
+        "predictions": predictions,
+        "recommendations": generate_recommendations(predictions),
+        "model_version": model_version
+    }
+
 def generate_recommendations(predictions: List[Dict]) -> Dict:
     # Identify high/low blocks
     highs = [p['hour'] for p in predictions if p['predicted_attention'] > 80]
     lows = [p['hour'] for p in predictions if p['predicted_attention'] < 60]
-    
+
     return {
         "optimal_schedule": {
             "best_times_for_math": highs[:3],
@@ -80,7 +230,7 @@ def generate_recommendations(predictions: List[Dict]) -> Dict:
 
 def fallback_prediction(horizon: int) -> Dict:
     return {
-        "predictions": [], 
+        "predictions": [],
         "error": "Model unavailable",
         "model_version": "fallback"
     }
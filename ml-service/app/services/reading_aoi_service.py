@@ -0,0 +1,240 @@
+"""
+Word-level areas of interest (AOIs) for reading passages.
+
+A passage is its word bounding boxes in reading order (word_index = position).
+PassageIndex groups the boxes into text lines and keeps the words sorted by
+(line, x), so a whole array of fixations is mapped to words with two
+searchsorted calls: one over line bands, one over the combined (line, x) keys.
+
+Passages repeat across thousands of students, so indexes are kept in a
+per-process LRU keyed by passage id and persisted under PASSAGE_DIR. A passage
+registered once (PUT /api/ml/screening/passages/{id}, admin token required) is
+available to every worker process, and later requests only need to carry the id.
+word_boxes sent with a request are indexed for that request alone: they are in
+the client's screen pixels and must not replace the shared layout.
+"""
+import os
+import re
+import tempfile
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PASSAGE_ID = re.compile(r'^[A-Za-z0-9_.-]{1,128}$')
+# Fixations this far outside a word box (px) still count as on the word
+AOI_MARGIN_PX = 8.0
+
+def word_boxes_array(word_boxes: Union[Sequence[Any], np.ndarray]) -> np.ndarray:
+    """
+    (n, 4) float64 [x0, y0, x1, y1] from [{"x", "y", "width", "height"}, ...]
+    or [[x, y, width, height], ...] (DOMRect order)
+    """
+    if isinstance(word_boxes, np.ndarray) and word_boxes.ndim == 2 and word_boxes.shape[1] == 4:
+        return word_boxes.astype(np.float64, copy=False)
+    if len(word_boxes) and isinstance(word_boxes[0], dict):
+        rows = [(b['x'], b['y'], b['width'], b['height']) for b in word_boxes]
+    else:
+        rows = word_boxes
+    boxes = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    if np.any(boxes[:, 2:] < 0):
+        raise ValueError("Word boxes must have non-negative width and height")
+    boxes[:, 2:] += boxes[:, :2]
+    return boxes
+
+class PassageIndex:
+    """Sorted-interval spatial index over one passage's word boxes"""
+
+    def __init__(self, boxes: np.ndarray, margin: float = AOI_MARGIN_PX):
+        self.boxes = boxes
+        self.margin = margin
+        n = len(boxes)
+        if n == 0:
+            raise ValueError("Passage has no words")
+
+        # Lines: words whose vertical centers are within half a (median) word height
+        centers = (boxes[:, 1] + boxes[:, 3]) / 2
+        order = np.argsort(centers, kind='stable')
+        height = max(float(np.median(boxes[:, 3] - boxes[:, 1])), 1.0)
+        new_line = np.concatenate(([True], np.diff(centers[order]) > height / 2))
+        line_of = np.empty(n, dtype=np.int64)
+        line_of[order] = np.cumsum(new_line) - 1
+        self.line_count = int(line_of.max()) + 1
+        self.line_top = np.full(self.line_count, np.inf)
+        self.line_bottom = np.full(self.line_count, -np.inf)
+        np.minimum.at(self.line_top, line_of, boxes[:, 1])
+        np.maximum.at(self.line_bottom, line_of, boxes[:, 3])
+        # Band edges halfway between lines, so the vertical margin never overlaps the next line
+        self.band_edges = (self.line_bottom[:-1] + self.line_top[1:]) / 2
+
+        # Words sorted by (line, x0); key = line * stride + x0 keeps lines apart
+        self.stride = float(boxes[:, 2].max() - boxes[:, 0].min()) + 4 * margin + 1
+        self.origin = float(boxes[:, 0].min()) - 2 * margin
+        by_position = np.lexsort((boxes[:, 0], line_of))
+        self.sorted_words = by_position
+        self.sorted_line = line_of[by_position]
+        self.sorted_keys = self.sorted_line * self.stride + (boxes[by_position, 0] - margin - self.origin)
+        self.sorted_right = boxes[by_position, 2] + margin
+
+    @property
+    def word_count(self) -> int:
+        return len(self.boxes)
+
+    def lookup(self, xy: np.ndarray) -> np.ndarray:
+        """Word index for each (x, y) point, -1 when it falls on no word"""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        x, y = xy[:, 0], xy[:, 1]
+        line = np.searchsorted(self.band_edges, y)
+        on_line = (y >= self.line_top[line] - self.margin) & (y <= self.line_bottom[line] + self.margin)
+
+        keys = line * self.stride + (x - self.origin)
+        pos = np.searchsorted(self.sorted_keys, keys, side='right') - 1
+        pos_safe = np.maximum(pos, 0)
+        hit = (on_line & (pos >= 0) & (self.sorted_line[pos_safe] == line)
+               & (x <= self.sorted_right[pos_safe]))
+        return np.where(hit, self.sorted_words[pos_safe], -1)
+
+def reading_measures(words: np.ndarray, durations: np.ndarray, word_count: int) -> Dict[str, Any]:
+    """
+    Standard word-level reading measures from a fixation sequence.
+    `words` is the word index per fixation (-1 = off text), in time order.
+
+    A first-pass visit is a run of fixations on a word entered for the first time
+    while no later word has been fixated yet. first fixation / gaze duration come
+    from that run; a word passed over before its first-pass visit counts as
+    skipped (words after the furthest fixated one are "not reached", not skipped).
+    Regressions are transitions to an earlier word, so return sweeps to the next
+    line (which move left on screen) are not counted.
+    """
+    on_text = words >= 0
+    w = words[on_text].astype(np.int64)
+    d = durations[on_text].astype(np.float64)
+    zeros = np.zeros(word_count)
+
+    if len(w) == 0:
+        first_fixation = gaze = total = zeros
+        fixation_count = regressions_in = regressions_out = np.zeros(word_count, dtype=np.int64)
+        skipped = np.zeros(word_count, dtype=bool)
+        reached_count = 0
+    else:
+        # Runs of consecutive fixations on the same word
+        starts = np.flatnonzero(np.concatenate(([True], w[1:] != w[:-1])))
+        run_word = w[starts]
+        run_duration = np.add.reduceat(d, starts)
+        run_first = d[starts]
+
+        furthest_before = np.concatenate(([-1], np.maximum.accumulate(run_word)[:-1]))
+        first_pass = run_word > furthest_before
+        first_fixation = zeros.copy()
+        gaze = zeros.copy()
+        first_fixation[run_word[first_pass]] = run_first[first_pass]
+        gaze[run_word[first_pass]] = run_duration[first_pass]
+
+        total = np.bincount(w, weights=d, minlength=word_count)
+        fixation_count = np.bincount(w, minlength=word_count)
+
+        regression = run_word[1:] < run_word[:-1]
+        regressions_out = np.bincount(run_word[:-1][regression], minlength=word_count)
+        regressions_in = np.bincount(run_word[1:][regression], minlength=word_count)
+
+        reached_count = int(run_word.max()) + 1
+        visited_first_pass = np.zeros(word_count, dtype=bool)
+        visited_first_pass[run_word[first_pass]] = True
+        skipped = (np.arange(word_count) < reached_count) & ~visited_first_pass
+
+    fixated = first_fixation > 0
+    return {
+        "word_count": word_count,
+        "fixations_on_text": int(len(w)),
+        "fixations_off_text": int(np.count_nonzero(~on_text)),
+        "regression_count": int(regressions_out.sum()),
+        "skip_count": int(skipped.sum()),
+        "skip_rate": round(float(skipped.sum()) / reached_count, 4) if reached_count else 0.0,
+        "mean_first_fixation_ms": float(first_fixation[fixated].mean()) if fixated.any() else 0.0,
+        "mean_gaze_duration_ms": float(gaze[fixated].mean()) if fixated.any() else 0.0,
+        "per_word": {
+            "first_fixation_ms": first_fixation.tolist(),
+            "gaze_duration_ms": gaze.tolist(),
+            "total_time_ms": total.tolist(),
+            "fixation_count": fixation_count.tolist(),
+            "regressions_in": regressions_in.tolist(),
+            "regressions_out": regressions_out.tolist(),
+            "skipped": skipped.tolist()
+        }
+    }
+
+# --- Per-process passage cache backed by PASSAGE_DIR ---
+
+_passages: "OrderedDict[str, PassageIndex]" = OrderedDict()
+_passages_lock = threading.Lock()
+
+def _passage_path(passage_id: str) -> str:
+    if not _PASSAGE_ID.match(passage_id):
+        raise ValueError(f"Invalid passage id: {passage_id!r}")
+    return os.path.join(settings.PASSAGE_DIR, f"{passage_id}.npy")
+
+def _remember(passage_id: str, index: PassageIndex):
+    with _passages_lock:
+        _passages[passage_id] = index
+        _passages.move_to_end(passage_id)
+        while len(_passages) > settings.PASSAGE_CACHE_MAX_ENTRIES:
+            _passages.popitem(last=False)
+
+def _persist(passage_id: str, boxes: np.ndarray):
+    """Atomic write, so other workers never load a partial file"""
+    if not settings.PASSAGE_DIR:
+        return
+    os.makedirs(settings.PASSAGE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.PASSAGE_DIR, prefix='.passage-', suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, boxes)
+    os.replace(tmp_path, _passage_path(passage_id))
+
+def register_passage(passage_id: str, word_boxes: Union[Sequence[Any], np.ndarray]) -> PassageIndex:
+    """Build, cache and persist the index for a passage (replacing any previous layout)"""
+    _passage_path(passage_id)  # validates the id
+    index = PassageIndex(word_boxes_array(word_boxes))
+    _persist(passage_id, index.boxes)
+    _remember(passage_id, index)
+    return index
+
+def passage_index(passage_id: Optional[str], word_boxes: Optional[Sequence[Any]] = None) -> Optional[PassageIndex]:
+    """
+    Index for a request's passage. word_boxes sent with the request are in that client's
+    screen pixels, so they get a throwaway index for this request only and never touch
+    the registered layout (only register_passage, i.e. the admin PUT, does). Otherwise
+    the registered passage_id: from the process cache, else PASSAGE_DIR. None if unknown.
+    """
+    if word_boxes:
+        try:
+            return PassageIndex(word_boxes_array(word_boxes))
+        except (ValueError, KeyError, TypeError) as e:
+            # A bad client layout only costs the word-level measures; fall back to the
+            # registered passage, else the samples' word_index
+            logger.warning(f"Ignoring malformed word_boxes: {e}")
+    if passage_id is None:
+        return None
+
+    with _passages_lock:
+        index = _passages.get(passage_id)
+        if index is not None:
+            _passages.move_to_end(passage_id)
+    if index is None and settings.PASSAGE_DIR:
+        try:
+            index = PassageIndex(np.load(_passage_path(passage_id)))
+            _remember(passage_id, index)
+        except FileNotFoundError:
+            pass
+    return index
+
+def passage_summary(passage_id: str, index: PassageIndex) -> Dict[str, Any]:
+    return {"passage_id": passage_id, "word_count": index.word_count, "line_count": index.line_count}
+
+def forget_passages():
+    """Drop the in-process cache (files in PASSAGE_DIR are kept)"""
+    with _passages_lock:
+        _passages.clear()
@@ -0,0 +1,233 @@
+"""
+Letter and digit reversal detection by template matching.
+
+Every stroke is resampled to RESAMPLE_POINTS points and matched against a
+template bank with banded DTW (app/utils/dtw.py). The bank holds the pen
+trajectories of each glyph in its common stroke orders, each also traced end
+to start, a few slant and width variants of each, and the horizontally
+mirrored copy of all of them. A stroke whose closest template is a mirrored
+one, within MATCH_THRESHOLD, counts as a reversal.
+
+A reversal is a matter of the drawn shape, not of how it was drawn: the
+mirror of a stem-first "b" is a correctly shaped "d" written stem first.
+Mirrored templates that DTW cannot tell apart from some correct template, in
+any stroke order or direction (symmetric shapes, or a mirror that is itself a
+glyph, like b/d/p/q) are dropped when the bank is built, so they can never
+produce a reversal.
+Plain shapes (circles, lines) are in the bank as correct templates so that
+strokes of other letters have somewhere to land.
+
+When the letter the student was asked to copy is known (the Game 3 worksheet
+prompt), that decides instead: a stroke is reversed when it is closest to the
+prompt's mirror image, i.e. a mirrored template of the prompt or a correct
+template of its MIRROR_PARTNERS glyph (a "d" drawn for "b"). Strokes that
+land on anything else (the headline, a stem, another letter) are not.
+
+Banks are built once per process per language (LANGUAGE_SCRIPTS) and cached.
+Glyphs are described by a single stroke of control curves in a unit box,
+screen coordinates (y down).
+"""
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.utils.dtw import resample_strokes, envelopes, nearest_templates
+
+RESAMPLE_POINTS = 32
+DTW_WINDOW = 4  # Sakoe-Chiba band, in resampled points
+# Mean squared distance per point (normalized units) below which a stroke matches a template
+MATCH_THRESHOLD = 0.006
+# Strokes shorter than this many points, or smaller than this (px), are dots or noise
+MIN_STROKE_POINTS = 5
+MIN_STROKE_EXTENT = 8.0
+
+SLANTS = (-0.2, 0.0, 0.2)  # x shear per unit of height
+WIDTHS = (0.8, 1.0, 1.25)
+
+def _line(*points) -> np.ndarray:
+    return np.concatenate([np.linspace(a, b, 12, endpoint=False) for a, b in zip(points, points[1:])]
+                          + [np.array(points[-1:], dtype=np.float64)])
+
+def _arc(cx: float, cy: float, rx: float, ry: float, start: float, end: float) -> np.ndarray:
+    """Elliptical arc; angles grow clockwise on screen (0 = right, pi/2 = bottom)"""
+    a = np.linspace(start, end, max(8, int(abs(end - start) * 8)))
+    return np.column_stack((cx + rx * np.cos(a), cy + ry * np.sin(a)))
+
+def _path(*parts: np.ndarray) -> np.ndarray:
+    return np.concatenate(parts)
+
+PI = np.pi
+
+# name -> list of accepted single-stroke trajectories
+LATIN_GLYPHS: Dict[str, List[np.ndarray]] = {
+    # b/d/p/q in both common stroke orders (stem first, bowl first): each one's mirror is
+    # another of them, so a single stroke of these can never be told apart from a reversal
+    'b': [_path(_line((0, 0), (0, 1), (0, 0.6)), _arc(0.3, 0.8, 0.3, 0.2, PI, 3 * PI)),
+          _path(_arc(0.3, 0.8, 0.3, 0.2, PI, 3 * PI), _line((0, 0.8), (0, 0), (0, 1)))],
+    'd': [_path(_arc(0.3, 0.8, 0.3, 0.2, 0, -2 * PI), _line((0.6, 0.8), (0.6, 0), (0.6, 1))),
+          _path(_line((0.6, 0), (0.6, 1), (0.6, 0.6)), _arc(0.3, 0.8, 0.3, 0.2, 0, -2 * PI))],
+    'p': [_path(_line((0, 0), (0, 1), (0, 0.2)), _arc(0.3, 0.2, 0.3, 0.2, PI, 3 * PI)),
+          _path(_arc(0.3, 0.2, 0.3, 0.2, PI, 3 * PI), _line((0, 0.2), (0, 0), (0, 1)))],
+    'q': [_path(_arc(0.3, 0.2, 0.3, 0.2, 0, -2 * PI), _line((0.6, 0.2), (0.6, 0), (0.6, 1))),
+          _path(_line((0.6, 0), (0.6, 1), (0.6, 0.2)), _arc(0.3, 0.2, 0.3, 0.2, 0, -2 * PI))],
+    'c': [_arc(0.5, 0.5, 0.5, 0.5, -PI / 4, -7 * PI / 4)],
+    'e': [_path(_line((0.05, 0.5), (0.95, 0.5)), _arc(0.5, 0.5, 0.45, 0.5, 0, -7 * PI / 4))],
+    's': [_path(_arc(0.3, 0.25, 0.3, 0.25, -PI / 6, -3 * PI / 2), _arc(0.3, 0.75, 0.3, 0.25, -PI / 2, 5 * PI / 6))],
+    'z': [_line((0, 0), (1, 0), (0, 1), (1, 1))],
+    'j': [_path(_line((0.6, 0), (0.6, 0.8)), _arc(0.3, 0.8, 0.3, 0.2, 0, PI))],
+    'r': [_path(_line((0, 0.3), (0, 1), (0, 0.55)), _arc(0.35, 0.55, 0.35, 0.25, PI, 1.8 * PI))],
+    'k': [_line((0, 0), (0, 1), (0, 0.6), (0.6, 0.2), (0.15, 0.55), (0.6, 1))],
+    '2': [_path(_arc(0.5, 0.3, 0.45, 0.3, 7 * PI / 6, 2 * PI + PI / 4), _line((0.82, 0.51), (0, 1), (1, 1)))],
+    '3': [_path(_arc(0.5, 0.25, 0.45, 0.25, -5 * PI / 6, PI / 2), _arc(0.5, 0.75, 0.45, 0.25, -PI / 2, 5 * PI / 6))],
+    '4': [_line((0.6, 0), (0, 0.7), (1, 0.7), (0.7, 0.7), (0.7, 0.35), (0.7, 1))],
+    '5': [_path(_line((0.9, 0), (0.15, 0), (0.1, 0.45)), _arc(0.5, 0.7, 0.45, 0.3, -PI * 0.85, PI * 0.8))],
+    '6': [_path(_arc(0.5, 0.5, 0.45, 0.5, -PI / 3, -PI), _arc(0.5, 0.72, 0.45, 0.28, PI, 3 * PI))],
+    '7': [_line((0, 0), (1, 0), (0.35, 1))],
+    '9': [_path(_arc(0.5, 0.3, 0.45, 0.3, 0, -2 * PI), _line((0.95, 0.3), (0.95, 1)))],
+}
+
+# Devanagari letters are drawn below the headline (shirorekha), which is usually its own stroke;
+# the templates are the body stroke only. Coarse approximations of school letterforms.
+DEVANAGARI_GLYPHS: Dict[str, List[np.ndarray]] = {
+    # Loop left of the stem and hook right of it; the stem alone is the neutral 'l'
+    'क': [_path(_arc(0.3, 0.45, 0.2, 0.15, 0, -2 * PI), _arc(0.72, 0.45, 0.22, 0.25, PI, 2.6 * PI)),
+          _path(_line((0.5, 0), (0.5, 0.45)), _arc(0.3, 0.45, 0.2, 0.15, 0, -2 * PI),
+                _arc(0.72, 0.45, 0.22, 0.25, PI, 2.6 * PI))],
+    'ग': [_path(_arc(0.2, 0.45, 0.2, 0.3, -PI / 2, PI / 2), _line((0.2, 0.75), (0.2, 0.95))),
+          _line((0.8, 0), (0.8, 1))],
+    'र': [_path(_line((0.2, 0), (0.45, 0.35)), _arc(0.35, 0.6, 0.3, 0.25, -PI / 2, PI * 0.9))],
+    'ख': [_path(_arc(0.2, 0.35, 0.15, 0.2, -PI / 2, PI / 2), _line((0.2, 0.55), (0.45, 0.9)),
+                _arc(0.65, 0.55, 0.2, 0.35, PI * 0.75, 2 * PI), _line((0.85, 0.55), (0.85, 0), (0.85, 1)))],
+    'प': [_path(_line((0.1, 0), (0.1, 0.5)), _arc(0.45, 0.5, 0.35, 0.2, PI, 2 * PI), _line((0.8, 0.5), (0.8, 0), (0.8, 1)))],
+    '२': [_path(_arc(0.5, 0.3, 0.4, 0.3, 7 * PI / 6, 2 * PI + PI / 3), _line((0.7, 0.56), (0.1, 0.95)),
+                _arc(0.45, 0.85, 0.35, 0.15, PI * 0.7, PI * 0.05))],
+    '३': [_path(_arc(0.45, 0.25, 0.4, 0.25, -5 * PI / 6, PI / 2), _arc(0.45, 0.7, 0.4, 0.25, -PI / 2, PI * 0.7),
+                _line((0.2, 0.9), (0.6, 1)))],
+    '९': [_path(_arc(0.35, 0.3, 0.35, 0.3, 0, 2 * PI), _line((0.7, 0.3), (0.55, 0.6), (0.9, 1)))],
+}
+
+# Symmetric shapes that belong to many letters; correct-only, never mirrored
+NEUTRAL_SHAPES: Dict[str, List[np.ndarray]] = {
+    'o': [_arc(0.5, 0.5, 0.5, 0.5, -PI / 2, 3 * PI / 2), _arc(0.5, 0.5, 0.5, 0.5, -PI / 2, -5 * PI / 2)],
+    'l': [_line((0, 0), (0, 1)), _line((0, 1), (0, 0))],
+    '-': [_line((0, 0), (1, 0)), _line((1, 0), (0, 0))],
+    '/': [_line((1, 0), (0, 1)), _line((0, 0), (1, 1))],
+    'u': [_path(_line((0, 0), (0, 0.6)), _arc(0.5, 0.6, 0.5, 0.4, PI, 0), _line((1, 0.6), (1, 0)))],
+}
+
+# Glyphs that are each other's horizontal mirror image
+MIRROR_PARTNERS = {'b': 'd', 'd': 'b', 'p': 'q', 'q': 'p'}
+
+SCRIPTS = {'latin': LATIN_GLYPHS, 'devanagari': DEVANAGARI_GLYPHS}
+# The Game 3 worksheet mixes Latin letters with the student's script
+LANGUAGE_SCRIPTS = {
+    'en': ('latin',),
+    'hi': ('latin', 'devanagari'),
+    'mr': ('latin', 'devanagari'),
+    # No Tamil/Telugu letterforms yet: Latin letters and digits only
+    'ta': ('latin',),
+    'te': ('latin',),
+}
+
+class TemplateBank(NamedTuple):
+    templates: np.ndarray  # (n, RESAMPLE_POINTS, 2) normalized trajectories
+    upper: np.ndarray  # LB_Keogh envelopes
+    lower: np.ndarray
+    glyphs: List[str]
+    mirrored: np.ndarray  # bool per template
+
+def _variants(points: np.ndarray) -> List[np.ndarray]:
+    """Slant and width variants of a trajectory"""
+    out = []
+    for slant in SLANTS:
+        for width in WIDTHS:
+            x = points[:, 0] * width + slant * (1 - points[:, 1])
+            out.append(np.column_stack((x, points[:, 1])))
+    return out
+
+def _resample(paths: List[np.ndarray]) -> np.ndarray:
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in paths], out=offsets[1:])
+    flat = np.concatenate(paths)
+    resampled, _ = resample_strokes(np.ascontiguousarray(flat[:, 0]), np.ascontiguousarray(flat[:, 1]),
+                                    offsets, RESAMPLE_POINTS, 2, 0.0)
+    return resampled
+
+def template_bank(language: str, prompts: Sequence[Optional[str]] = ()) -> TemplateBank:
+    """
+    Bank for a language (unknown languages get the Latin bank), plus the scripts of any
+    prompted letters: the worksheet mixes scripts whatever the student's language is
+    """
+    scripts = LANGUAGE_SCRIPTS.get(language, ('latin',))
+    letters = set(prompts) - {None}
+    extra = tuple(name for name, glyphs in SCRIPTS.items() if name not in scripts and letters & glyphs.keys())
+    return _build_bank(scripts + extra)
+
+@lru_cache(maxsize=None)
+def _build_bank(scripts: Tuple[str, ...]) -> TemplateBank:
+    glyph_sets = [SCRIPTS[script] for script in scripts]
+
+    correct, correct_names, reversed_paths, reversed_names = [], [], [], []
+    for glyphs in glyph_sets + [NEUTRAL_SHAPES]:
+        for name, paths in glyphs.items():
+            # Each trajectory also traced end to start: what is drawn matters, not the direction
+            for path in [direction for path in paths for direction in (path, path[::-1])]:
+                for variant in _variants(path):
+                    correct.append(variant)
+                    correct_names.append(name)
+                    if glyphs is not NEUTRAL_SHAPES:
+                        reversed_paths.append(variant * (-1.0, 1.0))
+                        reversed_names.append(name)
+
+    correct = _resample(correct)
+    reversed_ = _resample(reversed_paths)
+    upper, lower = envelopes(correct, DTW_WINDOW)
+    # Drop mirrors that some correct template matches as well as a real reversal would
+    nearest, _, _ = nearest_templates(reversed_, np.ones(len(reversed_), dtype=np.bool_), correct, upper, lower,
+                                      DTW_WINDOW, 2 * MATCH_THRESHOLD * RESAMPLE_POINTS)
+    distinct = nearest < 0
+
+    templates = np.concatenate((correct, reversed_[distinct]))
+    upper, lower = envelopes(templates, DTW_WINDOW)
+    return TemplateBank(
+        templates=templates,
+        upper=upper,
+        lower=lower,
+        glyphs=correct_names + [n for n, keep in zip(reversed_names, distinct) if keep],
+        mirrored=np.concatenate((np.zeros(len(correct), dtype=bool), np.ones(int(distinct.sum()), dtype=bool)))
+    )
+
+def match_strokes(x: np.ndarray, y: np.ndarray, offsets: np.ndarray, language: str,
+                  bank: Optional[TemplateBank] = None) -> Dict[str, np.ndarray]:
+    """
+    Closest template per stroke: template index into the bank (-1 for strokes too
+    small to match or with nothing within MATCH_THRESHOLD) and the per-point
+    distance (inf when unmatched).
+    """
+    bank = bank or template_bank(language)
+    queries, valid = resample_strokes(x, y, offsets, RESAMPLE_POINTS, MIN_STROKE_POINTS, MIN_STROKE_EXTENT)
+    best, distance, evaluated = nearest_templates(queries, valid, bank.templates, bank.upper, bank.lower,
+                                                  DTW_WINDOW, MATCH_THRESHOLD * RESAMPLE_POINTS)
+    return {"template": best, "distance": distance / RESAMPLE_POINTS, "dtw_evaluated": evaluated}
+
+def reversed_strokes(x: np.ndarray, y: np.ndarray, offsets: np.ndarray, language: str,
+                     prompts: Optional[Sequence[Optional[str]]] = None) -> np.ndarray:
+    """
+    Boolean mask of reversed strokes. `prompts` is the letter each stroke was meant
+    to be (None where unknown); unprompted strokes are reversed when their closest
+    template is any mirrored glyph.
+    """
+    bank = template_bank(language, prompts or ())
+    best = match_strokes(x, y, offsets, language, bank)["template"]
+    matched = best >= 0
+    mirrored = matched & bank.mirrored[np.maximum(best, 0)]
+    if prompts is None:
+        return mirrored
+
+    out = mirrored.copy()
+    for i, prompt in enumerate(prompts):
+        if prompt is None:
+            continue
+        # The prompt's own mirrored templates, or a correctly drawn mirror partner
+        glyph = bank.glyphs[best[i]] if matched[i] else None
+        out[i] = glyph is not None and glyph == (prompt if mirrored[i] else MIRROR_PARTNERS.get(prompt))
+    return out
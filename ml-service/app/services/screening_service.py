@@ -1,8 +1,206 @@
-from app.schemas.screening_schema import ScreeningRequest
+"""
+Model-based screening risk: a fixed feature vector per assessment, scored by the
+screening_rf / screening_mlp ensemble.
+
+FEATURE_COLUMNS is the layout both models are trained on; any change to it
+(order, meaning, defaults) must bump FEATURE_VERSION, which is reported with
+every prediction. Each analyzer block (Game 1 eye tracking, Game 2 speech,
+Game 3 handwriting, Game 4 pattern, Game 5 reaction time) contributes a
+*_present flag and its measures; absent or failed blocks leave their columns
+at the default.
+
+Both models score a (n, features) matrix in one call (screening_rf through its
+compiled form, screening_mlp through predict_on_batch, so a NumpySequential
+export or a Keras model), and the ensemble is a weighted mean over the models
+that are available. predict() is predict_batch() on one row; the API goes
+through screening_batcher so concurrent requests share those calls.
+"""
+import logging
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.utils.compiled_tree import get_compiled_model
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.model_loader import get_model
+from app.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+FEATURE_VERSION = "1"
+
+# (column, block, key in the block, default); key None = the block's presence flag
+FEATURE_LAYOUT: List[Tuple[str, str, Optional[str], float]] = [
+    ('eye_present', 'eye_tracking', None, 0.0),
+    ('eye_fixation_count', 'eye_tracking', 'fixation_count', 0.0),
+    ('eye_regression_count', 'eye_tracking', 'regression_count', 0.0),
+    ('eye_avg_fixation_duration_ms', 'eye_tracking', 'avg_fixation_duration_ms', 0.0),
+    ('eye_avg_saccade_velocity', 'eye_tracking', 'avg_saccade_velocity', 0.0),
+    ('speech_present', 'speech', None, 0.0),
+    ('speech_pause_count', 'speech', 'pause_count', 0.0),
+    ('speech_total_pause_s', 'speech', 'total_pause_duration', 0.0),
+    ('speech_duration_s', 'speech', 'speech_rate', 0.0),
+    ('speech_clarity_score', 'speech', 'clarity_score', 0.0),
+    ('handwriting_present', 'handwriting', None, 0.0),
+    ('handwriting_reversal_count', 'handwriting', 'reversal_count', 0.0),
+    ('handwriting_spacing_issues', 'handwriting', 'spacing_issues', 0.0),
+    ('handwriting_smoothness_score', 'handwriting', 'smoothness_score', 0.0),
+    ('pattern_present', 'pattern', None, 0.0),
+    ('pattern_accuracy', 'pattern', 'accuracy', 1.0),  # same default as the Game 4 rule
+    ('reaction_present', 'reaction_time', None, 0.0),
+    ('reaction_variability_ms', 'reaction_time', 'variability', 0.0),
+]
+FEATURE_COLUMNS = [column for column, _, _, _ in FEATURE_LAYOUT]
+DEFAULT_ROW = np.array([default for _, _, _, default in FEATURE_LAYOUT])
+
+def _block_columns() -> Dict[str, Tuple[int, List[int], List[str], List[float]]]:
+    """block -> (presence column, measure columns, their keys, their defaults)"""
+    blocks = {}
+    for j, (_, block, key, default) in enumerate(FEATURE_LAYOUT):
+        entry = blocks.setdefault(block, [None, [], [], []])
+        if key is None:
+            entry[0] = j
+        else:
+            entry[1].append(j)
+            entry[2].append(key)
+            entry[3].append(default)
+    return {block: tuple(entry) for block, entry in blocks.items()}
+
+BLOCK_COLUMNS = _block_columns()
+
+# Analyzer feature keys (routers/screening.py) and the games whose response_data is used directly
+ANALYZER_BLOCKS = ('eye_tracking', 'speech', 'handwriting')
+RESPONSE_BLOCKS = {4: 'pattern', 5: 'reaction_time'}
+
+# Ensemble weights, renormalized over the models that are loaded
+ENSEMBLE_WEIGHTS = {'screening_rf': 0.6, 'screening_mlp': 0.4}
+ENSEMBLE_MODELS = list(ENSEMBLE_WEIGHTS)
+# risk_score thresholds for the flags, highest first
+RISK_FLAGS = ((0.7, 'high_risk'), (0.4, 'elevated_risk'))
+
+def feature_blocks(games_data: Sequence[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Usable inputs per block: analyzer outputs without an error, and Game 4/5 response_data"""
+    blocks = {key: features[key] for key in ANALYZER_BLOCKS
+              if isinstance(features.get(key), dict) and 'error' not in features[key]}
+    for game in games_data:
+        block = RESPONSE_BLOCKS.get(game.get('game_number'))
+        if block and isinstance(game.get('response_data'), dict):
+            blocks[block] = game['response_data']
+    return blocks
+
+def _number(value: Any, default: float) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    return value if np.isfinite(value) else default
+
+def feature_matrix(items: Sequence[Tuple[Sequence[Dict[str, Any]], Dict[str, Any]]]) -> np.ndarray:
+    """(n, len(FEATURE_COLUMNS)) float64 rows from (games_data, analyzer features) pairs"""
+    X = np.tile(DEFAULT_ROW, (len(items), 1))
+    for i, (games_data, features) in enumerate(items):
+        for block, data in feature_blocks(games_data, features).items():
+            present, indices, keys, defaults = BLOCK_COLUMNS[block]
+            X[i, present] = 1.0
+            X[i, indices] = [_number(data.get(key), default) for key, default in zip(keys, defaults)]
+    return X
+
+def rf_scores(X: np.ndarray) -> Optional[np.ndarray]:
+    """P(highest class label) per row from the compiled screening_rf, None if unavailable"""
+    forest = get_compiled_model('screening_rf', FEATURE_COLUMNS)
+    if forest is None:
+        return None
+    with timed('screening.rf_inference'):
+        return forest.predict_proba(X)[:, -1]
+
+# (model object, whether its input/output shapes fit the layout)
+_mlp_checked = (None, False)
+# Last model whose output width was reported as unusable, so it is logged once
+_mlp_bad_output = None
+
+def _mlp_fits(model) -> bool:
+    global _mlp_checked
+    if _mlp_checked[0] is not model:
+        shape = getattr(model, 'input_shape', None)
+        width = shape[-1] if shape else None
+        fits = width in (None, len(FEATURE_COLUMNS))
+        if not fits:
+            logger.warning(f"screening_mlp ignored: expects {width} features, "
+                           f"layout v{FEATURE_VERSION} has {len(FEATURE_COLUMNS)}")
+        _mlp_checked = (model, fits)
+    return _mlp_checked[1]
+
+def mlp_scores(X: np.ndarray) -> Optional[np.ndarray]:
+    """Risk probability per row from screening_mlp (sigmoid unit or 2-class softmax), None if unavailable"""
+    global _mlp_bad_output
+    model = get_model('screening_mlp')
+    if model is None or not _mlp_fits(model):
+        return None
+    with timed('screening.mlp_inference'):
+        out = np.asarray(model.predict_on_batch(X.astype(np.float32)), dtype=np.float64).reshape(len(X), -1)
+    if out.shape[1] > 2:
+        if _mlp_bad_output is not model:
+            logger.warning(f"screening_mlp ignored: {out.shape[1]} outputs, expected 1 or 2")
+            _mlp_bad_output = model
+        return None
+    return out[:, -1]
+
+SCORERS = {'screening_rf': rf_scores, 'screening_mlp': mlp_scores}
+
+def ensemble_scores(X: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-model probabilities (n, len(ENSEMBLE_MODELS)), a mask of the models that
+    scored, and the weighted ensemble risk (n,), NaN when no model is available.
+    """
+    P = np.full((len(X), len(ENSEMBLE_MODELS)), np.nan)
+    available = np.zeros(len(ENSEMBLE_MODELS), dtype=bool)
+    if len(X):
+        for j, name in enumerate(ENSEMBLE_MODELS):
+            scores = SCORERS[name](X)
+            if scores is not None:
+                P[:, j] = scores
+                available[j] = True
+    weights = np.array([ENSEMBLE_WEIGHTS[name] for name in ENSEMBLE_MODELS]) * available
+    if weights.sum() > 0:
+        risk = P[:, available] @ (weights[available] / weights.sum())
+    else:
+        risk = np.full(len(X), np.nan)
+    return {"model_scores": P, "available": available, "risk": risk}
+
+RISK_LEVEL_NAMES = ['normal'] + [name for _, name in reversed(RISK_FLAGS)]
+
+def risk_levels(risk: np.ndarray) -> np.ndarray:
+    """Number of RISK_FLAGS thresholds reached, i.e. an index into RISK_LEVEL_NAMES"""
+    return sum((risk >= threshold).astype(np.int64) for threshold, _ in RISK_FLAGS)
 
 class ScreeningService:
-    def predict(self, data: ScreeningRequest):
-        # Logic to aggregate sub-models
-        return {"risk_score": 0.45, "flags": ["normal"]}
+    def predict_batch(self, items: Sequence[Tuple[Sequence[Dict[str, Any]], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Ensemble risk for many assessments: items are (games_data, analyzer features).
+        risk_score is None (and flags empty) when neither model is loaded.
+        """
+        X = feature_matrix(items)
+        scored = ensemble_scores(X)
+        P, risk = scored["model_scores"], scored["risk"]
+        available = np.flatnonzero(scored["available"]).tolist()
+        levels = risk_levels(risk).tolist()
+        return [
+            {
+                "risk_score": None if np.isnan(risk[i]) else round(float(risk[i]), 4),
+                "flags": [] if np.isnan(risk[i]) else [RISK_LEVEL_NAMES[levels[i]]],
+                "model_scores": {ENSEMBLE_MODELS[j]: round(float(P[i, j]), 4) for j in available},
+                "feature_version": FEATURE_VERSION
+            }
+            for i in range(len(X))
+        ]
+
+    def predict(self, games_data: Sequence[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
+        return self.predict_batch([(games_data, features)])[0]
 
 screening_service = ScreeningService()
+
+screening_batcher = MicroBatcher(
+    screening_service.predict_batch,
+    max_batch_size=settings.SCREENING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.SCREENING_BATCH_MAX_WAIT_MS,
+    name="screening"
+)
@@ -1,44 +1,255 @@
-import librosa
 import numpy as np
+import soundfile as sf
+from typing import Dict, Any, Iterator
+from app.utils.feature_cache import cached_features, digest_file
+from app.utils.audio_source import local_audio
+
+# Analysis parameters (16kHz typical for speech models, 13 MFCCs standard for speech)
+SAMPLE_RATE = 16000
+N_MFCC = 13
+N_FFT = 2048
+HOP_LENGTH = 512
+# Audio is decoded and analyzed in blocks of this many seconds
+BLOCK_SECONDS = 10.0
+# Pause = contiguous run of frames below this fraction of the mean RMS energy so far
+# (or below the silence floor, -60 dBFS) ...
+PAUSE_ENERGY_RATIO = 0.1
+PAUSE_FLOOR_RMS = 1e-3
+# ... lasting at least this long
+MIN_PAUSE_SECONDS = 0.25
+# Bump when decoding/MFCC extraction changes; invalidates cached speech features
+SPEECH_EXTRACTOR_VERSION = "2"
 
 def analyze_speech(audio_file_path: str) -> dict:
     """
     Extract MFCC features and analyze speech clarity.
-    Input: Path to audio file (or download from S3 URL)
+    Input: path or object key under SPEECH_AUDIO_DIR, or an http(s) URL under one of
+    SPEECH_AUDIO_URL_PREFIXES (e.g. S3), which is streamed to a temp file (see audio_source).
+    Audio is decoded block by block, so memory stays flat regardless of recording length.
+    Extracted features are cached by audio content hash, so re-scoring never decodes twice.
     """
     try:
-        # Load audio file (resample to 16kHz typical for speech models)
-        y, sr = librosa.load(audio_file_path, sr=16000)
-        
-        # Extract MFCC features (13 coefficients standard for speech)
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        
-        # Calculate statistics
-        mfcc_mean = np.mean(mfccs, axis=1) # Shape: (13,)
-        mfcc_std = np.std(mfccs, axis=1)
-        
-        # Detect pauses (low energy regions)
-        # RMS energy
-        energy = librosa.feature.rms(y=y)[0]
-        # Threshold: 10% of mean energy
-        threshold = np.mean(energy) * 0.1
-        pause_frames = np.sum(energy < threshold)
-        # Convert frames to seconds (hop_length default 512)
-        pause_duration = librosa.frames_to_time(pause_frames, sr=sr, hop_length=512)
-        
-        return {
-            'mfcc_features': mfcc_mean.tolist(),
-            'pause_count': int(pause_frames), # Proxy for count (contiguous regions need more logic)
-            'total_pause_duration': float(pause_duration),
-            'speech_rate': len(y) / sr,  # Duration in seconds
-            'clarity_score': calculate_clarity_score(mfccs)
-        }
+        with local_audio(audio_file_path) as path:
+            features = cached_features('speech', SPEECH_EXTRACTOR_VERSION, digest_file(path),
+                                       lambda: extract_speech_features(path))
+        return summarize_speech(features)
     except Exception as e:
         return {'error': str(e)}
 
-def calculate_clarity_score(mfccs):
+def extract_speech_features(path: str) -> Dict[str, Any]:
+    extractor = StreamingSpeechFeatures()
+    for block in iter_audio_blocks(path):
+        extractor.add(block)
+    return extractor.features()
+
+class StreamingSpeechFeatures:
+    """
+    Incremental MFCC / pause statistics over mono audio at SAMPLE_RATE.
+
+    Frames tile the stream exactly as a single center=False analysis of the whole
+    signal would: the last N_FFT - HOP_LENGTH samples of each block are carried into
+    the next. MFCCs come from mel power in dB against a fixed reference (no top_db
+    clipping, which would be relative to each block's loudest frame), so every frame
+    gets the coefficients a whole-signal analysis would give it; their mean/variance
+    are merged per block with Welford/Chan updates. Pauses are run-length counted as
+    frames arrive, with the open low-energy run carried across blocks, so memory
+    stays constant however long the recording is.
+    """
+
+    def __init__(self, sr: int = SAMPLE_RATE):
+        self.sr = sr
+        self.total_samples = 0
+        self.frame_count = 0
+        self.mfcc_mean = np.zeros(N_MFCC)
+        self.mfcc_m2 = np.zeros(N_MFCC)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self.rms_sum = 0.0
+        self.pause_count = 0
+        self.pause_frames = 0
+        self._open_run = 0  # low-energy frames at the end of the stream so far
+        self._min_pause_frames = int(np.ceil(MIN_PAUSE_SECONDS * sr / HOP_LENGTH))
+
+    def add(self, samples: np.ndarray):
+        samples = np.asarray(samples, dtype=np.float32)
+        self.total_samples += len(samples)
+        buf = np.concatenate((self._tail, samples)) if len(self._tail) else samples
+        if len(buf) < N_FFT:
+            self._tail = buf
+            return
+
+        n_frames = 1 + (len(buf) - N_FFT) // HOP_LENGTH
+        self._analyze(buf[:(n_frames - 1) * HOP_LENGTH + N_FFT])
+        self._tail = buf[n_frames * HOP_LENGTH:].copy()
+
+    def _analyze(self, segment: np.ndarray):
+        import librosa
+
+        mel = librosa.feature.melspectrogram(y=segment, sr=self.sr, n_fft=N_FFT,
+                                             hop_length=HOP_LENGTH, center=False)
+        mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel, ref=1.0, top_db=None), n_mfcc=N_MFCC)
+        frames = np.lib.stride_tricks.sliding_window_view(segment, N_FFT)[::HOP_LENGTH]
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+
+        # Chan et al. parallel merge of (count, mean, M2)
+        n_b = mfccs.shape[1]
+        mean_b = mfccs.mean(axis=1)
+        m2_b = np.square(mfccs - mean_b[:, None]).sum(axis=1)
+        total = self.frame_count + n_b
+        delta = mean_b - self.mfcc_mean
+        self.mfcc_mean += delta * n_b / total
+        self.mfcc_m2 += m2_b + np.square(delta) * self.frame_count * n_b / total
+        self.frame_count = total
+
+        # Pause threshold: PAUSE_ENERGY_RATIO of the mean RMS so far, never below the silence floor
+        self.rms_sum += float(rms.sum())
+        threshold = max(self.rms_sum / self.frame_count * PAUSE_ENERGY_RATIO, PAUSE_FLOOR_RMS)
+        self._count_pauses(rms < threshold)
+
+    def _count_pauses(self, low: np.ndarray):
+        """Close the low-energy runs that end in this block; a run reaching its end stays open"""
+        edges = np.diff(np.concatenate(([0], low.view(np.int8), [0])))
+        runs = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        closed = []
+        if low[0]:
+            runs[0] += self._open_run
+        elif self._open_run:
+            closed.append(self._open_run)
+        if low[-1]:
+            self._open_run = int(runs[-1])
+            runs = runs[:-1]
+        else:
+            self._open_run = 0
+        for run in closed + runs.tolist():
+            if run >= self._min_pause_frames:
+                self.pause_count += 1
+                self.pause_frames += run
+
+    def features(self) -> Dict[str, Any]:
+        """Sufficient statistics for summarize_speech (arrays + scalars, cacheable)"""
+        if self.frame_count == 0 and self.total_samples > 0:
+            # Clip shorter than one frame: analyze it zero-padded
+            self._analyze(np.pad(self._tail, (0, N_FFT - len(self._tail))))
+        # A pause still open at the end of the recording counts too
+        last_pause = self._open_run if self._open_run >= self._min_pause_frames else 0
+        return {
+            'mfcc_mean': self.mfcc_mean,
+            'mfcc_m2': self.mfcc_m2,
+            'pause_count': self.pause_count + int(last_pause > 0),
+            'pause_frames': self.pause_frames + last_pause,
+            'frame_count': int(self.frame_count),
+            'total_samples': int(self.total_samples),
+            'sr': int(self.sr)
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        return summarize_speech(self.features())
+
+def summarize_speech(features: Dict[str, Any]) -> Dict[str, Any]:
+    """Speech metrics and scoring from extracted features"""
+    n = features['frame_count']
+    if n == 0:
+        return {'error': 'Empty audio'}
+    mfcc_mean = np.asarray(features['mfcc_mean'])
+    mfcc_m2 = np.asarray(features['mfcc_m2'])
+    sr = features['sr']
+
+    # Variance over all coefficients and frames, as np.var(mfccs) on the full matrix
+    overall_var = (mfcc_m2.sum() + n * np.square(mfcc_mean - mfcc_mean.mean()).sum()) / (n * N_MFCC)
+
+    pause_count = int(features['pause_count'])
+    pause_duration = float(features['pause_frames'] * HOP_LENGTH / sr)
+    duration = features['total_samples'] / sr
+    clarity_score = clarity_from_variance(overall_var)
+
+    result = {
+        'mfcc_features': mfcc_mean.tolist(),
+        'mfcc_std': np.sqrt(mfcc_m2 / n).tolist(),
+        'pause_count': pause_count,
+        'total_pause_duration': pause_duration,
+        'speech_rate': duration,  # Duration in seconds
+        'clarity_score': clarity_score
+    }
+    result.update(score_speech(pause_count, pause_duration, duration, clarity_score))
+    return result
+
+def score_speech(pause_count: int, pause_duration: float, duration: float, clarity_score: float) -> Dict[str, Any]:
+    """Dyslexia scoring rule for reading-aloud fluency"""
+    minutes = max(duration / 60.0, 1e-9)
+    pauses_per_minute = pause_count / minutes
+    avg_pause = pause_duration / pause_count if pause_count else 0.0
+
+    dyslexia_score = 0
+    if pauses_per_minute > 12:  # Frequent hesitations while reading aloud
+        dyslexia_score += 40
+    if avg_pause > 1.0:
+        dyslexia_score += 30
+    if clarity_score < 40:
+        dyslexia_score += 30
+
+    return {
+        'dyslexia_score': min(100, dyslexia_score),
+        'indicators': {
+            'frequent_pauses': pauses_per_minute > 12,
+            'long_pauses': avg_pause > 1.0,
+            'low_clarity': clarity_score < 40
+        }
+    }
+
+def iter_audio_blocks(path: str, sr: int = SAMPLE_RATE, block_seconds: float = BLOCK_SECONDS) -> Iterator[np.ndarray]:
+    """
+    Yield mono float32 blocks resampled to `sr`.
+    libsndfile formats (wav/flac/ogg) are read with soundfile.blocks; anything else
+    (e.g. the webm Game 2 uploads) is decoded incrementally through audioread.
+    """
+    try:
+        info = sf.info(path)
+    except RuntimeError:
+        yield from _iter_audioread_blocks(path, sr, block_seconds)
+        return
+
+    resampler = _resampler(info.samplerate, sr)
+    blocksize = max(N_FFT, int(info.samplerate * block_seconds))
+    for block in sf.blocks(path, blocksize=blocksize, dtype='float32', always_2d=True):
+        yield _resample(resampler, block.mean(axis=1, dtype=np.float32))
+    if resampler is not None:
+        yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+def _iter_audioread_blocks(path: str, sr: int, block_seconds: float) -> Iterator[np.ndarray]:
+    import audioread
+
+    with audioread.audio_open(path) as f:
+        resampler = _resampler(f.samplerate, sr)
+        target = int(f.samplerate * block_seconds) * f.channels
+        pending, pending_len = [], 0
+        for buf in f:
+            # audioread yields small interleaved int16 buffers; group them into blocks
+            pending.append(np.frombuffer(buf, dtype='<i2'))
+            pending_len += len(pending[-1])
+            if pending_len >= target:
+                yield _resample(resampler, _int16_to_mono(np.concatenate(pending), f.channels))
+                pending, pending_len = [], 0
+        if pending:
+            yield _resample(resampler, _int16_to_mono(np.concatenate(pending), f.channels))
+    if resampler is not None:
+        yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+def _int16_to_mono(samples: np.ndarray, channels: int) -> np.ndarray:
+    return (samples.reshape(-1, channels).mean(axis=1) / 32768.0).astype(np.float32)
+
+def _resampler(source_sr: int, target_sr: int):
+    if source_sr == target_sr:
+        return None
+    import soxr
+    return soxr.ResampleStream(source_sr, target_sr, 1, dtype='float32')
+
+def _resample(resampler, block: np.ndarray) -> np.ndarray:
+    return block if resampler is None else resampler.resample_chunk(block)
+
+def clarity_from_variance(variance: float) -> float:
     # Simple heuristic: higher variance in specific bands often correlates with clear articulation
     # (versus mumbling). This is a placeholder for a trained model score.
-    variance = np.var(mfccs)
     # Normalize to 0-100 (Arbitrary scaling for prototype)
     return min(100, float(variance * 10))
+
+def calculate_clarity_score(mfccs):
+    return clarity_from_variance(np.var(mfccs))
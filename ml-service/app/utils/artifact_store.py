@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+# Layout under MODEL_PATH:
+#   manifest.json
+#   <model_name>/<version>/<artifact file>
+# manifest.json:
+#   {"models": {"<model_name>": {"active": "<version>",
+#       "versions": {"<version>": {"file": ..., "kind": ..., "sha256": ..., "created_at": ...}}}}}
+
+class ArtifactError(Exception):
+    """Raised when an artifact is missing from the manifest or fails verification"""
+
+def store_root() -> str:
+    if os.path.isabs(settings.MODEL_PATH):
+        return settings.MODEL_PATH
+    # Assuming code run from root context
+    return os.path.join(os.getcwd(), settings.MODEL_PATH)
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(root: Optional[str] = None) -> Dict[str, Any]:
+    path = os.path.join(root or store_root(), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"models": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(manifest: Dict[str, Any], root: str):
+    """Atomic replace so readers never see a half-written manifest"""
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix='.manifest-', suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(root, MANIFEST_NAME))
+
+def resolve_artifact(model_name: str, version: Optional[str] = None,
+                     root: Optional[str] = None) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Find (path, version, entry) for a model in the manifest.
+    version=None picks the active version. Returns None if the model is not registered.
+    """
+    root = root or store_root()
+    record = load_manifest(root)['models'].get(model_name)
+    if not record:
+        return None
+
+    version = version or record.get('active')
+    entry = record['versions'].get(version)
+    if entry is None:
+        raise ArtifactError(f"{model_name} has no version {version!r}")
+
+    path = os.path.join(root, model_name, version, entry['file'])
+    if not os.path.exists(path):
+        raise ArtifactError(f"Artifact file missing: {path}")
+    return path, version, entry
+
+def verify_artifact(path: str, entry: Dict[str, Any]):
+    expected = entry.get('sha256')
+    if expected and sha256_file(path) != expected:
+        raise ArtifactError(f"Checksum mismatch for {path}")
+
+def register_artifact(model_name: str, version: str, source_path: str, kind: str,
+                      activate: bool = True, root: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Copy an artifact into the store under <model_name>/<version>/ and record it
+    in the manifest with its checksum. Used by the training/export scripts.
+    """
+    root = root or store_root()
+    target_dir = os.path.join(root, model_name, version)
+    os.makedirs(target_dir, exist_ok=True)
+
+    filename = os.path.basename(source_path.rstrip(os.sep))
+    target = os.path.join(target_dir, filename)
+    if os.path.isdir(source_path):
+        shutil.copytree(source_path, target, dirs_exist_ok=True)
+        checksum = None
+    else:
+        shutil.copy2(source_path, target)
+        checksum = sha256_file(target)
+
+    manifest = load_manifest(root)
+    record = manifest['models'].setdefault(model_name, {"active": None, "versions": {}})
+    entry = {
+        "file": filename,
+        "kind": kind,
+        "sha256": checksum,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    record['versions'][version] = entry
+    if activate:
+        record['active'] = version
+    _write_manifest(manifest, root)
+    logger.info(f"Registered {model_name} version {version}")
+    return entry
+
+if __name__ == "__main__":
+    # python -m app.utils.artifact_store <model_name> <version> <path> <joblib|keras|numpy> [--inactive]
+    import argparse
+    parser = argparse.ArgumentParser(description="Register a model artifact in the versioned store")
+    parser.add_argument('model_name')
+    parser.add_argument('version')
+    parser.add_argument('path')
+    parser.add_argument('kind')
+    parser.add_argument('--inactive', action='store_true', help="register without making it the active version")
+    args = parser.parse_args()
+    print(json.dumps(register_artifact(args.model_name, args.version, args.path, args.kind,
+                                       activate=not args.inactive), indent=2))
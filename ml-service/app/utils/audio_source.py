@@ -0,0 +1,104 @@
+"""
+Resolve client-supplied Game 2 recording references to local files.
+
+The client chooses `speech_audio_url` / `audio_path`, so nothing is opened or
+fetched unless it is on configured storage:
+- paths (or relative object keys) must resolve, after symlinks, inside
+  SPEECH_AUDIO_DIR;
+- URLs must fall under one of SPEECH_AUDIO_URL_PREFIXES (scheme, host, port and
+  path prefix, e.g. https://recordings.s3.amazonaws.com/game2/). Redirects are
+  followed by hand and each hop is checked the same way.
+Downloads and local files are capped at SPEECH_AUDIO_MAX_MB (Content-Length and a
+running byte count).
+"""
+import os
+import posixpath
+import tempfile
+import contextlib
+from typing import Iterator, List, Tuple
+from urllib.parse import urlsplit, urljoin, unquote
+from app.config import settings
+
+MAX_REDIRECTS = 3
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+
+class AudioSourceRejected(ValueError):
+    """The recording reference is outside the configured storage or too large"""
+
+def _max_bytes() -> int:
+    return int(settings.SPEECH_AUDIO_MAX_MB * 1024 * 1024)
+
+def _url_parts(url: str) -> Tuple[str, str, int, str]:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    port = parts.port or {'http': 80, 'https': 443}.get(scheme)
+    # Percent-decoded and normalized so "a/../b" or "%2e%2e" cannot climb out of the prefix
+    path = posixpath.normpath('/' + unquote(parts.path))
+    return scheme, (parts.hostname or '').lower(), port, path
+
+def _allowed_prefixes() -> List[Tuple[str, str, int, str]]:
+    prefixes = []
+    for prefix in settings.SPEECH_AUDIO_URL_PREFIXES.split(','):
+        if prefix.strip():
+            scheme, host, port, path = _url_parts(prefix.strip())
+            prefixes.append((scheme, host, port, path.rstrip('/') + '/'))
+    return prefixes
+
+def check_url(url: str) -> str:
+    """url if it is on configured storage, else AudioSourceRejected"""
+    scheme, host, port, path = _url_parts(url)
+    if scheme not in ('http', 'https') or not host:
+        raise AudioSourceRejected("Audio URL must be http(s)")
+    for allowed in _allowed_prefixes():
+        if (scheme, host, port) == allowed[:3] and path.startswith(allowed[3]):
+            return url
+    raise AudioSourceRejected(f"Audio URL host/path not allowed: {host}")
+
+def check_path(source: str) -> str:
+    """Real path of `source` (relative keys are taken from SPEECH_AUDIO_DIR) if it lies inside SPEECH_AUDIO_DIR"""
+    if not settings.SPEECH_AUDIO_DIR:
+        raise AudioSourceRejected("Local audio paths are disabled (SPEECH_AUDIO_DIR not set)")
+    base = os.path.realpath(settings.SPEECH_AUDIO_DIR)
+    path = os.path.realpath(os.path.join(base, source))
+    if os.path.commonpath((base, path)) != base or not os.path.isfile(path):
+        raise AudioSourceRejected("Audio path not found in the audio directory")
+    if os.path.getsize(path) > _max_bytes():
+        raise AudioSourceRejected(f"Audio file exceeds {settings.SPEECH_AUDIO_MAX_MB:g} MB")
+    return path
+
+def _download(url: str, out) -> None:
+    import requests
+
+    limit = _max_bytes()
+    for _ in range(MAX_REDIRECTS + 1):
+        check_url(url)
+        with requests.get(url, stream=True, timeout=30, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['location'])
+                continue
+            response.raise_for_status()
+            declared = response.headers.get('content-length')
+            if declared and declared.isdigit() and int(declared) > limit:
+                raise AudioSourceRejected(f"Audio download exceeds {settings.SPEECH_AUDIO_MAX_MB:g} MB")
+            received = 0
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                received += len(chunk)
+                if received > limit:
+                    raise AudioSourceRejected(f"Audio download exceeds {settings.SPEECH_AUDIO_MAX_MB:g} MB")
+                out.write(chunk)
+            return
+    raise AudioSourceRejected("Too many redirects fetching audio")
+
+@contextlib.contextmanager
+def local_audio(source: str) -> Iterator[str]:
+    """Local path for `source`; allowed URLs are streamed to a temp file that is removed afterwards"""
+    if not source.lower().startswith(('http://', 'https://')):
+        yield check_path(source)
+        return
+
+    check_url(source)
+    suffix = os.path.splitext(urlsplit(source).path)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        _download(source, tmp)
+        tmp.flush()
+        yield tmp.name
@@ -0,0 +1,99 @@
+"""
+Compact msgpack request bodies for the screening endpoints.
+
+The envelope has the same keys as the JSON body, but per-sample data travels
+as msgpack bin fields holding packed little-endian records:
+
+    Game 1  eye_tracking_data    GAZE_WIRE_DTYPE records
+    Game 3  handwriting_strokes  {"points": STROKE_POINT_WIRE_DTYPE records,
+                                  "offsets": <u4 array of n_strokes + 1 point offsets}
+
+Decoding views those bytes with np.frombuffer, so no Python object is created
+per sample. Games that send plain msgpack arrays or maps are left as they are
+and go through the usual list-of-dicts path.
+"""
+import numpy as np
+from typing import Any, Dict, List
+from app.services.handwriting_analysis_service import StrokeArrays
+
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Timestamps stay float64: epoch milliseconds don't fit in a float32 mantissa
+GAZE_WIRE_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('timestamp', '<f8'), ('word_index', '<i4')])
+STROKE_POINT_WIRE_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('time', '<f8')])
+STROKE_OFFSET_DTYPE = np.dtype('<u4')
+
+def is_msgpack(content_type: str) -> bool:
+    return (content_type or '').split(';')[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+def _records(buf: bytes, dtype: np.dtype, field: str) -> np.ndarray:
+    if len(buf) % dtype.itemsize:
+        raise ValueError(f"{field}: {len(buf)} bytes is not a multiple of the {dtype.itemsize}-byte record")
+    return np.frombuffer(buf, dtype=dtype)
+
+def decode_gaze(buf: bytes) -> np.ndarray:
+    return _records(buf, GAZE_WIRE_DTYPE, 'eye_tracking_data')
+
+def decode_strokes(frame: Dict[str, bytes]) -> StrokeArrays:
+    points = _records(frame['points'], STROKE_POINT_WIRE_DTYPE, 'handwriting_strokes.points')
+    offsets = _records(frame['offsets'], STROKE_OFFSET_DTYPE, 'handwriting_strokes.offsets').astype(np.int64)
+    if len(offsets) == 0 or offsets[0] != 0 or offsets[-1] != len(points) or np.any(np.diff(offsets) < 0):
+        raise ValueError("handwriting_strokes.offsets must rise from 0 to the number of points")
+    return StrokeArrays(points['x'].astype(np.float64), points['y'].astype(np.float64),
+                        points['time'].astype(np.float64), offsets)
+
+def decode_games(games_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace packed Game 1 / Game 3 fields with NumPy arrays, in place"""
+    for game in games_data:
+        gaze = game.get('eye_tracking_data')
+        if isinstance(gaze, bytes):
+            game['eye_tracking_data'] = decode_gaze(gaze)
+        strokes = game.get('handwriting_strokes')
+        if isinstance(strokes, dict) and isinstance(strokes.get('points'), bytes):
+            game['handwriting_strokes'] = decode_strokes(strokes)
+    return games_data
+
+def decode_screening_payload(body: bytes) -> Dict[str, Any]:
+    """Unpack a single request ({"games_data": ...}) or a batch ({"requests": [...]})"""
+    import msgpack
+
+    payload = msgpack.unpackb(body, raw=False)
+    if not isinstance(payload, dict):
+        raise ValueError("msgpack body must be a map")
+    for request in payload.get('requests', [payload]):
+        if isinstance(request, dict) and isinstance(request.get('games_data'), list):
+            decode_games(request['games_data'])
+    return payload
+
+def pack_gaze(samples: List[Dict[str, Any]]) -> bytes:
+    """Client-side helper: [{"x", "y", "timestamp", "word_index"?}, ...] -> packed bytes"""
+    records = np.empty(len(samples), dtype=GAZE_WIRE_DTYPE)
+    for field in ('x', 'y', 'timestamp'):
+        records[field] = [s[field] for s in samples]
+    records['word_index'] = [s.get('word_index', -1) for s in samples]
+    return records.tobytes()
+
+def pack_strokes(strokes: List[Dict[str, Any]]) -> Dict[str, bytes]:
+    """Client-side helper: [{"points": [{"x", "y", "time"}, ...]}, ...] -> packed frame"""
+    points = [p for stroke in strokes for p in stroke.get('points', [])]
+    records = np.empty(len(points), dtype=STROKE_POINT_WIRE_DTYPE)
+    records['x'] = [p['x'] for p in points]
+    records['y'] = [p['y'] for p in points]
+    records['time'] = [p.get('time', 0) for p in points]
+    offsets = np.zeros(len(strokes) + 1, dtype=STROKE_OFFSET_DTYPE)
+    offsets[1:] = np.cumsum([len(stroke.get('points', [])) for stroke in strokes])
+    return {"points": records.tobytes(), "offsets": offsets.tobytes()}
+
+def encode_screening_request(request: Dict[str, Any]) -> bytes:
+    """Client-side helper: JSON-shaped screening request -> msgpack body with packed games"""
+    import msgpack
+
+    games = []
+    for game in request.get('games_data', []):
+        game = dict(game)
+        if isinstance(game.get('eye_tracking_data'), list):
+            game['eye_tracking_data'] = pack_gaze(game['eye_tracking_data'])
+        if isinstance(game.get('handwriting_strokes'), list):
+            game['handwriting_strokes'] = pack_strokes(game['handwriting_strokes'])
+        games.append(game)
+    return msgpack.packb({**request, "games_data": games}, use_bin_type=True)
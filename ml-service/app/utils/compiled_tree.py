@@ -0,0 +1,152 @@
+import logging
+import numpy as np
+from typing import List, Optional, Sequence
+from app.utils.model_loader import get_model
+
+logger = logging.getLogger(__name__)
+
+class CompiledTree:
+    """
+    A fitted sklearn decision tree flattened into parallel node arrays.
+
+    feature[i] < 0 marks a leaf. value[i] holds the leaf's class probabilities
+    (classifiers) or prediction (regressors). Single rows are walked over plain
+    Python lists, which avoids sklearn's per-call validation overhead; batches
+    descend one tree level at a time with NumPy fancy indexing.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray):
+        self.feature = feature.astype(np.int32)
+        self.threshold = threshold.astype(np.float64)
+        self.left = left.astype(np.int32)
+        self.right = right.astype(np.int32)
+        self.value = value.astype(np.float64)
+        self._nodes = list(zip(self.feature.tolist(), self.threshold.tolist(),
+                               self.left.tolist(), self.right.tolist()))
+
+    @classmethod
+    def from_sklearn(cls, estimator) -> "CompiledTree":
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        if hasattr(estimator, 'classes_'):
+            # Older sklearn stores class counts at the nodes; normalize to probabilities
+            totals = value.sum(axis=1, keepdims=True)
+            value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        return cls(tree.feature, tree.threshold, tree.children_left, tree.children_right, value)
+
+    def leaf_one(self, row: Sequence[float]) -> int:
+        node = 0
+        nodes = self._nodes
+        while True:
+            feature, threshold, left, right = nodes[node]
+            if feature < 0:
+                return node
+            node = left if row[feature] <= threshold else right
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        node = np.zeros(len(X), dtype=np.int32)
+        active = np.arange(len(X))
+        while active.size:
+            feature = self.feature[node[active]]
+            internal = feature >= 0
+            active, feature = active[internal], feature[internal]
+            current = node[active]
+            go_left = X[active, feature] <= self.threshold[current]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+        return node
+
+    def predict_value_one(self, row: Sequence[float]) -> np.ndarray:
+        return self.value[self.leaf_one(row)]
+
+    def predict_value(self, X: np.ndarray) -> np.ndarray:
+        return self.value[self.leaves(X)]
+
+class CompiledForest:
+    """Averaged CompiledTrees, e.g. a RandomForest's estimators_"""
+
+    def __init__(self, trees: List[CompiledTree]):
+        self.trees = trees
+
+    def predict_value_one(self, row: Sequence[float]) -> np.ndarray:
+        return sum(tree.predict_value_one(row) for tree in self.trees) / len(self.trees)
+
+    def predict_value(self, X: np.ndarray) -> np.ndarray:
+        return sum(tree.predict_value(X) for tree in self.trees) / len(self.trees)
+
+class CompiledModel:
+    """A compiled tree/forest plus the input feature order and class labels"""
+
+    def __init__(self, evaluator, feature_names: List[str], classes: Optional[np.ndarray]):
+        self.evaluator = evaluator
+        self.feature_names = feature_names
+        self.classes = classes
+
+    def row(self, signals: dict) -> List[float]:
+        return [float(signals.get(name, 0)) for name in self.feature_names]
+
+    def matrix(self, columns: dict, n: int) -> np.ndarray:
+        X = np.zeros((n, len(self.feature_names)))
+        for j, name in enumerate(self.feature_names):
+            if name in columns:
+                X[:, j] = columns[name]
+        return X
+
+    def predict_proba_one(self, signals: dict) -> np.ndarray:
+        return self.evaluator.predict_value_one(self.row(signals))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.evaluator.predict_value(np.asarray(X, dtype=np.float64))
+
+def resolve_feature_order(model, available: Sequence[str]) -> List[str]:
+    """
+    Feature order the model was fit with, checked against the signal names we can supply.
+    Models fit on a DataFrame carry feature_names_in_; otherwise `available` is assumed
+    to be the training order and only the feature count is checked.
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        names = [str(name) for name in names]
+        missing = [name for name in names if name not in available]
+        if missing:
+            raise ValueError(f"Model expects features not present in signals: {missing}")
+        return names
+
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is not None and n_features != len(available):
+        raise ValueError(f"Model expects {n_features} features, signals provide {len(available)}")
+    return list(available)
+
+def compile_model(model, available: Sequence[str]) -> CompiledModel:
+    """Flatten a fitted DecisionTree* or RandomForest* into a CompiledModel"""
+    if hasattr(model, 'estimators_'):
+        evaluator = CompiledForest([CompiledTree.from_sklearn(est) for est in model.estimators_])
+    elif hasattr(model, 'tree_'):
+        evaluator = CompiledTree.from_sklearn(model)
+    else:
+        raise TypeError(f"Cannot compile {type(model).__name__}; expected a fitted tree or forest")
+    return CompiledModel(evaluator, resolve_feature_order(model, available), getattr(model, 'classes_', None))
+
+# model name -> (source model object, CompiledModel or None)
+_compiled = {}
+
+def get_compiled_model(model_name: str, available: Sequence[str]) -> Optional[CompiledModel]:
+    """
+    Compiled form of a registry model, rebuilt whenever the registry holds a new object
+    (first load or hot reload). None if the model is absent or cannot be compiled.
+    """
+    model = get_model(model_name)
+    if model is None:
+        return None
+
+    cached = _compiled.get(model_name)
+    if cached is not None and cached[0] is model:
+        return cached[1]
+
+    try:
+        compiled = compile_model(model, available)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Cannot use {model_name} on the fast path, falling back: {e}")
+        compiled = None
+    _compiled[model_name] = (model, compiled)
+    return compiled
@@ -0,0 +1,167 @@
+"""
+Numba kernels for matching pen strokes against a template bank with DTW.
+
+Strokes are resampled to a fixed number of points by arc length and
+normalized (bounding-box center at the origin, longer side = 1), so they can
+be compared with templates point for point. Matching uses Sakoe-Chiba banded
+DTW on squared Euclidean point distances, behind a cascade of lower bounds so
+that few candidates reach the full DTW: a template is skipped when LB_Kim
+(start and end points, O(1)) or LB_Keogh (the query against the template's
+band envelope, O(n), abandoned early) already reaches the best distance so
+far, and the DTW itself abandons a candidate once a whole row exceeds it.
+Searches start from a distance cutoff, so strokes that resemble no template
+are rejected by the bounds alone.
+
+Kernels are compiled with cache=True, so the machine code is written to
+__pycache__ (or NUMBA_CACHE_DIR) on first use and later processes load it
+instead of recompiling. `python -m app.utils.dtw` compiles them ahead of time
+(e.g. during the image build).
+"""
+import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def resample_strokes(x, y, offsets, n_points, min_points, min_extent):
+    """
+    (strokes, n_points, 2) normalized resampled strokes and a validity mask.
+    Strokes with fewer than min_points points or a bounding box smaller than
+    min_extent (in input units) are left invalid.
+    """
+    count = len(offsets) - 1
+    out = np.zeros((count, n_points, 2))
+    valid = np.zeros(count, dtype=np.bool_)
+    for s in range(count):
+        start, end = offsets[s], offsets[s + 1]
+        m = end - start
+        if m < min_points:
+            continue
+        min_x, max_x, min_y, max_y = x[start], x[start], y[start], y[start]
+        for i in range(start + 1, end):
+            min_x = min(min_x, x[i])
+            max_x = max(max_x, x[i])
+            min_y = min(min_y, y[i])
+            max_y = max(max_y, y[i])
+        extent = max(max_x - min_x, max_y - min_y)
+        if extent < min_extent:
+            continue
+
+        cumulative = np.empty(m)
+        cumulative[0] = 0.0
+        for i in range(1, m):
+            cumulative[i] = cumulative[i - 1] + np.hypot(x[start + i] - x[start + i - 1], y[start + i] - y[start + i - 1])
+        total = cumulative[m - 1]
+        if total <= 0:
+            continue
+
+        center_x = (min_x + max_x) / 2
+        center_y = (min_y + max_y) / 2
+        j = 0
+        for k in range(n_points):
+            target = total * k / (n_points - 1)
+            while j < m - 2 and cumulative[j + 1] < target:
+                j += 1
+            segment = cumulative[j + 1] - cumulative[j]
+            f = (target - cumulative[j]) / segment if segment > 0 else 0.0
+            f = min(max(f, 0.0), 1.0)
+            px = x[start + j] + f * (x[start + j + 1] - x[start + j])
+            py = y[start + j] + f * (y[start + j + 1] - y[start + j])
+            out[s, k, 0] = (px - center_x) / extent
+            out[s, k, 1] = (py - center_y) / extent
+        valid[s] = True
+    return out, valid
+
+@njit(cache=True)
+def envelopes(templates, window):
+    """LB_Keogh upper/lower envelopes of each template over +-window points"""
+    count, n, dims = templates.shape
+    upper = np.empty_like(templates)
+    lower = np.empty_like(templates)
+    for t in range(count):
+        for i in range(n):
+            lo = max(0, i - window)
+            hi = min(n, i + window + 1)
+            for d in range(dims):
+                upper[t, i, d] = templates[t, lo:hi, d].max()
+                lower[t, i, d] = templates[t, lo:hi, d].min()
+    return upper, lower
+
+@njit(cache=True)
+def lb_kim(a, b):
+    """Lower bound of DTW(a, b): every warping path matches the first and the last points"""
+    n = a.shape[0] - 1
+    return ((a[0, 0] - b[0, 0]) ** 2 + (a[0, 1] - b[0, 1]) ** 2
+            + (a[n, 0] - b[n, 0]) ** 2 + (a[n, 1] - b[n, 1]) ** 2)
+
+@njit(cache=True)
+def lb_keogh(query, upper, lower, best_so_far):
+    """Lower bound of banded DTW(query, template) from the template's envelope; stops early past best_so_far"""
+    bound = 0.0
+    for i in range(query.shape[0]):
+        for d in range(query.shape[1]):
+            q = query[i, d]
+            excess = max(q - upper[i, d], 0.0) + max(lower[i, d] - q, 0.0)
+            bound += excess * excess
+        if bound >= best_so_far:
+            break
+    return bound
+
+@njit(cache=True)
+def dtw_banded(a, b, window, best_so_far):
+    """Banded DTW distance, or inf once it cannot beat best_so_far"""
+    n = a.shape[0]
+    previous = np.full(n + 1, np.inf)
+    current = np.full(n + 1, np.inf)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        current[:] = np.inf
+        row_min = np.inf
+        for j in range(max(1, i - window), min(n, i + window) + 1):
+            cost = (a[i - 1, 0] - b[j - 1, 0]) ** 2 + (a[i - 1, 1] - b[j - 1, 1]) ** 2
+            value = cost + min(previous[j], previous[j - 1], current[j - 1])
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min >= best_so_far:
+            return np.inf
+        previous, current = current, previous
+    return previous[n]
+
+@njit(cache=True)
+def nearest_templates(queries, valid, templates, upper, lower, window, max_distance):
+    """
+    Best template per valid query within max_distance: (template index or -1,
+    DTW distance or inf, number of full DTW evaluations). Templates are screened
+    with LB_Kim, then LB_Keogh, before the DTW is run.
+    """
+    count = queries.shape[0]
+    best_index = np.full(count, -1, dtype=np.int64)
+    best_distance = np.full(count, np.inf)
+    evaluated = 0
+    for s in range(count):
+        if not valid[s]:
+            continue
+        query = queries[s]
+        best = max_distance
+        for t in range(templates.shape[0]):
+            if lb_kim(query, templates[t]) >= best:
+                continue
+            if lb_keogh(query, upper[t], lower[t], best) >= best:
+                continue
+            distance = dtw_banded(query, templates[t], window, best)
+            evaluated += 1
+            if distance < best:
+                best = distance
+                best_index[s] = t
+                best_distance[s] = distance
+    return best_index, best_distance, evaluated
+
+def warm_up():
+    """Compile (or load from the on-disk cache) every kernel with the production signatures"""
+    x = np.linspace(0.0, 10.0, 8)
+    offsets = np.array([0, 8], dtype=np.int64)
+    queries, valid = resample_strokes(x, x, offsets, 8, 2, 1.0)
+    upper, lower = envelopes(queries, 1)
+    nearest_templates(queries, valid, queries, upper, lower, 1, np.inf)
+
+if __name__ == "__main__":
+    warm_up()
+    print("DTW kernels compiled")
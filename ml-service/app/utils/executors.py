@@ -0,0 +1,114 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class LaneSaturated(Exception):
+    """Raised when a lane's queue is full; routers turn this into 503"""
+
+    def __init__(self, lane: str):
+        super().__init__(f"{lane} lane is saturated, retry later")
+        self.lane = lane
+
+class ExecutionLane:
+    """
+    A named, bounded executor.
+
+    At most max_workers jobs run and max_queue more wait; further submissions are
+    rejected immediately with LaneSaturated instead of queueing without bound, so
+    one kind of work cannot build up latency for another.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown lane kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[Executor] = None
+        self.inflight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use so importing the app does not start workers
+        if self._executor is None:
+            if self.kind == 'process':
+                # spawn: children must not inherit locks held by loader/batcher threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"lane-{self.name}")
+            logger.info(f"{self.name} lane started: {self.max_workers} {self.kind} workers, queue {self.max_queue}")
+        return self._executor
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable, *args: Any, admit: bool = True) -> Any:
+        """
+        Run fn(*args) on the lane. admit=False skips the saturation check for callers
+        that already bound their own concurrency (e.g. batch scoring), while still
+        counting toward queue depth.
+        """
+        if admit and self.inflight >= self.capacity:
+            self.rejected += 1
+            raise LaneSaturated(self.name)
+
+        self.inflight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.inflight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "inflight": self.inflight,
+            "queued": max(0, self.inflight - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def _cpu_count() -> int:
+    return os.cpu_count() or 1
+
+# Latency-critical, sub-millisecond handlers (cognitive load)
+realtime_lane = ExecutionLane(
+    'realtime', 'thread',
+    max_workers=settings.REALTIME_LANE_WORKERS,
+    max_queue=settings.REALTIME_LANE_QUEUE
+)
+
+# CPU-heavy analyzers (screening games, speech)
+heavy_lane = ExecutionLane(
+    'heavy', settings.HEAVY_LANE_KIND,
+    max_workers=settings.HEAVY_LANE_WORKERS or _cpu_count(),
+    max_queue=settings.HEAVY_LANE_QUEUE
+)
+
+LANES = {lane.name: lane for lane in (realtime_lane, heavy_lane)}
+
+def lane_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: lane.stats() for name, lane in LANES.items()}
+
+def shutdown_executors():
+    """Stop worker pools (called on app shutdown)"""
+    for lane in LANES.values():
+        lane.shutdown()
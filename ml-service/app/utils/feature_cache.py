@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+from typing import Any, Callable, Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+META_NAME = 'meta.json'
+
+def digest_file(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _digest_default(value: Any) -> Any:
+    # NumPy arrays (binary payloads) are hashed by dtype, shape and raw bytes
+    if isinstance(value, np.ndarray):
+        data = hashlib.sha256(np.ascontiguousarray(value)).hexdigest()
+        return {"__ndarray__": [str(value.dtype), list(value.shape), data]}
+    return str(value)
+
+def digest_json(*parts: Any) -> str:
+    """Content hash of JSON-serializable input (dict keys sorted, so key order doesn't matter)"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=_digest_default)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class FeatureCache:
+    """
+    On-disk, content-addressed store for extracted features.
+
+    Entries live at <root>/<extractor>/<version>/<digest[:2]>/<digest>/ with one .npy
+    file per array feature (read back memory-mapped) and meta.json for scalar
+    features. Reads refresh the entry's mtime, and once the total size exceeds
+    max_bytes the least recently used entries are removed. The first time an
+    extractor is used at a new version, that extractor's other versions are deleted
+    and nothing else is touched.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size_estimate: Optional[int] = None
+        self._checked_versions = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_dir(self, extractor: str, version: str, digest: str) -> str:
+        return os.path.join(self.root, extractor, version, digest[:2], digest)
+
+    def get(self, extractor: str, version: str, digest: str) -> Optional[Dict[str, Any]]:
+        entry = self._entry_dir(extractor, version, digest)
+        meta_path = os.path.join(entry, META_NAME)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            features = dict(meta['scalars'])
+            for name in meta['arrays']:
+                features[name] = np.load(os.path.join(entry, f"{name}.npy"), mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        # LRU bookkeeping: the entry's mtime is its last access
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        self.hits += 1
+        return features
+
+    def put(self, extractor: str, version: str, digest: str, features: Dict[str, Any]):
+        self._purge_stale_versions(extractor, version)
+        entry = self._entry_dir(extractor, version, digest)
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+
+        # Write into a temp dir and rename, so readers never see partial entries
+        tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+        arrays = {k: v for k, v in features.items() if isinstance(v, np.ndarray)}
+        scalars = {k: v for k, v in features.items() if not isinstance(v, np.ndarray)}
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp, META_NAME), 'w') as f:
+            json.dump({"arrays": sorted(arrays), "scalars": scalars, "created_at": time.time()}, f)
+
+        size = _dir_size(tmp)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another worker stored the same content first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        with self._lock:
+            if self._size_estimate is not None:
+                self._size_estimate += size
+        self._evict_if_needed()
+
+    def get_or_compute(self, extractor: str, version: str, digest: str,
+                       compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        cached = self.get(extractor, version, digest)
+        if cached is not None:
+            return cached
+        features = compute()
+        try:
+            self.put(extractor, version, digest, features)
+        except OSError as e:
+            logger.warning(f"Feature cache write failed for {extractor}: {e}")
+        return features
+
+    def _purge_stale_versions(self, extractor: str, version: str):
+        marker = (extractor, version)
+        if marker in self._checked_versions:
+            return
+        self._checked_versions.add(marker)
+
+        base = os.path.join(self.root, extractor)
+        if not os.path.isdir(base):
+            return
+        for other in os.listdir(base):
+            if other != version:
+                logger.info(f"Feature cache: dropping {extractor} version {other}")
+                shutil.rmtree(os.path.join(base, other), ignore_errors=True)
+                with self._lock:
+                    self._size_estimate = None
+
+    def _scan(self):
+        """(total bytes, [(last_access, bytes, entry_dir)]) for every entry on disk"""
+        entries, total = [], 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if META_NAME in filenames and not os.path.basename(dirpath).startswith('.tmp-'):
+                size = _dir_size(dirpath)
+                entries.append((os.path.getmtime(os.path.join(dirpath, META_NAME)), size, dirpath))
+                total += size
+                dirnames[:] = []
+        return total, entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._size_estimate is not None and self._size_estimate <= self.max_bytes:
+                return
+            # Other workers share the directory, so re-measure before evicting
+            total, entries = self._scan()
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                self.evictions += 1
+            self._size_estimate = total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "max_bytes": self.max_bytes,
+            "size_bytes_estimate": self._size_estimate,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+def _dir_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+feature_cache: Optional[FeatureCache] = (
+    FeatureCache(settings.FEATURE_CACHE_DIR, settings.FEATURE_CACHE_MAX_MB * 1024 * 1024)
+    if settings.FEATURE_CACHE_DIR else None
+)
+
+def cached_features(extractor: str, version: str, digest: str,
+                    compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run compute() through the feature cache, or directly when the cache is disabled"""
+    if feature_cache is None:
+        return compute()
+    return feature_cache.get_or_compute(extractor, version, digest, compute)
@@ -0,0 +1,237 @@
+"""
+In-process latency/size metrics with Prometheus text exposition.
+
+Stages are timed with time.perf_counter_ns and recorded into fixed-bucket
+histograms keyed by stage name. Work that runs on a process lane is timed in
+the worker with run_timed and recorded by the caller, so every observation
+lands in the serving process's registry. Each uvicorn worker process has its
+own registry; scrape every worker, or aggregate with sum() in PromQL.
+"""
+import os
+import time
+import threading
+import functools
+import contextlib
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds: 100us .. 30s, dense around the realtime (<50 ms) and screening (0.1-5 s) ranges
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes: 256 B .. 64 MB
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+class Histogram:
+    """Cumulative-bucket histogram family with one series per label tuple"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float, int]]:
+        with self._lock:
+            return {labels: (list(s[0]), s[1], s[2]) for labels, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{base} {total!r}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {value!r}" for labels, value in sorted(values.items())]
+        return lines
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+def _samples(name: str, help_text: str, kind: str, samples: Sequence[Tuple[Dict[str, str], float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value!r}" for labels, value in samples]
+    return lines
+
+def gauge_lines(name: str, help_text: str, samples: Sequence[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Exposition lines for a gauge read at scrape time: [({label: value}, sample), ...]"""
+    return _samples(name, help_text, 'gauge', samples)
+
+def counter_lines(name: str, help_text: str, samples: Sequence[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Exposition lines for a counter kept elsewhere (e.g. cache hit counts)"""
+    return _samples(name, help_text, 'counter', samples)
+
+STAGE_SECONDS = Histogram('ml_stage_duration_seconds', "Time spent in one processing stage", ['stage'], LATENCY_BUCKETS)
+REQUEST_SECONDS = Histogram('ml_http_request_duration_seconds', "End-to-end request latency inside the app",
+                            ['method', 'route'], LATENCY_BUCKETS)
+REQUEST_BYTES = Histogram('ml_http_request_body_bytes', "Request body size", ['method', 'route'], SIZE_BUCKETS)
+REQUESTS_TOTAL = Counter('ml_http_requests_total', "Completed requests by status code", ['method', 'route', 'status'])
+
+_inflight = 0
+_inflight_peak = 0
+_inflight_lock = threading.Lock()
+
+def record_stage(stage: str, elapsed_ns: int):
+    STAGE_SECONDS.observe(elapsed_ns / 1e9, stage)
+
+@contextlib.contextmanager
+def timed(stage: str):
+    """Record the duration of the with-block under `stage`, including when it raises"""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter_ns() - start)
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator form of timed()"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def run_timed(fn: Callable, *args) -> Tuple[Any, int]:
+    """(fn(*args), elapsed ns); picklable, so process-lane workers can report their own compute time"""
+    start = time.perf_counter_ns()
+    result = fn(*args)
+    return result, time.perf_counter_ns() - start
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: request latency, body size and status per route template,
+    plus in-flight request concurrency. Websockets and lifespan pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def route_label(scope) -> str:
+        """Full path template of the matched route (e.g. /api/ml/admin/models/{model_name}/reload)"""
+        template = getattr(scope.get('route'), 'path', None)
+        if template is None or scope.get('endpoint') is None:
+            return 'unmatched'
+        # include_router stores the full prefixed path on the route
+        return template
+
+    async def __call__(self, scope, receive, send):
+        global _inflight, _inflight_peak
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        body_bytes = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal body_bytes
+            message = await receive()
+            if message['type'] == 'http.request':
+                body_bytes += len(message.get('body', b''))
+            return message
+
+        async def status_send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        with _inflight_lock:
+            _inflight += 1
+            _inflight_peak = max(_inflight_peak, _inflight)
+        start = time.perf_counter_ns()
+        try:
+            await self.app(scope, counting_receive, status_send)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            with _inflight_lock:
+                _inflight -= 1
+            # Label by route template, not raw path, to keep label cardinality bounded
+            route = self.route_label(scope)
+            method = scope.get('method', '')
+            REQUEST_SECONDS.observe(elapsed / 1e9, method, route)
+            REQUEST_BYTES.observe(body_bytes, method, route)
+            REQUESTS_TOTAL.inc(method, route, str(status))
+
+def _process_lines() -> List[str]:
+    import psutil
+
+    process = psutil.Process(os.getpid())
+    memory = process.memory_info()
+    cpu = process.cpu_times()
+    with _inflight_lock:
+        inflight, peak = _inflight, _inflight_peak
+    return (
+        gauge_lines('process_resident_memory_bytes', "Resident set size of this worker process", [({}, memory.rss)])
+        + gauge_lines('process_virtual_memory_bytes', "Virtual memory size of this worker process", [({}, memory.vms)])
+        + counter_lines('process_cpu_seconds_total', "User and system CPU time of this worker process",
+                        [({}, cpu.user + cpu.system)])
+        + gauge_lines('process_threads', "Threads in this worker process", [({}, process.num_threads())])
+        + gauge_lines('ml_http_requests_in_flight', "Requests currently being handled", [({}, inflight)])
+        + gauge_lines('ml_http_requests_in_flight_peak', "Highest concurrent requests since start", [({}, peak)])
+    )
+
+def _lane_lines() -> List[str]:
+    from app.utils.executors import lane_stats
+
+    stats = lane_stats()
+    lines = []
+    for field, help_text in (('inflight', "Jobs admitted to the lane and not yet finished"),
+                             ('queued', "Jobs waiting for a lane worker")):
+        lines += gauge_lines(f'ml_lane_{field}', help_text, [({'lane': name}, s[field]) for name, s in stats.items()])
+    for field, help_text in (('completed', "Jobs finished by the lane"),
+                             ('rejected', "Jobs rejected because the lane was saturated")):
+        lines += counter_lines(f'ml_lane_{field}_total', help_text,
+                               [({'lane': name}, s[field]) for name, s in stats.items()])
+    return lines
+
+def render_metrics(extra: Optional[List[str]] = None) -> str:
+    """Prometheus text exposition (format 0.0.4) of everything this process has recorded"""
+    lines = []
+    for metric in (STAGE_SECONDS, REQUEST_SECONDS, REQUEST_BYTES, REQUESTS_TOTAL):
+        lines += metric.render()
+    lines += _process_lines()
+    lines += _lane_lines()
+    lines += extra or []
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Coalesce concurrent async requests into one batched call.
+
+    Items submitted within max_wait_ms of the first pending item (or until
+    max_batch_size items are pending) are passed together to run_batch, which
+    runs on a worker thread and must return one result per item, in order.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0, name: str = "batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches_run = 0
+        self.items_run = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            # Overflow beyond one batch starts its own wait window
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[tuple]):
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.to_thread(self.run_batch, items)
+        except Exception as e:
+            logger.error(f"{self.name}: batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.items_run += len(items)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
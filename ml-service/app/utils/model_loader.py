@@ -1,58 +1,157 @@
 import os
-import joblib
-# import tensorflow as tf # Import locally if heavy
-from tensorflow import keras
+import time
+import threading
 import logging
+import psutil
+from typing import Dict, Any, Iterable, Optional, Tuple
+from app.utils.artifact_store import store_root, resolve_artifact, verify_artifact, ArtifactError
 
 logger = logging.getLogger(__name__)
 
+# Model name -> (legacy flat file names under MODEL_PATH, loader kind)
+# Versioned entries in the artifact store manifest take precedence over legacy files.
+# Neural nets prefer the .npz export (numpy_runtime), which serves without TensorFlow.
+MODEL_SPECS = {
+    'screening_rf': (('screening_rf.pkl',), 'joblib'),
+    'screening_mlp': (('screening_mlp.npz', 'screening_mlp.keras', 'screening_mlp.h5'), 'keras'),
+    'cognitive_load_tree': (('cognitive_load_tree.pkl',), 'joblib'),
+    # train_lstm.py saves the native .keras format; export_models.py adds the .npz
+    'lstm_attention': (('lstm_attention.npz', 'lstm_attention.keras', 'lstm_attention.h5'), 'keras'),
+    'lstm_scaler': (('lstm_scaler.pkl',), 'joblib'),
+}
+
+# Legacy files whose extension implies a different kind than the spec's default
+KIND_BY_EXTENSION = {'.npz': 'numpy'}
+
 # Global dictionary to store loaded models (singleton)
+# A model name appears here only once a load was attempted; None means unavailable.
 MODELS = {}
 
-def load_all_models():
-    """Load all ML models at startup"""
-    # Assuming code run from root context
-    models_dir = os.path.join(os.getcwd(), 'app', 'ml_models')
-    
-    try:
-        # 1. Screening Random Forest
-        rf_path = os.path.join(models_dir, 'screening_rf.pkl')
-        if os.path.exists(rf_path):
-            MODELS['screening_rf'] = joblib.load(rf_path)
-            logger.info("✓ Screening Random Forest loaded")
-        else:
-            logger.warning(f"⚠ screening_rf.pkl not found at {rf_path}, using placeholder")
-            MODELS['screening_rf'] = None
-        
-        # 2. Screening MLP
-        mlp_path = os.path.join(models_dir, 'screening_mlp.h5')
-        if os.path.exists(mlp_path):
-            MODELS['screening_mlp'] = keras.models.load_model(mlp_path)
-            logger.info("✓ Screening MLP loaded")
-        else:
-            MODELS['screening_mlp'] = None
-        
-        # 3. Cognitive Load Decision Tree
-        tree_path = os.path.join(models_dir, 'cognitive_load_tree.pkl')
-        if os.path.exists(tree_path):
-            MODELS['cognitive_load_tree'] = joblib.load(tree_path)
-            logger.info("✓ Cognitive Load Decision Tree loaded")
-        else:
-            MODELS['cognitive_load_tree'] = None
-        
-        # 4. LSTM Attention
-        lstm_path = os.path.join(models_dir, 'lstm_attention.h5')
-        if os.path.exists(lstm_path):
-            MODELS['lstm_attention'] = keras.models.load_model(lstm_path)
-            logger.info("✓ LSTM Attention model loaded")
-        else:
-            MODELS['lstm_attention'] = None
-        
-    except Exception as e:
-        logger.error(f"Error loading models: {e}")
-        # Not raising error to allow service to start in dev mode
-        pass
+# Per-model load report: status, version, load_time_ms, rss_delta_bytes, file_size_bytes
+MODEL_STATS: Dict[str, Dict[str, Any]] = {}
+
+_locks = {name: threading.Lock() for name in MODEL_SPECS}
+
+def models_dir() -> str:
+    return store_root()
+
+def _deserialize(kind: str, path: str):
+    """Import the heavy ML library only when a model of that kind is actually needed"""
+    if kind == 'joblib':
+        import joblib
+        # Memory-map numpy arrays inside the pickle so worker processes share pages
+        return joblib.load(path, mmap_mode='r')
+    if kind == 'numpy':
+        from app.utils.numpy_runtime import load_numpy_model
+        return load_numpy_model(path)
+    if kind == 'keras':
+        from tensorflow import keras
+        return keras.models.load_model(path)
+    raise ValueError(f"Unknown model kind: {kind}")
+
+def _locate(model_name: str, version: Optional[str] = None) -> Optional[Tuple[str, str, str]]:
+    """(path, kind, version) of the artifact to load, or None if there is none"""
+    legacy_files, kind = MODEL_SPECS[model_name]
+    resolved = resolve_artifact(model_name, version)
+    if resolved:
+        path, version, entry = resolved
+        verify_artifact(path, entry)
+        return path, entry.get('kind', kind), version
+    if version:
+        raise ArtifactError(f"{model_name} is not registered in the artifact store")
+
+    for filename in legacy_files:
+        path = os.path.join(models_dir(), filename)
+        if os.path.exists(path):
+            return path, KIND_BY_EXTENSION.get(os.path.splitext(filename)[1], kind), 'legacy'
+    return None
+
+def _load_model(model_name: str, version: Optional[str] = None):
+    """Returns (model, stats); raises on failure"""
+    located = _locate(model_name, version)
+    if located is None:
+        logger.warning(f"⚠ {model_name} not found in {models_dir()}, using placeholder")
+        return None, {"status": "missing"}
+    path, kind, version = located
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    model = _deserialize(kind, path)
+
+    # RSS delta is approximate when other loads run concurrently
+    stats = {
+        "status": "loaded",
+        "version": version,
+        "load_time_ms": round((time.perf_counter() - start) * 1000, 2),
+        "rss_delta_bytes": max(0, process.memory_info().rss - rss_before),
+        "file_size_bytes": os.path.getsize(path)
+    }
+    logger.info(f"✓ {model_name} ({version}) loaded in {stats['load_time_ms']} ms")
+    return model, stats
 
 def get_model(model_name: str):
-    """Get a loaded model by name"""
-    return MODELS.get(model_name)
+    """Get a model by name, loading it on first use"""
+    if model_name in MODELS:
+        return MODELS[model_name]
+    if model_name not in MODEL_SPECS:
+        return None
+
+    with _locks[model_name]:
+        # Another thread may have finished the load while we waited
+        if model_name not in MODELS:
+            try:
+                model, stats = _load_model(model_name)
+            except Exception as e:
+                logger.error(f"Error loading {model_name}: {e}")
+                model, stats = None, {"status": "error", "error": str(e)}
+            MODEL_STATS[model_name] = stats
+            MODELS[model_name] = model
+    return MODELS[model_name]
+
+def reload_model(model_name: str, version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Hot-swap a model without a restart.
+    The new artifact is fully loaded before the MODELS entry is replaced, so requests
+    keep using the old model until the swap and a failed load leaves it in place.
+    """
+    if model_name not in MODEL_SPECS:
+        raise KeyError(model_name)
+
+    # Nothing to swap in: keep serving whatever is loaded rather than dropping it
+    if _locate(model_name, version) is None:
+        raise ArtifactError(f"No artifact found for {model_name} in {models_dir()}")
+    model, stats = _load_model(model_name, version)
+    with _locks[model_name]:
+        MODELS[model_name] = model
+        MODEL_STATS[model_name] = stats
+    return stats
+
+def load_all_models():
+    """Eagerly load every registered model"""
+    for model_name in MODEL_SPECS:
+        get_model(model_name)
+
+def warm_up_models(model_names: Iterable[str]) -> Optional[threading.Thread]:
+    """Load the given models on a background thread so startup does not wait for them"""
+    names = [name for name in model_names if name in MODEL_SPECS]
+    unknown = set(model_names) - set(names)
+    if unknown:
+        logger.warning(f"Ignoring unknown models in warm-up list: {sorted(unknown)}")
+    if not names:
+        return None
+
+    def _run():
+        for name in names:
+            get_model(name)
+
+    thread = threading.Thread(target=_run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def model_status() -> Dict[str, Dict[str, Any]]:
+    """Load state of every registered model, for the health endpoint"""
+    return {
+        name: MODEL_STATS.get(name, {"status": "loading" if _locks[name].locked() else "not_loaded"})
+        for name in MODEL_SPECS
+    }
@@ -0,0 +1,186 @@
+"""
+TensorFlow-free inference for the small Keras models the service uses.
+
+ml-training/scripts/export_models.py converts a trained Keras Sequential model
+(LSTM / Dense / BatchNormalization layers) into a single .npz file: the weight
+arrays plus a JSON layer list. NumpySequential runs the forward pass with
+plain float32 NumPy and exposes predict_on_batch like a Keras model, so the
+services use it unchanged. Loading it takes milliseconds and no TensorFlow import.
+
+.npz layout:
+    __layers__        0-d str array, JSON list of {"type": ..., <config>, "weights": [array keys]}
+    layer<i>_<name>   weight arrays, in Keras get_weights() order
+"""
+import json
+import numpy as np
+from typing import Any, Dict, List, Sequence
+
+FORMAT_VERSION = 1
+LAYERS_KEY = '__layers__'
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # tanh form: no overflow for large negative inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh,
+    'softmax': _softmax
+}
+
+def _activation(name: str):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+class DenseLayer:
+    __slots__ = ('kernel', 'bias', 'activation')
+
+    def __init__(self, config: Dict[str, Any], kernel: np.ndarray, bias: np.ndarray = None):
+        self.kernel = kernel
+        self.bias = bias
+        self.activation = _activation(config.get('activation', 'linear'))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        out = x @ self.kernel
+        if self.bias is not None:
+            out += self.bias
+        return self.activation(out)
+
+class LSTMLayer:
+    """Keras LSTM forward pass (gate order i, f, c, o)"""
+    __slots__ = ('kernel', 'recurrent_kernel', 'bias', 'units', 'return_sequences',
+                 'activation', 'recurrent_activation')
+
+    def __init__(self, config: Dict[str, Any], kernel: np.ndarray, recurrent_kernel: np.ndarray,
+                 bias: np.ndarray = None):
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+        self.units = recurrent_kernel.shape[0]
+        self.return_sequences = config.get('return_sequences', False)
+        self.activation = _activation(config.get('activation', 'tanh'))
+        self.recurrent_activation = _activation(config.get('recurrent_activation', 'sigmoid'))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        batch, steps, _ = x.shape
+        units = self.units
+        # Input projections of all timesteps in one matmul; only h @ U stays in the loop
+        z_x = x @ self.kernel
+        if self.bias is not None:
+            z_x += self.bias
+        h = np.zeros((batch, units), dtype=x.dtype)
+        c = np.zeros((batch, units), dtype=x.dtype)
+        outputs = np.empty((batch, steps, units), dtype=x.dtype) if self.return_sequences else None
+
+        for t in range(steps):
+            z = z_x[:, t] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :units])
+            f = self.recurrent_activation(z[:, units:2 * units])
+            g = self.activation(z[:, 2 * units:3 * units])
+            o = self.recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+class BatchNormLayer:
+    """Inference-mode BatchNormalization folded into one scale and shift"""
+    __slots__ = ('scale', 'shift')
+
+    def __init__(self, config: Dict[str, Any], gamma: np.ndarray, beta: np.ndarray,
+                 moving_mean: np.ndarray, moving_variance: np.ndarray):
+        self.scale = gamma / np.sqrt(moving_variance + config.get('epsilon', 1e-3))
+        self.shift = beta - moving_mean * self.scale
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return x * self.scale + self.shift
+
+class ActivationLayer:
+    __slots__ = ('activation',)
+
+    def __init__(self, config: Dict[str, Any]):
+        self.activation = _activation(config.get('activation', 'linear'))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return self.activation(x)
+
+class FlattenLayer:
+    __slots__ = ()
+
+    def __init__(self, config: Dict[str, Any]):
+        pass
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return x.reshape(len(x), -1)
+
+LAYER_TYPES = {
+    'dense': DenseLayer,
+    'lstm': LSTMLayer,
+    'batch_norm': BatchNormLayer,
+    'activation': ActivationLayer,
+    'flatten': FlattenLayer
+}
+
+class NumpySequential:
+    """Drop-in for a Keras Sequential model at inference time"""
+
+    def __init__(self, layers: List, input_shape: Sequence[int] = None):
+        self.layers = layers
+        self.input_shape = tuple(input_shape) if input_shape else None
+
+    def predict_on_batch(self, x) -> np.ndarray:
+        out = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            out = layer(out)
+        return out
+
+    __call__ = predict_on_batch
+
+    def predict(self, x, batch_size: int = 1024, verbose: int = 0) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if len(x) <= batch_size:
+            return self.predict_on_batch(x)
+        return np.concatenate([self.predict_on_batch(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+def save_numpy_model(path: str, layers: List[Dict[str, Any]], input_shape: Sequence[int] = None):
+    """
+    Write an .npz model. `layers` items are {"type": ..., <config>..., "weights": [ndarray, ...]};
+    weights are stored as float32.
+    """
+    arrays = {}
+    specs = []
+    for i, layer in enumerate(layers):
+        if layer['type'] not in LAYER_TYPES:
+            raise ValueError(f"Unsupported layer type: {layer['type']}")
+        spec = {k: v for k, v in layer.items() if k != 'weights'}
+        spec['weights'] = []
+        for j, weight in enumerate(layer.get('weights', [])):
+            key = f"layer{i}_{j}"
+            arrays[key] = np.asarray(weight, dtype=np.float32)
+            spec['weights'].append(key)
+        specs.append(spec)
+    header = {"format_version": FORMAT_VERSION, "input_shape": list(input_shape) if input_shape else None,
+              "layers": specs}
+    with open(path, 'wb') as f:
+        np.savez(f, **{LAYERS_KEY: np.array(json.dumps(header))}, **arrays)
+
+def load_numpy_model(path: str) -> NumpySequential:
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data[LAYERS_KEY]))
+        if header.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported numpy model format: {header.get('format_version')}")
+        layers = []
+        for spec in header['layers']:
+            layer_cls = LAYER_TYPES.get(spec['type'])
+            if layer_cls is None:
+                raise ValueError(f"Unsupported layer type: {spec['type']}")
+            layers.append(layer_cls(spec, *(data[key] for key in spec['weights'])))
+    return NumpySequential(layers, header.get('input_shape'))
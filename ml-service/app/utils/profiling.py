@@ -0,0 +1,250 @@
+"""
+Opt-in per-request profiling for diagnosing slow requests in production.
+
+A request is profiled when it carries `X-Profile: sample|cprofile` with a valid
+X-Admin-Token, or when it falls in the sampled fraction set through the admin
+API. Only the request's own lane job is profiled: it runs under run_profiled
+inside the lane worker (thread or process) and comes back with its profile.
+The serving process stores that profile next to a redacted copy of the payload
+under PROFILE_DIR; both are served by /api/ml/admin/profiles.
+
+Modes:
+    sample    A daemon thread snapshots the worker thread's stack every
+              PROFILE_SAMPLE_INTERVAL_MS and counts collapsed stacks
+              (flamegraph.pl / speedscope input). The profiled code runs
+              unmodified, so overhead is low.
+    cprofile  Deterministic cProfile; stored as a marshalled pstats file
+              (load with pstats.Stats(path)). Exact call counts, slower.
+"""
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import shutil
+import marshal
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODES = ('sample', 'cprofile')
+PROFILE_FILES = {'sample': 'profile.collapsed', 'cprofile': 'profile.pstats'}
+# String values kept in redacted payloads; every other string becomes REDACTED
+KEPT_STRING_KEYS = {'language', 'task_type', 'passage_id'}
+REDACTED = '<redacted>'
+_PROFILE_ID = re.compile(r'^\d{8}T\d{6}-[0-9a-f]{8}$')
+
+# Runtime toggle (per worker process), changed through the admin API
+profiling_config = {"sample_rate": settings.PROFILE_SAMPLE_RATE, "mode": "sample"}
+
+class ProfileResult(NamedTuple):
+    mode: str
+    data: bytes
+    samples: int  # stack samples (sample mode) or profiled functions (cprofile)
+    duration_ns: int
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    return bool(settings.ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, settings.ADMIN_TOKEN)
+
+def profile_mode(headers) -> Optional[str]:
+    """Profiling mode for this request, or None"""
+    requested = headers.get('x-profile')
+    if requested:
+        requested = 'sample' if requested.lower() in ('1', 'true') else requested.lower()
+        # Ignored without a valid admin token: clients must not be able to trigger profiling
+        if requested in MODES and admin_token_valid(headers.get('x-admin-token')):
+            return requested
+        return None
+    rate = profiling_config['sample_rate']
+    if rate > 0 and random.random() < rate:
+        return profiling_config['mode']
+    return None
+
+class StackSampler:
+    """Counts collapsed stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, thread_id: int, interval_s: float, stop_code=None):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        # Frames above this code object (the executor machinery) are left out
+        self.stop_code = stop_code
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and frame.f_code is not self.stop_code:
+            code = frame.f_code
+            stack.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        if stack:
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+def run_profiled(mode: str, fn: Callable, *args) -> Tuple[Any, ProfileResult]:
+    """(fn(*args), profile); runs inside the lane worker, so it profiles the actual work"""
+    start = time.perf_counter_ns()
+    if mode == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, *args)
+        profiler.create_stats()
+        data, samples = marshal.dumps(profiler.stats), len(profiler.stats)
+    else:
+        sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+                               stop_code=run_profiled.__code__)
+        sampler.start()
+        try:
+            result = fn(*args)
+        finally:
+            counts = sampler.stop()
+        data = ''.join(f"{stack} {count}\n" for stack, count in counts.most_common()).encode()
+        samples = sum(counts.values())
+    return result, ProfileResult(mode, data, samples, time.perf_counter_ns() - start)
+
+def redact(value: Any, key: Optional[str] = None) -> Any:
+    """
+    Copy of a payload with only numeric content left: strings (ids, URLs) are replaced
+    except for KEPT_STRING_KEYS, bytes are dropped, and NumPy arrays (binary payloads)
+    become lists so the result is replayable JSON.
+    """
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if isinstance(value, str):
+        return value if key in KEPT_STRING_KEYS else REDACTED
+    if isinstance(value, (bytes, bytearray)):
+        return REDACTED
+    if isinstance(value, np.ndarray):
+        if value.dtype.names:
+            return [dict(zip(value.dtype.names, row)) for row in value.tolist()]
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, '_asdict'):
+        value = value._asdict()
+    elif hasattr(value, 'model_fields'):
+        # pydantic model: walk the raw field values (model_dump would flatten NamedTuples)
+        value = dict(value)
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, key) for v in value]
+    return REDACTED
+
+def _profile_dir(profile_id: str) -> str:
+    if not _PROFILE_ID.match(profile_id):
+        raise KeyError(profile_id)
+    return os.path.join(settings.PROFILE_DIR, profile_id)
+
+def save_profile(route: str, profile: ProfileResult, payload: Any) -> str:
+    """Store profile + redacted payload; returns the profile id"""
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    directory = _profile_dir(profile_id)
+    os.makedirs(directory)
+    with open(os.path.join(directory, PROFILE_FILES[profile.mode]), 'wb') as f:
+        f.write(profile.data)
+    with open(os.path.join(directory, 'payload.json'), 'w') as f:
+        json.dump(redact(payload), f)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({
+            "id": profile_id,
+            "route": route,
+            "mode": profile.mode,
+            "created_at": time.time(),
+            "duration_ms": round(profile.duration_ns / 1e6, 2),
+            "samples": profile.samples,
+            "profile_file": PROFILE_FILES[profile.mode],
+            "pid": os.getpid()
+        }, f)
+    _prune()
+    return profile_id
+
+def _prune():
+    try:
+        stored = sorted(name for name in os.listdir(settings.PROFILE_DIR) if _PROFILE_ID.match(name))
+    except OSError:
+        return
+    # Ids start with a timestamp, so name order is age order
+    for name in stored[:max(0, len(stored) - settings.PROFILE_MAX_STORED)]:
+        shutil.rmtree(os.path.join(settings.PROFILE_DIR, name), ignore_errors=True)
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadata of stored profiles, newest first"""
+    profiles = []
+    try:
+        names = sorted(os.listdir(settings.PROFILE_DIR), reverse=True)
+    except OSError:
+        return profiles
+    for name in names:
+        if not _PROFILE_ID.match(name):
+            continue
+        try:
+            with open(os.path.join(settings.PROFILE_DIR, name, 'meta.json')) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # being written or pruned
+    return profiles
+
+def load_profile(profile_id: str) -> Dict[str, Any]:
+    """{"meta", "payload"} for a stored profile; KeyError if unknown"""
+    directory = _profile_dir(profile_id)
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, 'payload.json')) as f:
+            payload = json.load(f)
+    except OSError:
+        raise KeyError(profile_id)
+    return {"meta": meta, "payload": payload}
+
+def profile_file(profile_id: str) -> str:
+    """Path of the stored collapsed-stack / pstats file; KeyError if unknown"""
+    meta = load_profile(profile_id)['meta']
+    path = os.path.join(_profile_dir(profile_id), meta['profile_file'])
+    if not os.path.exists(path):
+        raise KeyError(profile_id)
+    return path
+
+def delete_profile(profile_id: str):
+    directory = _profile_dir(profile_id)
+    if not os.path.isdir(directory):
+        raise KeyError(profile_id)
+    shutil.rmtree(directory)
+
+async def run_on_lane(lane, mode: Optional[str], route: str, payload: Callable[[], Any],
+                      fn: Callable, *args) -> Tuple[Any, Optional[str]]:
+    """
+    lane.run(fn, *args), profiled when `mode` is set. Returns (result, profile id or None).
+    `payload` is only called for profiled requests.
+    """
+    if mode is None:
+        return await lane.run(fn, *args), None
+    result, profile = await lane.run(run_profiled, mode, fn, *args)
+    try:
+        profile_id = await asyncio.to_thread(save_profile, route, profile, payload())
+    except OSError as e:
+        logger.warning(f"Could not store profile for {route}: {e}")
+        profile_id = None
+    return result, profile_id
@@ -0,0 +1,40 @@
+"""
+Fixation detection scaling benchmark.
+
+Run from ml-service/:
+    python -m benchmarks.bench_fixations
+    python -m benchmarks.bench_fixations --sizes 1000 10000 100000 1000000
+
+Reports wall time per call and per-sample cost. A linear engine keeps the
+ns/sample column roughly flat as the stream grows.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.eye_tracking_service import detect_fixations, detect_fixations_ivt
+from benchmarks.generators import gaze_points
+
+def time_call(fn, points: np.ndarray, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(points)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'engine':<8}{'samples':>10}{'seconds':>12}{'ns/sample':>12}{'fixations':>11}")
+    for name, fn in (('idt', detect_fixations), ('ivt', detect_fixations_ivt)):
+        for n in args.sizes:
+            points = gaze_points(n)
+            seconds = time_call(fn, points, args.repeats)
+            count = len(fn(points))
+            print(f"{name:<8}{n:>10}{seconds:>12.4f}{seconds / n * 1e9:>12.1f}{count:>11}")
+
+if __name__ == "__main__":
+    main()
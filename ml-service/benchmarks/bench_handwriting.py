@@ -0,0 +1,55 @@
+"""
+Handwriting feature extraction benchmark.
+
+Run from ml-service/:
+    python -m benchmarks.bench_handwriting
+    python -m benchmarks.bench_handwriting --strokes 1000 10000 100000 --points 40
+
+Generates synthetic worksheets (curved strokes laid out left to right with jitter)
+and times the JSON -> StrokeArrays conversion separately from the vectorized
+analysis, next to the original per-point dict loop for the spacing features.
+"""
+import time
+import argparse
+from app.services.handwriting_analysis_service import as_stroke_arrays, extract_handwriting_features
+from benchmarks.generators import strokes as synthetic_strokes
+
+def loop_gaps(strokes):
+    """The pre-columnar implementation, kept for comparison"""
+    gaps = []
+    for i in range(1, len(strokes)):
+        prev_points = strokes[i - 1].get('points', [])
+        curr_points = strokes[i].get('points', [])
+        if not prev_points or not curr_points:
+            continue
+        gap = min(p['x'] for p in curr_points) - max(p['x'] for p in prev_points)
+        if gap > 0:
+            gaps.append(gap)
+    return gaps
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--strokes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--points', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'strokes':>8}{'points':>10}{'convert_ms':>12}{'analyze_ms':>12}{'loop_gaps_ms':>14}")
+    for n in args.strokes:
+        strokes = synthetic_strokes(n, args.points)
+        arrays = as_stroke_arrays(strokes)
+        convert = best_of(lambda: as_stroke_arrays(strokes), args.repeat)
+        analyze = best_of(lambda: extract_handwriting_features(arrays), args.repeat)
+        loop = best_of(lambda: loop_gaps(strokes), args.repeat)
+        print(f"{n:>8}{len(arrays.x):>10}{convert * 1e3:>12.1f}{analyze * 1e3:>12.1f}{loop * 1e3:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+NumPy LSTM runtime benchmark and Keras equivalence check.
+
+Run from ml-service/:
+    python -m benchmarks.bench_lstm_runtime
+    python -m benchmarks.bench_lstm_runtime --batch 1 64 512
+
+Builds the served attention architecture (LSTM 64 -> LSTM 32 -> Dense 16 -> Dense 1)
+with random weights, round-trips it through the .npz format and times
+predict_on_batch and the 48-hour autoregressive rollout. When TensorFlow is
+importable, the same weights are loaded into Keras: outputs are compared
+(exits non-zero on mismatch) and Keras is timed next to the NumPy runtime.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+from types import SimpleNamespace
+from app.services.lstm_service import FEATURES, SEQUENCE_LENGTH, forecast_batch
+from app.utils.numpy_runtime import save_numpy_model, load_numpy_model
+
+# (units, return_sequences) of the LSTM layers, then Dense units; mirrors build_lstm_model
+LSTM_UNITS = ((64, True), (32, False))
+DENSE_UNITS = ((16, 'relu'), (1, 'linear'))
+
+def random_layers(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    layers, width = [], len(FEATURES)
+    for units, return_sequences in LSTM_UNITS:
+        weights = [rng.normal(0, 0.3, (width, 4 * units)), rng.normal(0, 0.3, (units, 4 * units)),
+                   rng.normal(0, 0.1, 4 * units)]
+        layers.append({"type": "lstm", "activation": "tanh", "recurrent_activation": "sigmoid",
+                       "return_sequences": return_sequences, "weights": weights})
+        width = units
+    for units, activation in DENSE_UNITS:
+        layers.append({"type": "dense", "activation": activation,
+                       "weights": [rng.normal(0, 0.3, (width, units)), rng.normal(0, 0.1, units)]})
+        width = units
+    return layers
+
+def keras_model(layers):
+    from tensorflow import keras
+
+    model = keras.Sequential([keras.layers.InputLayer(input_shape=(SEQUENCE_LENGTH, len(FEATURES)))])
+    for layer in layers:
+        if layer['type'] == 'lstm':
+            model.add(keras.layers.LSTM(layer['weights'][1].shape[0], return_sequences=layer['return_sequences']))
+        else:
+            model.add(keras.layers.Dense(layer['weights'][1].shape[0], activation=layer['activation']))
+    for keras_layer, layer in zip(model.layers, layers):
+        keras_layer.set_weights([np.asarray(w, dtype=np.float32) for w in layer['weights']])
+    return model
+
+def best_of(fn, repeat: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 64, 512])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    layers = random_layers()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lstm_attention.npz')
+        start = time.perf_counter()
+        save_numpy_model(path, layers, (SEQUENCE_LENGTH, len(FEATURES)))
+        model = load_numpy_model(path)
+        print(f"save + load: {(time.perf_counter() - start) * 1e3:.1f} ms, {os.path.getsize(path) / 1024:.0f} KiB")
+
+    try:
+        reference = keras_model(layers)
+    except ImportError:
+        reference = None
+        print("TensorFlow not installed: skipping the Keras comparison")
+
+    scaler = SimpleNamespace(mean_=np.zeros(len(FEATURES)), scale_=np.ones(len(FEATURES)))
+    rng = np.random.default_rng(1)
+    failed = False
+    for batch in args.batch:
+        x = rng.standard_normal((batch, SEQUENCE_LENGTH, len(FEATURES))).astype(np.float32)
+        forward = best_of(lambda: model.predict_on_batch(x), args.repeat)
+        rollout = best_of(lambda: forecast_batch(model, scaler, x, 48), args.repeat)
+        line = f"batch {batch:>5}: numpy forward {forward * 1e3:8.3f} ms, 48h rollout {rollout * 1e3:9.2f} ms"
+        if reference is not None:
+            error = float(np.abs(model.predict_on_batch(x) - np.asarray(reference.predict_on_batch(x))).max())
+            keras_forward = best_of(lambda: reference.predict_on_batch(x), args.repeat)
+            line += f" | keras forward {keras_forward * 1e3:8.3f} ms, max abs error {error:.2e}"
+            failed = failed or error > 1e-4
+        print(line)
+    if failed:
+        print("NumPy runtime output differs from Keras")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Screening payload decode benchmark: JSON vs packed msgpack.
+
+Run from ml-service/:
+    python -m benchmarks.bench_payload
+    python -m benchmarks.bench_payload --samples 10000 100000 1000000
+
+For a Game 1 session of each size, measures body size and the time from raw
+bytes to the GAZE_DTYPE array the analyzers consume (request validation
+included, as in the /predict endpoint).
+"""
+import json
+import time
+import argparse
+from app.routers.screening import ScreeningRequest
+from app.services.eye_tracking_service import gaze_array
+from app.utils.binary_payload import encode_screening_request, decode_screening_payload
+from benchmarks.generators import screening_request
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--samples', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'samples':>9}{'json_mb':>9}{'msgpack_mb':>12}{'json_ms':>10}{'msgpack_ms':>12}{'speedup':>9}")
+    for n in args.samples:
+        request = screening_request(gaze=n, n_strokes=0)
+        request['games_data'] = request['games_data'][:1]
+        json_body = json.dumps(request).encode()
+        msgpack_body = encode_screening_request(request)
+
+        def from_json():
+            parsed = ScreeningRequest.model_validate_json(json_body)
+            return gaze_array(parsed.games_data[0]['eye_tracking_data'])
+
+        def from_msgpack():
+            parsed = ScreeningRequest.model_validate(decode_screening_payload(msgpack_body))
+            return gaze_array(parsed.games_data[0]['eye_tracking_data'])
+
+        json_s = best_of(from_json, args.repeat)
+        msgpack_s = best_of(from_msgpack, args.repeat)
+        print(f"{n:>9}{len(json_body) / 1e6:>9.1f}{len(msgpack_body) / 1e6:>12.1f}"
+              f"{json_s * 1e3:>10.1f}{msgpack_s * 1e3:>12.2f}{json_s / msgpack_s:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
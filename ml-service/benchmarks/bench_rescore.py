@@ -0,0 +1,47 @@
+"""
+Bulk re-scoring throughput against worker count.
+
+Run from ml-service/:
+    python -m benchmarks.bench_rescore
+    python -m benchmarks.bench_rescore --records 2000 --workers 1 2 4 8
+
+Writes a JSONL archive of generated five-game assessments, then runs
+app.rescore over it once per worker count (fresh output directory each time,
+feature cache disabled) and reports records/s and the speedup over the first
+worker count. Startup of the worker processes is included in the timing.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from app.config import settings
+from app.rescore import rescore
+from benchmarks.generators import screening_request
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--chunk-size', type=int, default=32)
+    args = parser.parse_args()
+
+    # Workers are spawned and read their own settings, so the environment is what disables the cache
+    os.environ['FEATURE_CACHE_DIR'] = settings.FEATURE_CACHE_DIR = ''
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, 'assessments.jsonl')
+        with open(archive, 'w') as f:
+            for i in range(args.records):
+                f.write(json.dumps(screening_request(gaze=1000, n_strokes=30, seed=i)) + "\n")
+
+        baseline = None
+        print(f"{'workers':>8}{'seconds':>10}{'records/s':>12}{'speedup':>10}")
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            rescore([archive], os.path.join(tmp, f'out-{workers}'), workers, args.chunk_size, 16)
+            rate = args.records / (time.perf_counter() - start)
+            baseline = baseline or rate
+            print(f"{workers:>8}{args.records / rate:>10.1f}{rate:>12.1f}{rate / baseline:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Screening ensemble cost against batch size.
+
+Run from ml-service/:
+    python -m benchmarks.bench_screening_ensemble
+    python -m benchmarks.bench_screening_ensemble --batch 1 10 100 1000 --trees 200
+
+Fits a random forest on random feature rows and builds a random NumPy MLP
+(FEATURE_COLUMNS -> 32 relu -> 1 sigmoid), installs them as screening_rf and
+screening_mlp, and times ScreeningService.predict_batch on assessments whose
+analyzer features were computed once up front. Each batch is also reported as
+the number of single predict() calls it costs, and the batched scores are
+checked against predict() row by row (exits non-zero on mismatch).
+"""
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from app.utils.model_loader import MODELS
+from app.utils.numpy_runtime import save_numpy_model, load_numpy_model
+from app.services.screening_service import FEATURE_COLUMNS, screening_service
+from app.routers.screening import ScreeningRequest, score_request
+from benchmarks.generators import screening_request
+from benchmarks.micro import measure
+
+def install_models(trees: int, seed: int = 0):
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(seed)
+    width = len(FEATURE_COLUMNS)
+    X = pd.DataFrame(rng.random((2000, width)), columns=FEATURE_COLUMNS)
+    y = (X.iloc[:, :4].sum(axis=1) + rng.normal(0, 0.3, len(X)) > 2).astype(int)
+    MODELS['screening_rf'] = RandomForestClassifier(n_estimators=trees, max_depth=10, random_state=seed).fit(X, y)
+
+    layers = [{"type": "dense", "activation": "relu", "weights": [rng.normal(0, 0.1, (width, 32)), np.zeros(32)]},
+              {"type": "dense", "activation": "sigmoid", "weights": [rng.normal(0, 0.1, (32, 1)), np.zeros(1)]}]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'screening_mlp.npz')
+        save_numpy_model(path, layers, (width,))
+        MODELS['screening_mlp'] = load_numpy_model(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--assessments', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    install_models(args.trees)
+    items = []
+    for i in range(args.assessments):
+        request = ScreeningRequest.model_validate(screening_request(gaze=300, n_strokes=20, seed=i))
+        result, _ = score_request(request)
+        items.append((request.games_data, result['features']))
+
+    single = measure(lambda: screening_service.predict(*items[0]), args.repeat)["best_s"]
+    print(f"single predict: {single * 1e3:.3f} ms")
+    failed = False
+    for batch in args.batch:
+        rows = [items[i % len(items)] for i in range(batch)]
+        seconds = measure(lambda: screening_service.predict_batch(rows), args.repeat)["best_s"]
+        print(f"batch {batch:>5}: {seconds * 1e3:9.3f} ms = {seconds / single:7.1f} single calls")
+        batched = screening_service.predict_batch(rows[:len(items)])
+        failed = failed or any(b != screening_service.predict(*item) for b, item in zip(batched, rows))
+    if failed:
+        print("Batched scores differ from single predict()")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Streaming speech extraction benchmark.
+
+Run from ml-service/:
+    python -m benchmarks.bench_speech
+    python -m benchmarks.bench_speech --minutes 1 5 10 30 --sample-rate 44100
+
+Writes synthetic read-aloud clips (voiced bursts separated by pauses) to a temp
+directory, then times analyze_speech on each and records peak traced memory.
+With block-wise decoding the peak should stay roughly flat as clips get longer.
+"""
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from app.config import settings
+from app.services.speech_analysis_service import analyze_speech
+from benchmarks.generators import write_audio_clip
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 5, 10, 30])
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    args = parser.parse_args()
+
+    # Warm up librosa's JIT-compiled kernels so the first clip isn't charged for them
+    # (clips are written to temp directories, which analyze_speech only reads inside SPEECH_AUDIO_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.SPEECH_AUDIO_DIR = tmp
+        warmup = os.path.join(tmp, 'warmup.wav')
+        write_audio_clip(warmup, 1 / 60, args.sample_rate)
+        analyze_speech(warmup)
+
+    print(f"{'minutes':>8}{'file_mb':>10}{'seconds':>10}{'x_realtime':>12}{'peak_mb':>10}{'pauses':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.SPEECH_AUDIO_DIR = tmp
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f"clip_{minutes:g}min.wav")
+            write_audio_clip(path, minutes, args.sample_rate)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = analyze_speech(path)
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if 'error' in result:
+                raise SystemExit(f"analyze_speech failed: {result['error']}")
+            print(f"{minutes:>8g}{os.path.getsize(path) / 1e6:>10.1f}{seconds:>10.2f}"
+                  f"{minutes * 60 / seconds:>12.0f}{peak / 1e6:>10.1f}{result['pause_count']:>8}")
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
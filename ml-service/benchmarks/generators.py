@@ -0,0 +1,129 @@
+"""
+Seeded synthetic inputs for the benchmarks.
+
+Every generator is deterministic for a given (size, seed), so timings from
+different commits are measured on identical data.
+"""
+import numpy as np
+import soundfile as sf
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from app.services.cognitive_load_service import SIGNAL_COLUMNS
+
+def gaze_points(n: int, seed: int = 0, hz: float = 60.0) -> np.ndarray:
+    """Reading-like gaze: jittered fixations joined by saccades, (n, 3) [x, y, t_ms]"""
+    rng = np.random.default_rng(seed)
+    # ~15 samples per fixation at 60 Hz (250 ms)
+    jumps = rng.random(n) < 1 / 15
+    steps = np.where(jumps[:, None], rng.normal(60, 40, (n, 2)), 0.0)
+    steps[:, 1] *= 0.1
+    xy = np.cumsum(steps, axis=0) % 1200 + rng.normal(0, 5, (n, 2))
+    t = np.arange(n) * (1000.0 / hz)
+    return np.column_stack((xy, t))
+
+def gaze_samples(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """gaze_points as the Game 1 JSON payload ({"x", "y", "timestamp", "word_index"})"""
+    points = gaze_points(n, seed)
+    x, y = np.round(points[:, 0], 1).tolist(), np.round(points[:, 1], 1).tolist()
+    t0 = 1700000000000
+    return [{"x": x[i], "y": y[i], "timestamp": t0 + int(points[i, 2]), "word_index": i // 15}
+            for i in range(n)]
+
+def strokes(n_strokes: int, points: int = 40, seed: int = 0) -> List[Dict[str, Any]]:
+    """Curved strokes laid out left to right with pen jitter (Game 3 JSON payload)"""
+    rng = np.random.default_rng(seed)
+    arc = np.linspace(0, np.pi, points)
+    result = []
+    for i in range(n_strokes):
+        x = 20 * i + 8 * np.cos(arc) + rng.normal(0, 0.5, points)
+        y = 12 * np.sin(arc) + rng.normal(0, 0.5, points)
+        t = 1000 * i + 10 * np.arange(points)
+        result.append({"points": [{"x": float(a), "y": float(b), "time": int(c)} for a, b, c in zip(x, y, t)]})
+    return result
+
+def letter_strokes(n_strokes: int, seed: int = 0, reversed_rate: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Letters and digits written one stroke each from the reversal template glyphs,
+    a `reversed_rate` share of them mirrored, with slant, width and pen jitter
+    """
+    from app.services.reversal_detection_service import LATIN_GLYPHS, NEUTRAL_SHAPES
+
+    rng = np.random.default_rng(seed)
+    shapes = [paths[0] for paths in list(LATIN_GLYPHS.values()) + list(NEUTRAL_SHAPES.values())]
+    result = []
+    for i in range(n_strokes):
+        path = shapes[rng.integers(len(shapes))]
+        x = path[:, 0] * rng.uniform(0.85, 1.2) + rng.uniform(-0.15, 0.15) * (1 - path[:, 1])
+        if rng.random() < reversed_rate:
+            x = -x
+        x = 50 * i + 40 * x + rng.normal(0, 0.8, len(path))
+        y = 100 + 40 * path[:, 1] + rng.normal(0, 0.8, len(path))
+        t = 1000 * i + 10 * np.arange(len(path))
+        result.append({"points": [{"x": float(a), "y": float(b), "time": int(c)} for a, b, c in zip(x, y, t)]})
+    return result
+
+def write_audio_clip(path: str, minutes: float, sample_rate: int = 44100, seed: int = 0):
+    """
+    Read-aloud-like clip (~4 s voiced phrases, ~1 s pauses) written as 16-bit WAV.
+    Written in one-second pieces so generating long clips stays cheap on memory too.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = int(minutes * 60)
+    with sf.SoundFile(path, 'w', samplerate=sample_rate, channels=1, subtype='PCM_16') as f:
+        for second in range(seconds):
+            t = second + np.arange(sample_rate) / sample_rate
+            voiced = (t % 5.0) < 4.0
+            # Pitch gliding 140-220 Hz at 0.5 Hz (phase is the integral of frequency)
+            phase = 2 * np.pi * (180 * t - 40 / np.pi * np.cos(np.pi * t))
+            tone = 0.3 * np.sin(phase) + 0.1 * np.sin(3 * phase)
+            f.write(tone * voiced + 0.002 * rng.standard_normal(sample_rate))
+
+def signal_columns(n: int, seed: int = 0) -> Dict[str, List[float]]:
+    """Columnar cognitive-load signals for n students, spread across every rule threshold"""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'fixation_time_avg_ms': rng.gamma(2.0, 700.0, n),
+        'consecutive_errors': rng.poisson(1.2, n).astype(np.float64),
+        'response_pause_ms': rng.gamma(2.0, 2500.0, n),
+        'backspace_count': rng.poisson(3.0, n).astype(np.float64),
+        'mouse_hover_hesitation_ms': rng.gamma(2.0, 1200.0, n)
+    }
+    return {name: np.round(columns[name], 1).tolist() for name in SIGNAL_COLUMNS}
+
+def signal_rows(n: int, seed: int = 0) -> List[Dict[str, float]]:
+    """signal_columns as one dict per student (the /detect payload)"""
+    columns = signal_columns(n, seed)
+    return [{name: columns[name][i] for name in SIGNAL_COLUMNS} for i in range(n)]
+
+def attention_history(days: int, seed: int = 0, start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Hourly school-day attention records (8:00-15:00) with a mid-morning peak"""
+    rng = np.random.default_rng(seed)
+    start = start or datetime(2026, 1, 5, 8)
+    history = []
+    for day in range(days):
+        for hour in range(8, 16):
+            when = start + timedelta(days=day, hours=hour - 8)
+            score = 70 + 15 * np.sin((hour - 8) / 8 * np.pi) + rng.normal(0, 5)
+            history.append({
+                "date": when.isoformat(),
+                "attention_score": round(float(np.clip(score, 0, 100)), 1),
+                "sleep_hours": round(float(rng.normal(7.5, 0.8)), 1),
+                "prev_task_difficulty": int(rng.integers(1, 4)),
+                "time_since_break": int(rng.integers(0, 90))
+            })
+    return history
+
+def screening_request(gaze: int = 2000, n_strokes: int = 50, seed: int = 0,
+                      audio_path: Optional[str] = None) -> Dict[str, Any]:
+    """A full five-game /screening/predict body"""
+    rng = np.random.default_rng(seed)
+    games = [
+        {"game_number": 1, "eye_tracking_data": gaze_samples(gaze, seed)},
+        {"game_number": 3, "handwriting_strokes": strokes(n_strokes, seed=seed)},
+        {"game_number": 4, "response_data": {"accuracy": round(float(rng.uniform(0.4, 1.0)), 2)}},
+        {"game_number": 5, "response_data": {"variability": round(float(rng.uniform(50, 300)), 1)}}
+    ]
+    if audio_path:
+        games.insert(1, {"game_number": 2, "audio_path": audio_path})
+    return {"student_id": f"student-{seed}", "assessment_id": f"assessment-{seed}",
+            "language": "en", "games_data": games}
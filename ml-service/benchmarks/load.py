@@ -0,0 +1,145 @@
+"""
+In-process ASGI load test of the ml-service routers.
+
+Requests go through httpx.ASGITransport straight into the FastAPI app (no
+sockets, no uvicorn), so numbers include routing, validation, lane scheduling
+and serialization but not network or HTTP parsing. Request bodies are
+serialized before the clock starts. Client-side httpx overhead is included
+and is roughly constant per request.
+
+Run through benchmarks.suite, or directly:
+    python -m benchmarks.load --quick
+Requires httpx (already needed by FastAPI's TestClient).
+"""
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+from benchmarks import generators
+from app.utils.binary_payload import encode_screening_request
+
+JSON_HEADERS = {"content-type": "application/json"}
+MSGPACK_HEADERS = {"content-type": "application/msgpack"}
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    # seed -> (body bytes, headers); requests cycle through `variants` distinct bodies
+    body: Callable[[int], Tuple[bytes, Dict[str, str]]]
+    variants: int
+    # (requests, concurrency) for the full run and for --quick
+    full: Tuple[int, int]
+    quick: Tuple[int, int]
+
+def _json(payload: Dict[str, Any]) -> Tuple[bytes, Dict[str, str]]:
+    return json.dumps(payload).encode(), JSON_HEADERS
+
+def _cognitive_load(seed: int):
+    return _json({"student_id": f"student-{seed}", "session_id": f"session-{seed}",
+                  "signals": generators.signal_rows(1, seed)[0], "task_type": "reading"})
+
+def _cognitive_load_bulk(seed: int):
+    return _json({"student_ids": [f"student-{i}" for i in range(1000)],
+                  "signals": generators.signal_columns(1000, seed), "task_type": "reading"})
+
+def _attention(seed: int):
+    # Distinct student ids, so every request misses the forecast cache
+    return _json({"student_id": f"student-{seed}", "attention_history": generators.attention_history(5, seed)})
+
+def _screening_json(seed: int):
+    return _json(generators.screening_request(seed=seed))
+
+def _screening_msgpack(seed: int):
+    return encode_screening_request(generators.screening_request(seed=seed)), MSGPACK_HEADERS
+
+def _screening_batch(seed: int):
+    return _json({"requests": [generators.screening_request(seed=seed * 10 + i) for i in range(10)]})
+
+SCENARIOS = [
+    Scenario('health', 'GET', '/api/ml/health', lambda seed: (b'', {}), 1, (500, 8), (100, 4)),
+    Scenario('cognitive_load_detect', 'POST', '/api/ml/cognitive-load/detect', _cognitive_load, 64, (5000, 32), (500, 8)),
+    Scenario('cognitive_load_bulk_1000', 'POST', '/api/ml/cognitive-load/detect-bulk', _cognitive_load_bulk, 4, (200, 4), (20, 2)),
+    Scenario('attention_predict', 'POST', '/api/ml/attention/predict', _attention, 5000, (2000, 32), (200, 8)),
+    Scenario('attention_predict_cached', 'POST', '/api/ml/attention/predict', _attention, 1, (5000, 32), (500, 8)),
+    Scenario('screening_predict_json', 'POST', '/api/ml/screening/predict', _screening_json, 16, (200, 8), (20, 4)),
+    Scenario('screening_predict_msgpack', 'POST', '/api/ml/screening/predict', _screening_msgpack, 16, (200, 8), (20, 4)),
+    Scenario('screening_predict_batch_10', 'POST', '/api/ml/screening/predict-batch', _screening_batch, 4, (40, 2), (4, 2))
+]
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    bodies = [scenario.body(seed) for seed in range(min(scenario.variants, requests))]
+
+    # Warm-up outside the measurement: lazy model loads, process pool start-up
+    for content, headers in bodies[:2]:
+        await client.request(scenario.method, scenario.path, content=content, headers=headers)
+
+    latencies = np.zeros(requests)
+    statuses: Dict[int, int] = {}
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            content, headers = bodies[i % len(bodies)]
+            start = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, content=content, headers=headers)
+            await response.aread()
+            latencies[i] = time.perf_counter() - start
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    return {
+        "name": scenario.name,
+        "path": scenario.path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "body_bytes": int(np.mean([len(content) for content, _ in bodies])),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(latencies.max() * 1e3),
+        "throughput_rps": requests / wall,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "error_rate": sum(count for code, count in statuses.items() if code >= 400) / requests
+    }
+
+async def _run_all(quick: bool, names: List[str] = None) -> List[Dict[str, Any]]:
+    import httpx
+    from app.main import app
+    from app.utils.executors import shutdown_executors
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for scenario in SCENARIOS:
+                if names and scenario.name not in names:
+                    continue
+                requests, concurrency = scenario.quick if quick else scenario.full
+                result = await run_scenario(client, scenario, requests, concurrency)
+                print(f"  {result['name']:<30}p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  "
+                      f"p99 {result['p99_ms']:>8.2f} ms  {result['throughput_rps']:>9.1f} req/s  "
+                      f"errors {result['error_rate']:.1%}")
+                results.append(result)
+    finally:
+        shutdown_executors()
+    return results
+
+def run_load(quick: bool = False, names: List[str] = None) -> List[Dict[str, Any]]:
+    return asyncio.run(_run_all(quick, names))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--scenario', action='append', choices=[s.name for s in SCENARIOS])
+    args = parser.parse_args()
+    run_load(args.quick, args.scenario)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Analyzer micro-benchmarks.
+
+Each case times one service function on generated input of a given size and
+reports the best and median of several repeats. Run through benchmarks.suite,
+or directly:
+    python -m benchmarks.micro --quick
+"""
+import os
+import time
+import argparse
+import tempfile
+import statistics
+from typing import Any, Callable, Dict, List
+from benchmarks import generators
+from app.services.eye_tracking_service import detect_fixations, detect_regressions
+from app.services.handwriting_analysis_service import as_stroke_arrays, detect_spacing_issues, detect_reversals
+from app.services.speech_analysis_service import extract_speech_features, summarize_speech
+from app.services.cognitive_load_service import detect_cognitive_load, detect_cognitive_load_bulk
+from app.services.lstm_service import predict_attention
+
+# (case, sizes) for the full run and for --quick
+SIZES = {
+    'detect_fixations': ([1_000, 10_000, 100_000, 1_000_000], [1_000, 10_000]),
+    'detect_regressions': ([1_000, 10_000, 100_000, 1_000_000], [1_000, 10_000]),
+    'detect_spacing_issues': ([100, 1_000, 10_000], [100, 1_000]),
+    'detect_reversals': ([100, 500, 5_000], [100, 500]),
+    'analyze_speech': ([1, 5], [0.25]),  # minutes of audio
+    'detect_cognitive_load': ([1, 100, 1_000], [1, 100]),  # sequential single-row calls
+    'detect_cognitive_load_bulk': ([1_000, 10_000, 100_000], [1_000]),
+    'predict_attention': ([1, 20, 100], [1, 20])  # sequential calls, 5 days of history each
+}
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up: lazy imports, JIT kernels, model loading
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {"best_s": min(timings), "median_s": statistics.median(timings)}
+
+def case_inputs(case: str, size, workdir: str) -> Callable[[], Any]:
+    """Build the input for one (case, size) outside the timed region and return the call"""
+    if case == 'detect_fixations':
+        points = generators.gaze_points(size)
+        return lambda: detect_fixations(points)
+    if case == 'detect_regressions':
+        points = generators.gaze_points(size)
+        return lambda: detect_regressions(points)
+    if case == 'detect_spacing_issues':
+        strokes = generators.strokes(size)
+        return lambda: detect_spacing_issues(strokes)
+    if case == 'detect_reversals':
+        arrays = as_stroke_arrays(generators.letter_strokes(size))
+        return lambda: detect_reversals(arrays, 'en')
+    if case == 'analyze_speech':
+        # Extraction + summary without the feature cache, so every repeat decodes the clip
+        path = os.path.join(workdir, f"speech_{size:g}min.wav")
+        generators.write_audio_clip(path, size)
+        return lambda: summarize_speech(extract_speech_features(path))
+    if case == 'detect_cognitive_load':
+        rows = generators.signal_rows(size)
+        return lambda: [detect_cognitive_load(row, 'reading') for row in rows]
+    if case == 'detect_cognitive_load_bulk':
+        columns = generators.signal_columns(size)
+        return lambda: detect_cognitive_load_bulk(columns, 'reading')
+    if case == 'predict_attention':
+        histories = [generators.attention_history(5, seed=i) for i in range(size)]
+        return lambda: [predict_attention(history) for history in histories]
+    raise ValueError(f"Unknown micro-benchmark case: {case}")
+
+def run_micro(quick: bool = False, repeat: int = 5, cases: List[str] = None) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for case, (full, reduced) in SIZES.items():
+            if cases and case not in cases:
+                continue
+            for size in (reduced if quick else full):
+                timing = measure(case_inputs(case, size, workdir), repeat)
+                result = {"name": f"{case}[{size:g}]", "case": case, "size": size, **timing,
+                          "per_item_us": timing["best_s"] / size * 1e6}
+                print(f"  {result['name']:<40}{timing['best_s'] * 1e3:>12.2f} ms{result['per_item_us']:>12.2f} us/item")
+                results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--case', action='append', choices=sorted(SIZES))
+    args = parser.parse_args()
+    run_micro(args.quick, args.repeat, args.case)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark suite: analyzer micro-benchmarks plus the in-process load test.
+
+Run from ml-service/:
+    python -m benchmarks.suite --output bench-results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --quick --compare bench-results/baseline.json
+
+Results are written as JSON with enough metadata (commit, interpreter, library
+versions, CPU count) to tell whether two runs are comparable. With --compare,
+every metric matching an entry in the baseline is printed as a ratio, and
+changes beyond --threshold are flagged. --fail-on-regression turns flagged
+slowdowns into a non-zero exit status for CI.
+"""
+import os
+
+# Measure extraction itself: the on-disk feature cache would turn repeats into cache hits
+os.environ['FEATURE_CACHE_DIR'] = ''
+
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+# Lower is better for latency metrics, higher is better for throughput
+COMPARED_METRICS = {
+    "micro": (("best_s", False),),
+    "load": (("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("throughput_rps", True))
+}
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    import numpy
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--', '.'], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__,
+        "quick": args.quick
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Tuple[str, float]]:
+    """Print per-metric ratios against the baseline; return (label, ratio) for regressions"""
+    regressions = []
+    print(f"\nComparison with {baseline['meta'].get('commit') or 'baseline'} (threshold {threshold:.0%})")
+    for section, metrics in COMPARED_METRICS.items():
+        before = {entry['name']: entry for entry in baseline.get(section, [])}
+        for entry in current.get(section, []):
+            old = before.get(entry['name'])
+            if old is None:
+                continue
+            for metric, higher_is_better in metrics:
+                if not old.get(metric) or entry.get(metric) is None:
+                    continue
+                ratio = entry[metric] / old[metric]
+                # Express as "times slower": > 1 is worse regardless of the metric's direction
+                slowdown = 1 / ratio if higher_is_better else ratio
+                flag = ''
+                if slowdown > 1 + threshold:
+                    flag = '  REGRESSION'
+                    regressions.append((f"{section}:{entry['name']}:{metric}", slowdown))
+                elif slowdown < 1 / (1 + threshold):
+                    flag = '  improved'
+                print(f"  {section + ':' + entry['name']:<48}{metric:<16}{old[metric]:>12.4g} -> {entry[metric]:<12.4g}"
+                      f"x{slowdown:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--quick', action='store_true', help="small sizes, for CI smoke runs")
+    parser.add_argument('--only', choices=['micro', 'load'])
+    parser.add_argument('--repeat', type=int, default=5, help="repeats per micro-benchmark")
+    parser.add_argument('--output', default=None, help="results JSON path (default: print only)")
+    parser.add_argument('--compare', default=None, help="baseline results JSON")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change flagged by --compare")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    from benchmarks.micro import run_micro
+    from benchmarks.load import run_load
+
+    results: Dict[str, Any] = {"meta": run_metadata(args)}
+    if args.only in (None, 'micro'):
+        print("Micro-benchmarks")
+        results["micro"] = run_micro(args.quick, args.repeat)
+    if args.only in (None, 'load'):
+        print("Load test")
+        results["load"] = run_load(args.quick)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('quick') != args.quick:
+            print("Warning: baseline and current run use different size profiles (--quick)")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the service as `app.*`, as it runs from ml-service/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
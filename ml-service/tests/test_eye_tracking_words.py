@@ -0,0 +1,37 @@
+"""Word-level reading measures with client-supplied word_index / word_boxes"""
+import numpy as np
+from app.services.eye_tracking_service import analyze_eye_tracking, gaze_word_indices, GazeStreamAnalyzer
+
+def reading_gaze(words=10, samples_per_word=20):
+    """Left-to-right reading, one fixation per word; word_index is null on every fifth sample"""
+    gaze = []
+    for word in range(words):
+        for k in range(samples_per_word):
+            gaze.append({"x": 50 * word + 2, "y": 100, "timestamp": 16 * len(gaze),
+                         "word_index": word if k % 5 else None})
+    return gaze
+
+def test_null_and_non_integer_word_index_count_as_no_word():
+    gaze = [{"x": 0, "y": 0, "timestamp": 0, "word_index": value} for value in (None, 2.5, True, "3", 4)]
+    gaze.append({"x": 0, "y": 0, "timestamp": 0})
+    np.testing.assert_array_equal(gaze_word_indices(gaze), [-1, -1, -1, -1, 4, -1])
+
+def test_null_word_index_in_full_and_stream_analysis():
+    gaze = reading_gaze()
+    assert analyze_eye_tracking(gaze)["reading"]["source"] == "sample_word_index"
+
+    stream = GazeStreamAnalyzer()
+    stream.add_samples(gaze[:70])
+    stream.add_samples(gaze[70:])
+    assert stream.finish()["reading"]["source"] == "sample_word_index"
+
+def test_malformed_word_boxes_fall_back_to_sample_word_index():
+    gaze = reading_gaze()
+    for word_boxes in ([{"x": 0, "width": 3, "height": 4}],               # missing "y"
+                       [{"x": 0, "y": 0, "width": -3, "height": 4}],     # negative width
+                       [["a", 0, 1, 1]]):
+        assert analyze_eye_tracking(gaze, word_boxes=word_boxes)["reading"]["source"] == "sample_word_index"
+
+def test_valid_word_boxes_are_used():
+    word_boxes = [[50 * word, 90, 40, 20] for word in range(10)]
+    assert analyze_eye_tracking(reading_gaze(), word_boxes=word_boxes)["reading"]["source"] == "passage_layout"
@@ -0,0 +1,165 @@
+"""
+numpy_runtime layers against straightforward float64 references, and (when
+TensorFlow is installed) exported models against Keras itself.
+"""
+import os
+import importlib.util
+import numpy as np
+import pytest
+from app.utils.numpy_runtime import (DenseLayer, LSTMLayer, BatchNormLayer, NumpySequential,
+                                     save_numpy_model, load_numpy_model)
+
+EXPORT_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ml-training/scripts/export_models.py'))
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def reference_lstm(x, kernel, recurrent_kernel, bias, return_sequences):
+    """One sample, one timestep at a time, gates split out (Keras order i, f, c, o)"""
+    units = recurrent_kernel.shape[0]
+    W = np.split(kernel.astype(np.float64), 4, axis=1)
+    U = np.split(recurrent_kernel.astype(np.float64), 4, axis=1)
+    b = np.split(bias.astype(np.float64), 4)
+    outputs = []
+    for sample in x.astype(np.float64):
+        h, c, states = np.zeros(units), np.zeros(units), []
+        for x_t in sample:
+            i = sigmoid(x_t @ W[0] + h @ U[0] + b[0])
+            f = sigmoid(x_t @ W[1] + h @ U[1] + b[1])
+            g = np.tanh(x_t @ W[2] + h @ U[2] + b[2])
+            o = sigmoid(x_t @ W[3] + h @ U[3] + b[3])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            states.append(h)
+        outputs.append(np.stack(states) if return_sequences else h)
+    return np.stack(outputs)
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+@pytest.mark.parametrize('activation', ['linear', 'relu', 'sigmoid', 'tanh', 'softmax'])
+def test_dense_matches_reference(rng, activation):
+    x = rng.standard_normal((8, 5)).astype(np.float32)
+    kernel = rng.normal(0, 0.5, (5, 3)).astype(np.float32)
+    bias = rng.normal(0, 0.1, 3).astype(np.float32)
+
+    z = x.astype(np.float64) @ kernel + bias
+    expected = {
+        'linear': z,
+        'relu': np.where(z > 0, z, 0),
+        'sigmoid': sigmoid(z),
+        'tanh': np.tanh(z),
+        'softmax': np.exp(z) / np.exp(z).sum(axis=1, keepdims=True)
+    }[activation]
+    actual = DenseLayer({"activation": activation}, kernel, bias)(x)
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+def test_dense_without_bias(rng):
+    x = rng.standard_normal((4, 5)).astype(np.float32)
+    kernel = rng.standard_normal((5, 2)).astype(np.float32)
+    np.testing.assert_allclose(DenseLayer({}, kernel)(x), x @ kernel, rtol=1e-6)
+
+@pytest.mark.parametrize('return_sequences', [True, False])
+def test_lstm_matches_reference(rng, return_sequences):
+    x = rng.standard_normal((6, 20, 4)).astype(np.float32)
+    kernel = rng.normal(0, 0.4, (4, 4 * 7)).astype(np.float32)
+    recurrent_kernel = rng.normal(0, 0.4, (7, 4 * 7)).astype(np.float32)
+    bias = rng.normal(0, 0.2, 4 * 7).astype(np.float32)
+
+    layer = LSTMLayer({"return_sequences": return_sequences}, kernel, recurrent_kernel, bias)
+    actual = layer(x)
+    expected = reference_lstm(x, kernel, recurrent_kernel, bias, return_sequences)
+    assert actual.shape == ((6, 20, 7) if return_sequences else (6, 7))
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_lstm_rows_are_independent(rng):
+    x = rng.standard_normal((5, 12, 3)).astype(np.float32)
+    layer = LSTMLayer({}, rng.standard_normal((3, 16)).astype(np.float32),
+                      rng.standard_normal((4, 16)).astype(np.float32), np.zeros(16, dtype=np.float32))
+    batched = layer(x)
+    single = np.concatenate([layer(x[i:i + 1]) for i in range(len(x))])
+    np.testing.assert_allclose(batched, single, rtol=1e-5, atol=1e-6)
+
+def test_batch_norm_matches_reference(rng):
+    x = rng.standard_normal((10, 6)).astype(np.float32)
+    gamma, beta = rng.normal(1, 0.2, 6), rng.normal(0, 0.2, 6)
+    mean, variance = rng.normal(0, 0.5, 6), rng.uniform(0.2, 2.0, 6)
+
+    expected = (x - mean) / np.sqrt(variance + 1e-3) * gamma + beta
+    actual = BatchNormLayer({"epsilon": 1e-3}, gamma, beta, mean, variance)(x)
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+def test_save_load_round_trip(rng, tmp_path):
+    layers = [
+        {"type": "lstm", "return_sequences": False,
+         "weights": [rng.standard_normal((3, 8)), rng.standard_normal((2, 8)), np.zeros(8)]},
+        {"type": "batch_norm", "epsilon": 1e-3,
+         "weights": [np.ones(2), np.zeros(2), rng.standard_normal(2), rng.uniform(0.5, 1.5, 2)]},
+        {"type": "dense", "activation": "sigmoid", "weights": [rng.standard_normal((2, 1)), np.zeros(1)]}
+    ]
+    path = str(tmp_path / 'model.npz')
+    save_numpy_model(path, layers, (7, 3))
+    model = load_numpy_model(path)
+
+    assert isinstance(model, NumpySequential)
+    assert model.input_shape == (7, 3)
+    x = rng.standard_normal((300, 7, 3)).astype(np.float32)
+    # predict() chunks by batch_size; the result must not depend on it
+    np.testing.assert_allclose(model.predict(x, batch_size=64), model.predict_on_batch(x), rtol=1e-6)
+
+def test_unsupported_layer_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        save_numpy_model(str(tmp_path / 'model.npz'), [{"type": "conv2d", "weights": []}])
+
+@pytest.fixture
+def keras():
+    return pytest.importorskip("tensorflow").keras
+
+@pytest.fixture
+def export_models():
+    """ml-training/scripts/export_models.py, which turns Keras layers into numpy_runtime specs"""
+    spec = importlib.util.spec_from_file_location('export_models', EXPORT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def assert_export_matches(model, export_models, tmp_path, x):
+    path = str(tmp_path / 'model.npz')
+    save_numpy_model(path, export_models.keras_layer_specs(model), model.input_shape[1:])
+    expected = np.asarray(model.predict_on_batch(x))
+    np.testing.assert_allclose(load_numpy_model(path).predict_on_batch(x), expected, rtol=1e-4, atol=1e-5)
+
+def test_lstm_stack_matches_keras(keras, export_models, tmp_path):
+    # Served architecture: LSTM 64 -> Dropout -> LSTM 32 -> Dense 16 relu -> Dense 1
+    model = keras.Sequential([
+        keras.layers.InputLayer(input_shape=(20, 6)),
+        keras.layers.LSTM(64, return_sequences=True),
+        keras.layers.Dropout(0.2),
+        keras.layers.LSTM(32),
+        keras.layers.Dense(16, activation='relu'),
+        keras.layers.Dense(1)
+    ])
+    x = np.random.default_rng(1).standard_normal((64, 20, 6)).astype(np.float32)
+    assert_export_matches(model, export_models, tmp_path, x)
+
+def test_mlp_with_dropout_and_batch_norm_matches_keras(keras, export_models, tmp_path):
+    model = keras.Sequential([
+        keras.layers.InputLayer(input_shape=(12,)),
+        keras.layers.Dense(32, activation='relu'),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dropout(0.3),
+        keras.layers.Dense(16),
+        keras.layers.BatchNormalization(center=False, scale=False),
+        keras.layers.Activation('tanh'),
+        keras.layers.Dense(2, activation='softmax')
+    ])
+    # Non-trivial moving statistics, otherwise batch norm is close to the identity
+    rng = np.random.default_rng(2)
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.BatchNormalization):
+            layer.set_weights([rng.normal(0, 1, w.shape) if i < len(layer.get_weights()) - 1
+                               else rng.uniform(0.5, 2.0, w.shape)
+                               for i, w in enumerate(layer.get_weights())])
+    x = rng.standard_normal((64, 12)).astype(np.float32)
+    assert_export_matches(model, export_models, tmp_path, x)
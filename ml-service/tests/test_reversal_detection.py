@@ -0,0 +1,58 @@
+"""Reversal detection on the Game 3 worksheet letters, drawn with slant, width and pen jitter"""
+import numpy as np
+import pytest
+from app.services.reversal_detection_service import LATIN_GLYPHS, DEVANAGARI_GLYPHS, reversed_strokes
+from app.services.handwriting_analysis_service import analyze_handwriting, worksheet_strokes
+
+# AssessmentGame3.tsx
+WORKSHEET = ['b', 'd', 'p', 'क', 'ख']
+GLYPHS = {**LATIN_GLYPHS, **DEVANAGARI_GLYPHS}
+
+def draw(path, rng, mirror=False, size=100.0, jitter=1.5):
+    """Screen-pixel x, y of a glyph trajectory, densified like a pointer stream"""
+    unit = path.copy()
+    if mirror:
+        unit[:, 0] = 1 - unit[:, 0]
+    slant, width = rng.uniform(-0.15, 0.15), rng.uniform(0.85, 1.15)
+    x = (unit[:, 0] * width + slant * (1 - unit[:, 1])) * size + 200
+    y = unit[:, 1] * size + 100
+    steps = np.linspace(0, len(x) - 1, 3 * len(x))
+    x, y = np.interp(steps, np.arange(len(x)), x), np.interp(steps, np.arange(len(y)), y)
+    return x + rng.normal(0, jitter, len(x)), y + rng.normal(0, jitter, len(y))
+
+def as_task(letter, strokes):
+    return {"letter": letter, "strokes": [{"points": [{"x": float(a), "y": float(b)} for a, b in zip(x, y)]}
+                                          for x, y in strokes]}
+
+@pytest.mark.parametrize('language', ['en', 'hi'])
+@pytest.mark.parametrize('letter', WORKSHEET)
+def test_prompted_letter_correct_vs_mirrored(letter, language):
+    for path in GLYPHS[letter]:
+        for seed in range(10):
+            rng = np.random.default_rng(seed)
+            for mirror in (False, True):
+                x, y = draw(path, rng, mirror)
+                flagged = reversed_strokes(x, y, np.array([0, len(x)]), language, [letter])
+                assert bool(flagged[0]) == mirror, (letter, seed, mirror)
+
+def test_mirror_partner_is_not_a_reversal_without_a_prompt():
+    # A "d" on its own is a correct d; only the prompt "b" makes it a reversal
+    x, y = draw(GLYPHS['d'][0], np.random.default_rng(0))
+    offsets = np.array([0, len(x)])
+    assert not reversed_strokes(x, y, offsets, 'en')[0]
+    assert reversed_strokes(x, y, offsets, 'en', ['b'])[0]
+    assert not reversed_strokes(x, y, offsets, 'en', ['d'])[0]
+
+def test_worksheet_counts_reversed_tasks():
+    rng = np.random.default_rng(3)
+    headline = (np.linspace(180, 320, 40), np.full(40, 100.0))
+    tasks = [as_task('b', [draw(GLYPHS['b'][0], rng)]),
+             as_task('d', [draw(GLYPHS['d'][1], rng, mirror=True)]),
+             as_task('p', [draw(GLYPHS['p'][0], rng)]),
+             as_task('क', [headline, draw(GLYPHS['क'][0], rng, mirror=True)]),
+             as_task('ख', [headline, draw(GLYPHS['ख'][0], rng)])]
+
+    strokes, prompts = worksheet_strokes(tasks)
+    assert len(strokes) == 7
+    assert prompts == ['b', 'd', 'p', 'क', 'क', 'ख', 'ख']
+    assert analyze_handwriting(tasks, 'en')['reversal_count'] == 2
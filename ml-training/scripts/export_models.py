@@ -0,0 +1,114 @@
+"""
+Export trained Keras models to the TensorFlow-free .npz format served by
+ml-service/app/utils/numpy_runtime.py.
+
+Every export is checked against the Keras model on random inputs before it is
+registered; a mismatch aborts that model's export. The .npz is registered in
+the artifact store as "<keras version>-numpy" and activated, so the service
+picks it up on its next load/reload.
+
+    python export_models.py                    # lstm_attention and screening_mlp
+    python export_models.py screening_mlp --inactive
+"""
+import argparse
+import tempfile
+import json
+import sys
+import os
+import numpy as np
+
+# Script is in ml-training/scripts; the service and its artifact store live in ml-service
+ML_SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ml-service'))
+MODELS_DIR = os.path.join(ML_SERVICE_DIR, 'app', 'ml_models')
+sys.path.insert(0, ML_SERVICE_DIR)
+
+from app.utils.artifact_store import resolve_artifact, register_artifact
+from app.utils.numpy_runtime import save_numpy_model, load_numpy_model
+
+EXPORTED_MODELS = ('lstm_attention', 'screening_mlp')
+# Inference no-ops
+PASSTHROUGH_LAYERS = {'InputLayer', 'Dropout', 'GaussianNoise', 'GaussianDropout', 'AlphaDropout'}
+
+def keras_layer_specs(model):
+    """numpy_runtime layer list for a Keras Sequential model"""
+    specs = []
+    for layer in model.layers:
+        name = type(layer).__name__
+        config = layer.get_config()
+        if name in PASSTHROUGH_LAYERS:
+            continue
+        if name == 'Dense':
+            specs.append({"type": "dense", "activation": config['activation'], "weights": layer.get_weights()})
+        elif name == 'LSTM':
+            if config.get('go_backwards') or config.get('stateful') or config.get('return_state'):
+                raise ValueError(f"{layer.name}: only plain forward LSTMs can be exported")
+            specs.append({"type": "lstm", "activation": config['activation'],
+                          "recurrent_activation": config['recurrent_activation'],
+                          "return_sequences": config['return_sequences'], "weights": layer.get_weights()})
+        elif name == 'BatchNormalization':
+            size = layer.moving_mean.shape
+            gamma = layer.gamma.numpy() if layer.gamma is not None else np.ones(size)
+            beta = layer.beta.numpy() if layer.beta is not None else np.zeros(size)
+            specs.append({"type": "batch_norm", "epsilon": config['epsilon'],
+                          "weights": [gamma, beta, layer.moving_mean.numpy(), layer.moving_variance.numpy()]})
+        elif name == 'Activation':
+            specs.append({"type": "activation", "activation": config['activation']})
+        elif name == 'Flatten':
+            specs.append({"type": "flatten"})
+        else:
+            raise ValueError(f"{layer.name}: layer type {name} is not supported by numpy_runtime")
+    return specs
+
+def verify_export(model, path, samples=512, seed=0, rtol=1e-4, atol=1e-4):
+    """Compare Keras and numpy_runtime outputs on random inputs; raises ValueError on mismatch"""
+    x = np.random.default_rng(seed).standard_normal((samples,) + tuple(model.input_shape[1:])).astype(np.float32)
+    expected = np.asarray(model.predict_on_batch(x))
+    actual = load_numpy_model(path).predict_on_batch(x)
+    if actual.shape != expected.shape:
+        raise ValueError(f"Output shape {actual.shape} does not match Keras {expected.shape}")
+    error = np.abs(actual - expected)
+    report = {
+        "samples": samples,
+        "max_abs_error": float(error.max()),
+        "max_rel_error": float((error / np.maximum(np.abs(expected), 1e-6)).max())
+    }
+    if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+        raise ValueError(f"numpy_runtime output differs from Keras: {report}")
+    return report
+
+def export_numpy_artifact(model_name, model, version, activate=True):
+    """Export, verify and register `model` as <version>-numpy; returns the verification report"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'{model_name}.npz')
+        save_numpy_model(path, keras_layer_specs(model), model.input_shape[1:])
+        report = verify_export(model, path)
+        register_artifact(model_name, f'{version}-numpy', path, 'numpy', activate=activate, root=MODELS_DIR)
+    return report
+
+def _find_keras_artifact(model_name):
+    """(path, version) of the active Keras artifact, falling back to the legacy flat files"""
+    resolved = resolve_artifact(model_name, root=MODELS_DIR)
+    if resolved and resolved[2].get('kind') == 'keras':
+        return resolved[0], resolved[1]
+    for ext in ('.keras', '.h5'):
+        path = os.path.join(MODELS_DIR, model_name + ext)
+        if os.path.exists(path):
+            return path, 'legacy'
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Keras models to the numpy_runtime format")
+    parser.add_argument('models', nargs='*', default=list(EXPORTED_MODELS))
+    parser.add_argument('--inactive', action='store_true', help="register without making it the active version")
+    args = parser.parse_args()
+
+    from tensorflow import keras
+
+    for model_name in args.models:
+        found = _find_keras_artifact(model_name)
+        if found is None:
+            print(f"{model_name}: no Keras artifact in {MODELS_DIR}, skipped")
+            continue
+        path, version = found
+        report = export_numpy_artifact(model_name, keras.models.load_model(path), version, activate=not args.inactive)
+        print(f"{model_name}: exported {version}-numpy {json.dumps(report)}")
@@ -1,84 +1,162 @@
 import numpy as np
 import pandas as pd
-from tensorflow import keras
-from tensorflow.keras import layers
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import tempfile
 import joblib
+import json
+import time
 import os
 
+# Column order of the model input; matches FEATURES in ml-service/app/services/lstm_service.py
+FEATURES = ['hour', 'day_of_week', 'sleep_hours', 'prev_task_difficulty', 'time_since_break', 'attention_score']
+SCORE = FEATURES.index('attention_score')
+SCHOOL_HOURS = np.arange(8, 17)  # 8 AM - 4 PM
+SEQUENCE_LENGTH = 20
+SHARD_MANIFEST = 'shards.json'
+# Script is in ml-training/scripts; the service and its artifact store live in ml-service
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ml-service/app/ml_models'))
+
 # --- 1. Synthetic Data Generation ---
-def generate_training_data(num_students=100, days_per_student=30):
-    """Generate synthetic hourly attention patterns."""
-    data = []
-    
-    for student_id in range(num_students):
-        # Unique baseline for each student
-        base_attention = np.random.randint(60, 85)
-        # Circadian rhythm variation
-        morning_boost = np.random.randint(5, 15)
-        afternoon_drop = np.random.randint(-20, -10)
-        
-        for day in range(days_per_student):
-            for hour in range(8, 17):  # 8 AM - 4 PM
-                score = base_attention
-                
-                # Time-of-day logic
-                if 9 <= hour <= 11: score += morning_boost
-                elif hour >= 14: score += afternoon_drop
-                
-                # Add noise
-                score += np.random.randn() * 5
-                score = np.clip(score, 0, 100)
-                
-                data.append({
-                    'student_id': student_id,
-                    'hour': hour,
-                    'day_of_week': day % 7,
-                    'sleep_hours': np.random.uniform(6, 9),
-                    'prev_task_difficulty': np.random.randint(1, 4), # 1-3
-                    'time_since_break': np.random.randint(0, 120),
-                    'attention_score': score
-                })
-    
-    return pd.DataFrame(data)
+def simulate_students(rng, num_students, days_per_student):
+    """
+    Hourly attention patterns for a block of students: (num_students, days * 9, len(FEATURES)) float32.
+    Every feature is drawn for the whole block at once from `rng` (a np.random.Generator).
+    """
+    hours = np.tile(SCHOOL_HOURS, days_per_student)
+    day_of_week = np.repeat(np.arange(days_per_student) % 7, len(SCHOOL_HOURS))
+    shape = (num_students, len(hours))
+
+    # Unique baseline and circadian rhythm per student
+    base_attention = rng.integers(60, 85, num_students)[:, None]
+    morning_boost = rng.integers(5, 15, num_students)[:, None]
+    afternoon_drop = rng.integers(-20, -10, num_students)[:, None]
+
+    score = (base_attention
+             + morning_boost * ((hours >= 9) & (hours <= 11))
+             + afternoon_drop * (hours >= 14)
+             + rng.standard_normal(shape) * 5)
+
+    series = np.empty(shape + (len(FEATURES),), dtype=np.float32)
+    series[..., 0] = hours
+    series[..., 1] = day_of_week
+    series[..., 2] = rng.uniform(6, 9, shape)
+    series[..., 3] = rng.integers(1, 4, shape)  # 1-3
+    series[..., 4] = rng.integers(0, 120, shape)
+    series[..., SCORE] = np.clip(score, 0, 100)
+    return series
+
+def generate_training_data(num_students=100, days_per_student=30, seed=None):
+    """Generate synthetic hourly attention patterns as a DataFrame (small, in-memory runs)."""
+    series = simulate_students(np.random.default_rng(seed), num_students, days_per_student)
+    df = pd.DataFrame(series.reshape(-1, len(FEATURES)), columns=FEATURES)
+    df.insert(0, 'student_id', np.repeat(np.arange(num_students), series.shape[1]))
+    return df
+
+def _write_shard(path, seed_seq, num_students, days_per_student):
+    """Worker: simulate one shard straight into a memory-mapped .npy file"""
+    steps = days_per_student * len(SCHOOL_HOURS)
+    shard = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                      shape=(num_students, steps, len(FEATURES)))
+    rng = np.random.default_rng(seed_seq)
+    # Sub-blocks bound the float64 temporaries to ~64 MB whatever the shard size
+    block = max(1, (1 << 23) // steps)
+    for start in range(0, num_students, block):
+        count = min(block, num_students - start)
+        shard[start:start + count] = simulate_students(rng, count, days_per_student)
+    shard.flush()
+    del shard
+    return os.path.basename(path), num_students
+
+def write_training_shards(out_dir, num_students, days_per_student, seed=0, shard_size=1000, workers=None):
+    """
+    Simulate `num_students` into .npy shards of (shard_size, days * 9, len(FEATURES)) float32
+    series, one process per shard, and write a manifest listing them.
+
+    Each shard draws from its own Generator spawned from SeedSequence(seed), so the output
+    depends only on (seed, shard_size), not on the number of workers. Shards hold the raw
+    hourly series; windows are taken from them as zero-copy views (shard_windows), which
+    keeps the files sequence_length times smaller than materialized windows.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    counts = [min(shard_size, num_students - start) for start in range(0, num_students, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    paths = [os.path.join(out_dir, f'series-{i:05d}.npy') for i in range(len(counts))]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shards = list(pool.map(_write_shard, paths, seeds, counts, [days_per_student] * len(counts)))
+
+    manifest = {
+        "features": FEATURES,
+        "students": num_students,
+        "days_per_student": days_per_student,
+        "steps_per_student": days_per_student * len(SCHOOL_HOURS),
+        "seed": seed,
+        "shard_size": shard_size,
+        "shards": [{"file": name, "students": count} for name, count in shards]
+    }
+    with open(os.path.join(out_dir, SHARD_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_shard_manifest(data_dir):
+    with open(os.path.join(data_dir, SHARD_MANIFEST)) as f:
+        return json.load(f)
 
 # --- 2. Sequence Creation ---
-def create_sequences(data, sequence_length=14, forecast_horizon=48):
+def series_windows(series, sequence_length=SEQUENCE_LENGTH):
+    """
+    Next-step windows over (students, steps, features) series, without copying:
+    X is (students, steps - sequence_length, sequence_length, features), y is the
+    attention score following each window, (students, steps - sequence_length).
+    Windows never cross students. Both are views, so on a memory-mapped shard
+    only the batches actually indexed are read from disk.
+    """
+    X = sliding_window_view(series[:, :-1], sequence_length, axis=1).transpose(0, 1, 3, 2)
+    y = series[:, sequence_length:, SCORE]
+    return X, y
+
+def shard_windows(path, sequence_length=SEQUENCE_LENGTH):
+    """series_windows over a memory-mapped shard file"""
+    return series_windows(np.load(path, mmap_mode='r'), sequence_length)
+
+def create_sequences(data, sequence_length=SEQUENCE_LENGTH):
     """
-    Input: History (sequence_length days)
-    Output: Next (forecast_horizon) hours of attention scores
-    Note: Simplified for training logic.
+    Input: previous `sequence_length` hourly rows of a student
+    Output: the next hour's attention score (standard one-step LSTM target)
+    Returns materialized (N, sequence_length, features) / (N,) arrays for in-memory training.
     """
     X, y = [], []
-    features = ['hour', 'day_of_week', 'sleep_hours', 'prev_task_difficulty', 'time_since_break', 'attention_score']
-    
-    # Just taking raw points for simplicity of prototype instead of complicated daily aggregation
-    # Using sliding window over hours directly might be better, but instruction impl:
-    
-    # Group by student
-    grouped = data.groupby('student_id')
-    
-    for _, group in grouped:
-        values = group[features].values
-        # Input: 24 hours of data (approx 3 days @ 8 hours/day) to predict next 8 hours?
-        # Let's align with instruction: 14 days input -> 48 hours output?
-        # 14 days * 9 hours = 126 steps. LSTM can handle.
-        
-        # Simplified for prototype: Window of 50 hours predicting next 1
-        seq_len = 20
-        pred_len = 1
-        
-        if len(values) < seq_len + pred_len: continue
-
-        for i in range(len(values) - seq_len - pred_len):
-            X.append(values[i : i+seq_len])
-            y.append(values[i+seq_len : i+seq_len+pred_len, -1][0]) # Predict just next step for standard LSTM
-
-    return np.array(X), np.array(y)
+    for _, group in data.groupby('student_id'):
+        values = group[FEATURES].to_numpy(dtype=np.float32)
+        if len(values) <= sequence_length:
+            continue
+        windows, targets = series_windows(values[None], sequence_length)
+        X.append(windows[0])
+        y.append(targets[0])
+    if not X:
+        return np.empty((0, sequence_length, len(FEATURES)), dtype=np.float32), np.empty(0, dtype=np.float32)
+    return np.concatenate(X), np.concatenate(y)
+
+def load_sequences(data_dir, sequence_length=SEQUENCE_LENGTH):
+    """Materialize all windows of a shard directory (only for datasets that fit in RAM)"""
+    manifest = load_shard_manifest(data_dir)
+    X, y = [], []
+    for shard in manifest['shards']:
+        windows, targets = shard_windows(os.path.join(data_dir, shard['file']), sequence_length)
+        X.append(windows.reshape(-1, sequence_length, len(FEATURES)))
+        y.append(targets.reshape(-1))
+    return np.concatenate(X), np.concatenate(y)
 
 # --- 3. Model Architecture ---
 def build_lstm_model(input_shape):
+    # Imported here so shard workers (spawned on macOS/Windows) do not load TensorFlow
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
     model = keras.Sequential([
         layers.LSTM(64, return_sequences=True, input_shape=input_shape),
         layers.Dropout(0.2),
@@ -89,12 +167,223 @@ def build_lstm_model(input_shape):
     model.compile(optimizer='adam', loss='mse', metrics=['mae'])
     return model
 
+# --- 4. Streaming (out-of-core) Training ---
+def fit_scaler_streaming(data_dir, students_per_chunk=256):
+    """StandardScaler.partial_fit over every shard, a few students at a time"""
+    manifest = load_shard_manifest(data_dir)
+    scaler = StandardScaler()
+    for shard in manifest['shards']:
+        series = np.load(os.path.join(data_dir, shard['file']), mmap_mode='r')
+        for start in range(0, len(series), students_per_chunk):
+            # The last step of each student is only ever a target, never a window row
+            chunk = series[start:start + students_per_chunk, :-1]
+            scaler.partial_fit(chunk.reshape(-1, chunk.shape[-1]))
+    return scaler
+
+class ShardBatches:
+    """
+    Batch index source for a shard directory: yields (shard number, flat window indices)
+    and loads/scales the batch from the memory-mapped shards. Students are split into
+    train/validation by position within each shard, so no student lands in both.
+    Shuffling is per shard (shard order and window order within it), which keeps
+    reads local to one file at a time.
+    """
+
+    def __init__(self, data_dir, scaler, batch_size, validation_split=0.2,
+                 sequence_length=SEQUENCE_LENGTH, seed=0):
+        self.manifest = load_shard_manifest(data_dir)
+        self.paths = [os.path.join(data_dir, shard['file']) for shard in self.manifest['shards']]
+        self.batch_size = batch_size
+        self.sequence_length = sequence_length
+        self.windows_per_student = self.manifest['steps_per_student'] - sequence_length
+        self.mean = scaler.mean_.astype(np.float32)
+        self.scale = scaler.scale_.astype(np.float32)
+        self.rng = np.random.default_rng(seed)
+        self._windows = {}
+
+        # Per split: shard number -> range of student positions
+        self.students = {'train': {}, 'validation': {}}
+        for i, shard in enumerate(self.manifest['shards']):
+            n_train = shard['students'] - int(round(shard['students'] * validation_split))
+            self.students['train'][i] = range(0, n_train)
+            self.students['validation'][i] = range(n_train, shard['students'])
+
+    def steps(self, split):
+        return sum(-(-len(students) * self.windows_per_student // self.batch_size)
+                   for students in self.students[split].values())
+
+    def indices(self, split):
+        """Generator of (shard number, int64 flat window indices) for one pass"""
+        shuffle = split == 'train'
+        shards = list(self.students[split].items())
+        if shuffle:
+            shards = [shards[i] for i in self.rng.permutation(len(shards))]
+        for shard, students in shards:
+            flat = np.arange(students.start * self.windows_per_student,
+                             students.stop * self.windows_per_student, dtype=np.int64)
+            if shuffle:
+                self.rng.shuffle(flat)
+            for start in range(0, len(flat), self.batch_size):
+                yield shard, flat[start:start + self.batch_size]
+
+    def load(self, shard, flat):
+        """(scaled X, y) float32 batch for flat window indices of one shard"""
+        windows = self._windows.get(int(shard))
+        if windows is None:
+            # Views over the memory map; only the gathered batch is copied into memory
+            windows = self._windows[int(shard)] = shard_windows(self.paths[int(shard)], self.sequence_length)
+        X, y = windows
+        student, window = np.divmod(flat, self.windows_per_student)
+        batch = (X[student, window] - self.mean) / self.scale
+        return batch.astype(np.float32), y[student, window].astype(np.float32)
+
+    def dataset(self, split):
+        """
+        tf.data pipeline: index generator -> parallel batch loads -> prefetch.
+        Repeats indefinitely (each pass re-runs indices(), so training reshuffles), so
+        fit() needs steps_per_epoch / validation_steps = steps(split), one pass per epoch.
+        """
+        import tensorflow as tf
+
+        n_features = len(self.manifest['features'])
+        # Without repeat() the generator's cardinality is unknown and Keras creates the
+        # iterator once: from epoch 2 on it would be exhausted
+        ds = tf.data.Dataset.from_generator(
+            lambda: self.indices(split),
+            output_signature=(tf.TensorSpec((), tf.int64), tf.TensorSpec((None,), tf.int64))).repeat()
+
+        def load(shard, flat):
+            X, y = tf.numpy_function(self.load, [shard, flat], (tf.float32, tf.float32))
+            X.set_shape((None, self.sequence_length, n_features))
+            y.set_shape((None,))
+            return X, y
+
+        return ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False).prefetch(tf.data.AUTOTUNE)
+
+def train_streaming(data_dir, epochs, batch_size, checkpoint_dir, validation_split=0.2, seed=0):
+    """Out-of-core training: memory use depends on batch_size, not on the dataset size"""
+    from tensorflow import keras
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    # The scaler is part of the checkpoint: a resumed run must scale inputs identically
+    scaler_path = os.path.join(checkpoint_dir, 'lstm_scaler.pkl')
+    if os.path.exists(scaler_path):
+        scaler = joblib.load(scaler_path)
+    else:
+        print("Fitting scaler (partial_fit over shards)...")
+        scaler = fit_scaler_streaming(data_dir)
+        joblib.dump(scaler, scaler_path)
+    batches = ShardBatches(data_dir, scaler, batch_size, validation_split, seed=seed)
+
+    # ModelCheckpoint's running best is not part of BackupAndRestore's state: keep it next to
+    # the scaler, so a resumed run only replaces best.keras with a better epoch
+    best_path = os.path.join(checkpoint_dir, 'best.keras')
+    best_loss_path = os.path.join(checkpoint_dir, 'best_val_loss.json')
+    best_loss = None
+    if os.path.exists(best_path) and os.path.exists(best_loss_path):
+        with open(best_loss_path) as f:
+            best_loss = json.load(f)['val_loss']
+        print(f"Resuming: best val_loss so far {best_loss:.6f}")
+
+    class RecordBestLoss(keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            nonlocal best_loss
+            loss = (logs or {}).get('val_loss')
+            if loss is not None and (best_loss is None or loss < best_loss):
+                best_loss = float(loss)
+                tmp_path = best_loss_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump({"val_loss": best_loss, "epoch": epoch}, f)
+                os.replace(tmp_path, best_loss_path)
+
+    callbacks = [
+        # Resumes from the last finished epoch if a previous run was interrupted
+        keras.callbacks.BackupAndRestore(os.path.join(checkpoint_dir, 'backup')),
+        keras.callbacks.ModelCheckpoint(best_path, monitor='val_loss', save_best_only=True,
+                                        initial_value_threshold=best_loss),
+        # After ModelCheckpoint, so the recorded loss is that of the saved epoch
+        RecordBestLoss()
+    ]
+
+    print("Training Model (streaming)...")
+    model = build_lstm_model(input_shape=(batches.sequence_length, len(batches.manifest['features'])))
+    model.fit(batches.dataset('train'), epochs=epochs, steps_per_epoch=batches.steps('train'),
+              validation_data=batches.dataset('validation'), validation_steps=batches.steps('validation'),
+              callbacks=callbacks)
+    # Export the best epoch, not necessarily the last
+    if os.path.exists(best_path):
+        model = keras.models.load_model(best_path)
+    return model, scaler
+
+# --- 5. Export ---
+def export_artifacts(model, scaler, version):
+    """
+    Register the model/scaler pair under one version in the service's artifact store and
+    activate it, then add the verified TensorFlow-free export (<version>-numpy) on top.
+    """
+    # Imports ml-service's artifact store; kept out of module scope for the shard workers
+    from export_models import register_artifact, export_numpy_artifact
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'lstm_attention.keras')
+        scaler_path = os.path.join(tmp, 'lstm_scaler.pkl')
+        model.save(model_path)
+        joblib.dump(scaler, scaler_path)
+        # Scaler first: the model is what triggers a reload in the service, and it
+        # must not be served against a scaler from another version
+        register_artifact('lstm_scaler', version, scaler_path, 'joblib', root=MODELS_DIR)
+        register_artifact('lstm_attention', version, model_path, 'keras', root=MODELS_DIR)
+    print(f"Model registered as version {version} in {MODELS_DIR}")
+    try:
+        report = export_numpy_artifact('lstm_attention', model, version)
+        print(f"NumPy export registered as version {version}-numpy: {json.dumps(report)}")
+    except ValueError as e:
+        # The Keras version stays active
+        print(f"Warning: NumPy export failed, serving needs TensorFlow: {e}")
+
 if __name__ == "__main__":
-    print("Generating data...")
-    df = generate_training_data(50, 20) # Smaller for quick test
-    
-    print("Preparing sequences...")
-    X, y = create_sequences(df)
+    parser = argparse.ArgumentParser(description="Train the attention forecasting LSTM on synthetic data")
+    parser.add_argument('--students', type=int, default=50)  # Small defaults for a quick test
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=None,
+                        help="write the dataset as memory-mapped .npy shards here (multi-process)")
+    parser.add_argument('--shard-size', type=int, default=1000, help="students per shard")
+    parser.add_argument('--workers', type=int, default=None, help="generator processes (default: all cores)")
+    parser.add_argument('--generate-only', action='store_true', help="write the shards and exit")
+    parser.add_argument('--reuse-data', action='store_true', help="train on existing shards in --data-dir")
+    parser.add_argument('--streaming', action='store_true',
+                        help="out-of-core training from the shards in --data-dir (tf.data)")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--checkpoint-dir', default=None, help="default: <data-dir>/checkpoints")
+    parser.add_argument('--version', default=None, help="artifact version (default: timestamp)")
+    args = parser.parse_args()
+    if (args.streaming or args.reuse_data or args.generate_only) and not args.data_dir:
+        parser.error("--streaming, --reuse-data and --generate-only need --data-dir")
+    version = args.version or time.strftime('%Y%m%d-%H%M%S')
+
+    if args.data_dir and not args.reuse_data:
+        print(f"Generating {args.students} students x {args.days} days into {args.data_dir}...")
+        write_training_shards(args.data_dir, args.students, args.days, args.seed, args.shard_size, args.workers)
+    if args.generate_only:
+        raise SystemExit(0)
+
+    if args.streaming:
+        checkpoint_dir = args.checkpoint_dir or os.path.join(args.data_dir, 'checkpoints')
+        model, scaler = train_streaming(args.data_dir, args.epochs, args.batch_size, checkpoint_dir, seed=args.seed)
+        export_artifacts(model, scaler, version)
+        raise SystemExit(0)
+
+    if args.data_dir:
+        print("Preparing sequences...")
+        X, y = load_sequences(args.data_dir)
+    else:
+        print("Generating data...")
+        df = generate_training_data(args.students, args.days, args.seed)
+
+        print("Preparing sequences...")
+        X, y = create_sequences(df)
     
     # Scaling
     scaler = StandardScaler()
@@ -107,14 +396,6 @@ if __name__ == "__main__":
     
     print("Training Model...")
     model = build_lstm_model(input_shape=(X.shape[1], X.shape[2]))
-    model.fit(X_train, y_train, epochs=5, batch_size=32, validation_data=(X_test, y_test))
-    
-    # Save (Adjust path relative to script location)
-    # Script is in ml-training/scripts
-    # Models should go to ml-service/app/ml_models
-    save_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ml-service/app/ml_models'))
-    os.makedirs(save_path, exist_ok=True)
-    
-    model.save(os.path.join(save_path, 'lstm_attention.keras'))
-    joblib.dump(scaler, os.path.join(save_path, 'lstm_scaler.pkl'))
-    print(f"Model Saved to {save_path}")
+    model.fit(X_train, y_train, epochs=args.epochs, batch_size=args.batch_size, validation_data=(X_test, y_test))
+
+    export_artifacts(model, scaler, version)